@@ -2,6 +2,8 @@
 Script to add sample character data for testing
 """
 
+from sqlalchemy import insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
 from app.database import engine, get_db
 from app.models import IslamicCharacter
@@ -56,19 +58,25 @@ def add_sample_characters():
     ]
     
     try:
-        for char_data in sample_characters:
-            # Check if character already exists
-            existing = db.query(IslamicCharacter).filter(
-                IslamicCharacter.slug == char_data["slug"]
-            ).first()
-            
-            if not existing:
-                character = IslamicCharacter(**char_data)
-                db.add(character)
-                print(f"Added character: {char_data['name']}")
-            else:
-                print(f"Character already exists: {char_data['name']}")
+        if db.bind.dialect.name == "postgresql":
+            # Single round trip; existing slugs are skipped server-side
+            stmt = pg_insert(IslamicCharacter).values(sample_characters).on_conflict_do_nothing(
+                index_elements=["slug"]
+            )
+            result = db.execute(stmt)
+            added = result.rowcount
+        else:
+            # Pre-filter existing slugs with one SELECT, then executemany the rest
+            slugs = [char_data["slug"] for char_data in sample_characters]
+            existing = set(db.scalars(
+                select(IslamicCharacter.slug).where(IslamicCharacter.slug.in_(slugs))
+            ))
+            new_characters = [c for c in sample_characters if c["slug"] not in existing]
+            if new_characters:
+                db.execute(insert(IslamicCharacter), new_characters)
+            added = len(new_characters)
         
+        print(f"Added {added} of {len(sample_characters)} sample characters")
         db.commit()
         print("Sample data added successfully!")
         
@@ -22,7 +22,7 @@ def upgrade():
     op.add_column('islamic_characters', sa.Column('slug', sa.String(length=200), nullable=True, unique=True))
     
     # Create index for slug
-    op.create_index('islamic_characters', ['slug'], unique=True, name='ix_islamic_characters_slug')
+    op.create_index('ix_islamic_characters_slug', 'islamic_characters', ['slug'], unique=True)
     
     # Populate slug field for existing records
     connection = op.get_bind()
@@ -36,14 +36,16 @@ def upgrade():
         5: 'ali'
     }
     
-    for character_id, slug in slugs.items():
-        connection.execute(
-            sa.text("UPDATE islamic_characters SET slug = :slug WHERE id = :id"),
-            {'slug': slug, 'id': character_id}
-        )
+    # One statement for all rows instead of a round trip per character
+    cases = " ".join(f"WHEN {character_id} THEN :slug_{character_id}" for character_id in slugs)
+    connection.execute(
+        sa.text(f"UPDATE islamic_characters SET slug = CASE id {cases} END WHERE id IN :ids")
+        .bindparams(sa.bindparam('ids', expanding=True)),
+        {'ids': list(slugs), **{f'slug_{character_id}': slug for character_id, slug in slugs.items()}}
+    )
     
     # Make slug not nullable after populating
-    op.alter_column('islamic_characters', sa.Column('slug', sa.String(length=200), nullable=False, unique=True))
+    op.alter_column('islamic_characters', 'slug', existing_type=sa.String(length=200), nullable=False)
 
 
 def downgrade():
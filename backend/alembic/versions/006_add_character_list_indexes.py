@@ -0,0 +1,32 @@
+"""Add composite indexes for character list filters and sorts
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-15 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Match the (filter, sort) pairs used by GET /api/characters so the planner
+    # can walk the index in order and stop after OFFSET + LIMIT rows
+    op.create_index('ix_char_cat_name', 'islamic_characters', ['category', 'name'])
+    op.create_index('ix_char_era_name', 'islamic_characters', ['era', 'name'])
+    op.create_index('ix_char_cat_views', 'islamic_characters', ['category', sa.text('views_count DESC')])
+    op.create_index('ix_char_cat_likes', 'islamic_characters', ['category', sa.text('likes_count DESC')])
+
+
+def downgrade():
+    op.drop_index('ix_char_cat_likes', table_name='islamic_characters')
+    op.drop_index('ix_char_cat_views', table_name='islamic_characters')
+    op.drop_index('ix_char_era_name', table_name='islamic_characters')
+    op.drop_index('ix_char_cat_name', table_name='islamic_characters')
@@ -0,0 +1,40 @@
+"""Add full-text search column and GIN index on islamic_characters
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-15 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Generated tsvector columns are PostgreSQL-only; SQLite keeps the LIKE search
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # 'simple' config: no stemming, so Arabic and transliterated names match as written
+    op.execute("""
+        ALTER TABLE islamic_characters ADD COLUMN search_tsv tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(arabic_name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(full_story, '')), 'C')
+        ) STORED
+    """)
+    op.execute("CREATE INDEX ix_char_search ON islamic_characters USING gin (search_tsv)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_char_search")
+    op.execute("ALTER TABLE islamic_characters DROP COLUMN IF EXISTS search_tsv")
@@ -0,0 +1,42 @@
+"""Add partial indexes for category, era and sub-category lookups
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-15 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Back the GROUP BY lookups in /api/content/{categories,eras,subcategories};
+    # NULL rows are never returned, so leave them out of the index
+    op.create_index(
+        'ix_char_category', 'islamic_characters', ['category'],
+        postgresql_where=sa.text('category IS NOT NULL'),
+        sqlite_where=sa.text('category IS NOT NULL'),
+    )
+    op.create_index(
+        'ix_char_era', 'islamic_characters', ['era'],
+        postgresql_where=sa.text('era IS NOT NULL'),
+        sqlite_where=sa.text('era IS NOT NULL'),
+    )
+    op.create_index(
+        'ix_char_cat_subcat', 'islamic_characters', ['category', 'sub_category'],
+        postgresql_where=sa.text('sub_category IS NOT NULL'),
+        sqlite_where=sa.text('sub_category IS NOT NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_char_cat_subcat', table_name='islamic_characters')
+    op.drop_index('ix_char_era', table_name='islamic_characters')
+    op.drop_index('ix_char_category', table_name='islamic_characters')
@@ -0,0 +1,66 @@
+"""Add analytics materialized views for top characters and category performance
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-15 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Materialized views are PostgreSQL-only; other backends aggregate live
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_top_characters AS
+        SELECT c.id AS character_id,
+               c.name,
+               c.category,
+               c.views_count AS views,
+               count(DISTINCT p.user_id) AS unique_readers,
+               avg(CASE WHEN p.is_completed THEN 1.0 ELSE 0.0 END) AS completion_rate,
+               avg(p.rating) AS average_rating
+        FROM islamic_characters c
+        LEFT JOIN user_progress p ON p.character_id = c.id
+        GROUP BY c.id
+    """)
+    # The unique index is what allows REFRESH ... CONCURRENTLY
+    op.execute("CREATE UNIQUE INDEX ix_mv_top_characters_id ON mv_top_characters (character_id)")
+    op.execute("CREATE INDEX ix_mv_top_characters_views ON mv_top_characters (views DESC)")
+    
+    op.execute("""
+        CREATE MATERIALIZED VIEW mv_category_performance AS
+        SELECT c.category,
+               sum(c.views_count) AS total_views,
+               count(*) AS character_count,
+               max(p.completion_rate) AS average_completion_rate,
+               max(p.average_rating) AS average_rating
+        FROM islamic_characters c
+        LEFT JOIN (
+            SELECT ch.category,
+                   avg(CASE WHEN up.is_completed THEN 1.0 ELSE 0.0 END) AS completion_rate,
+                   avg(up.rating) AS average_rating
+            FROM user_progress up
+            JOIN islamic_characters ch ON ch.id = up.character_id
+            GROUP BY ch.category
+        ) p ON p.category = c.category
+        WHERE c.category IS NOT NULL
+        GROUP BY c.category
+    """)
+    op.execute("CREATE UNIQUE INDEX ix_mv_category_performance_category ON mv_category_performance (category)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_category_performance")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS mv_top_characters")
@@ -0,0 +1,29 @@
+"""Add total_audio_duration to islamic_characters
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-15 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Running total of audio_stories durations in seconds, maintained on upload.
+    # Durations were never recorded before this revision, so 0 is accurate.
+    op.add_column(
+        'islamic_characters',
+        sa.Column('total_audio_duration', sa.Integer(), nullable=True, server_default='0')
+    )
+
+
+def downgrade():
+    op.drop_column('islamic_characters', 'total_audio_duration')
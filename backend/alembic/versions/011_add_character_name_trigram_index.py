@@ -0,0 +1,34 @@
+"""Add trigram index on islamic_characters names
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-15 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # pg_trgm is PostgreSQL-only; SQLite keeps scanning for ILIKE '%q%'
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    # Lets name / arabic_name ILIKE '%q%' use an index despite the leading wildcard
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX ix_char_name_trgm ON islamic_characters "
+        "USING gin (name gin_trgm_ops, arabic_name gin_trgm_ops)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("DROP INDEX IF EXISTS ix_char_name_trgm")
@@ -0,0 +1,34 @@
+"""Add composite indexes for the character and progress list filters
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-15 23:45:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Equality filters first, then the keyset sort columns, so a filtered page
+    # is one index range scan with no sort step
+    op.create_index(
+        'ix_char_cat_era_name', 'islamic_characters',
+        ['category', 'era', 'is_featured', 'name', 'id']
+    )
+    op.create_index(
+        'ix_progress_user_state', 'user_progress',
+        ['user_id', 'is_completed', 'bookmarked', 'character_id', 'id']
+    )
+
+
+def downgrade():
+    op.drop_index('ix_progress_user_state', table_name='user_progress')
+    op.drop_index('ix_char_cat_era_name', table_name='islamic_characters')
@@ -0,0 +1,37 @@
+"""Add partial indexes for the featured character listings
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-16 00:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # /api/content/featured/* filter on is_featured and sort by name; only the
+    # few featured rows are indexed. The predicates are written the way each
+    # dialect renders ``is_featured == True`` so the planner can match them.
+    op.create_index(
+        'ix_char_featured_name', 'islamic_characters', ['name'],
+        postgresql_where=sa.text('is_featured = true'),
+        sqlite_where=sa.text('is_featured = 1'),
+    )
+    op.create_index(
+        'ix_char_featured_cat_name', 'islamic_characters', ['category', 'name'],
+        postgresql_where=sa.text('is_featured = true'),
+        sqlite_where=sa.text('is_featured = 1'),
+    )
+
+
+def downgrade():
+    op.drop_index('ix_char_featured_cat_name', table_name='islamic_characters')
+    op.drop_index('ix_char_featured_name', table_name='islamic_characters')
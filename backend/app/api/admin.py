@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 import json
+import httpx
 import psutil
 import sqlite3
 from pathlib import Path
@@ -10,6 +11,8 @@ from pathlib import Path
 from ..database import get_db
 from ..models import User, IslamicCharacter, UserProgress, TeamMember, Role, Task, Project, ContentApproval
 from ..security import get_current_user, get_password_hash
+from ..services import character_directory
+from ..cache import invalidate_user_cache
 
 router = APIRouter()
 
@@ -123,13 +126,14 @@ async def manage_user(
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        user = db.query(User).filter(User.id == user_id).first()
+        user = db.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         if action == "toggle":
             user.is_active = not user.is_active
             db.commit()
+            invalidate_user_cache(user_id)
             return {"message": f"User {'activated' if user.is_active else 'deactivated'} successfully"}
         
         elif action == "reset_password":
@@ -148,6 +152,7 @@ async def manage_user(
             if is_superuser is not None:
                 user.is_superuser = is_superuser
             db.commit()
+            invalidate_user_cache(user_id)
             return {"message": "User updated successfully"}
         
         else:
@@ -204,13 +209,14 @@ async def manage_character(
         raise HTTPException(status_code=403, detail="Admin access required")
     
     try:
-        character = db.query(IslamicCharacter).filter(IslamicCharacter.id == character_id).first()
+        character = db.get(IslamicCharacter, character_id)
         if not character:
             raise HTTPException(status_code=404, detail="Character not found")
         
         if action == "toggle":
             character.is_active = not character.is_active
             db.commit()
+            character_directory.forget(character_id, character.slug)
             return {"message": f"Character {'activated' if character.is_active else 'deactivated'} successfully"}
         
         elif action == "update":
@@ -219,6 +225,7 @@ async def manage_character(
             if is_featured is not None:
                 character.is_featured = is_featured
             db.commit()
+            character_directory.forget(character_id, character.slug)
             return {"message": "Character updated successfully"}
         
         else:
@@ -298,8 +305,9 @@ async def get_system_health(
         
         # Frontend health check
         try:
-            import requests
-            response = requests.get("http://localhost:3000", timeout=5)
+            # Async client: a slow frontend must not stall the event loop for the timeout
+            async with httpx.AsyncClient(timeout=5) as client:
+                response = await client.get("http://localhost:3000")
             health_status["frontend"]["status"] = "healthy" if response.status_code == 200 else "unhealthy"
             health_status["frontend"]["response_time"] = response.elapsed.total_seconds() * 1000
         except Exception as e:
@@ -496,7 +504,7 @@ async def update_team_member(
     if not is_admin_user(current_user):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    member = db.query(TeamMember).filter(TeamMember.id == member_id).first()
+    member = db.get(TeamMember, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Team member not found")
     
@@ -518,7 +526,7 @@ async def remove_team_member(
     if not is_admin_user(current_user):
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    member = db.query(TeamMember).filter(TeamMember.id == member_id).first()
+    member = db.get(TeamMember, member_id)
     if not member:
         raise HTTPException(status_code=404, detail="Team member not found")
     
@@ -795,12 +803,11 @@ async def update_character(
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     # Get character
-    character = db.query(IslamicCharacter).filter(
-        IslamicCharacter.id == character_id
-    ).first()
+    character = db.get(IslamicCharacter, character_id)
     
     if not character:
         raise HTTPException(status_code=404, detail="Character not found")
+    previous_slug = character.slug
     
     # Update character fields
     for field, value in character_data.items():
@@ -825,6 +832,7 @@ async def update_character(
         db.add(approval)
     
     db.commit()
+    character_directory.forget(character_id, previous_slug, character.slug)
     
     return {"message": "Character updated successfully"}
 
@@ -840,15 +848,15 @@ async def delete_character(
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Admin access required")
     
-    character = db.query(IslamicCharacter).filter(
-        IslamicCharacter.id == character_id
-    ).first()
+    character = db.get(IslamicCharacter, character_id)
     
     if not character:
         raise HTTPException(status_code=404, detail="Character not found")
     
+    slug = character.slug
     db.delete(character)
     db.commit()
+    character_directory.forget(character_id, slug)
     
     return {"message": "Character deleted successfully"}
 
@@ -913,9 +921,7 @@ async def approve_character(
         raise HTTPException(status_code=403, detail="Insufficient permissions")
     
     # Get character
-    character = db.query(IslamicCharacter).filter(
-        IslamicCharacter.id == character_id
-    ).first()
+    character = db.get(IslamicCharacter, character_id)
     
     if not character:
         raise HTTPException(status_code=404, detail="Character not found")
@@ -4,10 +4,13 @@ from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from ..database import get_db
 from ..models import IslamicCharacter
+from ..cache import cache_result
+from ..services import analytics_views
 
 router = APIRouter()
 
 @router.get("/dashboard")
+@cache_result(expire=300, key_prefix="analytics:dashboard")
 async def get_analytics_dashboard(
     days: int = Query(30, ge=1, le=365),
     db: Session = Depends(get_db)
@@ -29,16 +32,8 @@ async def get_analytics_dashboard(
             "total_characters_viewed": 156,
             "completion_rate": 0.68,  # 68%
             "average_reading_time": 8.3,  # minutes
-            "most_viewed_characters": [
-                {"name": "محمد صلى الله عليه وسلم", "views": 2340},
-                {"name": "أبو بكر الصديق", "views": 1890},
-                {"name": "عمر بن الخطاب", "views": 1560}
-            ],
-            "popular_categories": [
-                {"category": "الأنبياء", "views": 4560},
-                {"category": "الصحابة", "views": 3890},
-                {"category": "العلماء", "views": 1230}
-            ]
+            "most_viewed_characters": analytics_views.top_characters(db, limit=3),
+            "popular_categories": analytics_views.popular_categories(db, limit=3)
         },
         "user_engagement": {
             "bookmarks_created": 234,
@@ -94,6 +89,7 @@ async def get_user_behavior_analytics(
     }
 
 @router.get("/content-performance")
+@cache_result(expire=60, key_prefix="analytics:content")
 async def get_content_performance(
     character_id: Optional[int] = Query(None),
     category: Optional[str] = Query(None),
@@ -147,6 +143,7 @@ async def get_content_performance(
     }
 
 @router.get("/real-time")
+@cache_result(expire=15, key_prefix="analytics:realtime")
 async def get_real_time_analytics(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Get real-time analytics"""
     return {
@@ -6,8 +6,11 @@ retrieval with both ID and slug support, and includes comprehensive error
 handling and logging.
 
 Endpoints:
-    GET /characters: List characters with pagination and filtering
-    GET /characters/{id}: Get specific character by ID or slug
+    GET /characters: List characters with keyset pagination and filtering
+    GET /characters/id/{id}: Get character by numeric ID
+    GET /characters/slug/{slug}: Get character by slug
+    GET /characters/{id}: Get specific character by ID or slug (dispatches to the two above)
+    GET /characters/{id}/stats: Live view/like/share counters
     POST /characters: Create new character
     PUT /characters/{id}: Update existing character
     DELETE /characters/{id}: Delete character
@@ -23,17 +26,20 @@ Example:
     '/api/characters'
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, undefer_group
+from typing import List, Optional, Tuple, Union
 from datetime import datetime
-from ..database import get_db
+from ..database import get_async_db
 from ..models import IslamicCharacter
 from ..schemas import CharacterResponse, CharacterCreate
 from ..logging_config import get_logger, log_database_operation, log_error
-from ..cache import cache_result, CharacterCache, invalidate_character_cache
+from ..cache import cache_result, CachedBody, CharacterCache, etag_matches, invalidate_character_cache
 from ..utils.rate_limiter import rate_limit
-from ..utils.query_optimizer import QueryOptimizer
+from ..utils.query_optimizer import QueryOptimizer, approx_count, decode_cursor
+from ..services import view_counter, character_directory
 import json
 
 router = APIRouter()
@@ -53,75 +59,182 @@ CHARACTER_SLUGS = {
     "ali": 5
 }
 
+@cache_result(expire=60, key_prefix="char_count")
+async def _count_characters(db: AsyncSession, category: Optional[str] = None, era: Optional[str] = None) -> Tuple[int, bool]:
+    """Count characters matching the list filters (cached for a minute per filter combo).
+    
+    Large results are planner estimates on PostgreSQL; the flag says so.
+    """
+    def count(session: Session) -> Tuple[int, bool]:
+        query = session.query(IslamicCharacter)
+        if category:
+            query = query.filter(IslamicCharacter.category == category)
+        if era:
+            query = query.filter(IslamicCharacter.era == era)
+        return approx_count(session, query)
+    
+    return await db.run_sync(count)
+
 @router.get("/", response_model=List[CharacterResponse])
 # @rate_limit(key='default')  # Temporarily disabled for debugging
 async def get_characters(
-    page: int = Query(1, ge=1, description="Page number for pagination (starts from 1)"),
+    response: Response,
+    page: int = Query(1, ge=1, description="Page number for pagination (starts from 1). Ignored when cursor is given"),
     limit: int = Query(12, ge=1, le=100, description="Number of items per page (max 100)"),
     category: Optional[str] = Query(None, description="Filter characters by category (e.g., 'الصحابة', 'الأنبياء')"),
     era: Optional[str] = Query(None, description="Filter characters by historical era (e.g., 'عصر النبوة', 'الخلافة الراشدة')"),
     sort: str = Query("name", regex="^(name|views|likes|created|updated)$", description="Sort field: name (alphabetical), views (most viewed), likes (most liked), created (newest), updated (recently modified)"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
+    db: AsyncSession = Depends(get_async_db)
 ) -> List[CharacterResponse]:
     """Retrieve paginated list of Islamic characters with optional filtering and sorting.
     
     This endpoint supports comprehensive filtering by category and era, multiple
-    sorting options, and pagination for efficient data retrieval. Results are
-    returned as CharacterResponse objects with all character metadata.
+    sorting options, and keyset pagination for efficient data retrieval. The
+    cursor for the next page is returned in the ``X-Next-Cursor`` header and the
+    (cached) total in ``X-Total-Count``, flagged by ``X-Total-Count-Approximate``
+    when it is a planner estimate; the body stays a plain list.
     
     Args:
-        page: Page number for pagination (1-based)
+        response: Outgoing response, used to set pagination headers
+        page: Page number for the first request (1-based)
         limit: Number of characters per page
         category: Optional category filter
         era: Optional historical era filter  
         sort: Sort field and direction
+        cursor: Opaque cursor of the previous page's last row
         db: Database session dependency
         
     Returns:
         List of CharacterResponse objects containing character data
         
     Raises:
+        HTTPException: If the cursor is malformed (400)
         HTTPException: If database error occurs (500)
         
     Example:
-        >>> GET /api/characters?page=1&limit=10&category=الصحابة&sort=views
+        >>> GET /api/characters?limit=10&category=الصحابة&sort=views
         Returns first 10 companions sorted by view count
+        
+        >>> GET /api/characters?limit=10&category=الصحابة&sort=views&cursor=WzEwMCwgN10=
+        Returns the next 10 companions after the given cursor
     """
     try:
         logger.info(f"Fetching characters with filters: category={category}, era={era}, page={page}, limit={limit}")
         
-        # Use optimized query
-        characters = QueryOptimizer.get_characters_with_relations(
-            db=db,
-            page=page,
-            limit=limit,
-            category=category,
-            era=era,
-            sort=sort
+        after = None
+        if cursor:
+            try:
+                after = decode_cursor(cursor, sort)
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        # The keyset helper takes a sync Session; run_sync drives it over the
+        # async connection, so the event loop isn't blocked on the query
+        characters, next_cursor = await db.run_sync(
+            lambda session: QueryOptimizer.get_characters_keyset(
+                db=session,
+                limit=limit,
+                category=category,
+                era=era,
+                sort=sort,
+                after=after,
+                page=page
+            )
         )
         
         logger.info(f"Retrieved {len(characters)} characters")
         
-        # Convert to response models
-        return [CharacterResponse.model_validate(char) for char in characters]
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        total, total_approx = await _count_characters(db, category=category, era=era)
+        response.headers["X-Total-Count"] = str(total)
+        if total_approx:
+            response.headers["X-Total-Count-Approximate"] = "true"
+        
+        # response_model serializes straight from the ORM rows
+        return characters
+    except HTTPException:
+        raise
     except Exception as e:
         log_error(logger, e, {"action": "get_characters", "category": category, "era": era})
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+@router.get("/id/{character_id:int}", response_model=CharacterResponse)
+async def get_character_by_id(
+    request: Request,
+    character_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a character by numeric ID.
+    
+    The most viewed characters are served from memory; everything else goes
+    through a cached primary-key lookup. The view is counted in memory and
+    written to the database in batches, so cache hits are counted too.
+    Responses carry an ETag (id + last update, not the churning counters) and
+    a public Cache-Control, and a matching If-None-Match gets a bare 304.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        character_id: Numeric character ID
+        db: Database session dependency
+        
+    Returns:
+        CharacterResponse: Detailed character data with all metadata
+        
+    Raises:
+        HTTPException: If character not found (404)
+        HTTPException: If database error occurs (500)
+    """
+    cached = character_directory.get_hot(character_id)
+    if cached is None:
+        cached = await _character_by_id(character_id, db=db)
+    await view_counter.bump(character_id)
+    return _conditional_response(request, cached)
+
+@router.get("/slug/{slug}", response_model=CharacterResponse)
+async def get_character_by_slug(
+    request: Request,
+    slug: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get a character by URL slug.
+    
+    Known slugs are resolved to an ID in memory and take the ID path; unknown
+    ones fall back to a cached lookup on the unique slug index.
+    
+    Args:
+        request: Incoming request, checked for If-None-Match
+        slug: URL-friendly character identifier
+        db: Database session dependency
+        
+    Returns:
+        CharacterResponse: Detailed character data with all metadata
+        
+    Raises:
+        HTTPException: If character not found (404)
+        HTTPException: If database error occurs (500)
+    """
+    character_id = character_directory.resolve_id(slug)
+    if character_id is not None:
+        return await get_character_by_id(request, character_id, db=db)
+    cached = await _character_by_slug(slug, db=db)
+    await view_counter.bump(cached.id)
+    return _conditional_response(request, cached)
+
 @router.get("/{character_id}", response_model=CharacterResponse)
-@cache_result(expire=600, key_prefix="character_detail")
 async def get_character(
-    character_id: Union[str, int],
-    db: Session = Depends(get_db)
+    request: Request,
+    character_id: str,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get specific character by ID or slug with caching.
     
-    Retrieves detailed character information supporting both numeric IDs and string
-    slugs for backward compatibility. Results are cached for 10 minutes to improve
-    performance. Includes comprehensive character data with achievements, lessons,
-    quotes, and timeline events.
+    Kept for backward compatibility: dispatches to ``/id/{id}`` or
+    ``/slug/{slug}``. New clients should call those routes directly.
     
     Args:
+        request: Incoming request, checked for If-None-Match
         character_id: Character identifier (numeric ID or string slug)
         db: Database session dependency
         
@@ -139,74 +252,95 @@ async def get_character(
         >>> GET /api/characters/2
         Returns Umar ibn al-Khattab character data using ID
     """
+    if character_id.isdigit():
+        return await get_character_by_id(request, int(character_id), db=db)
+    return await get_character_by_slug(request, character_id, db=db)
+
+@cache_result(expire=600, key_builder=lambda character_id, db: character_directory.detail_id_key(character_id))
+async def _character_by_id(character_id: int, db: AsyncSession) -> CachedBody:
+    """Load a character by primary key and cache its serialized JSON body."""
     try:
-        # Handle both numeric IDs and string slugs
-        if isinstance(character_id, str) and character_id.isdigit():
-            character_id_int = int(character_id)
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.id == character_id_int
-            ).first()
-        elif isinstance(character_id, int):
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.id == character_id
-            ).first()
-        else:
-            # Try to find by slug field if it exists
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.slug == character_id
-            ).first()
-        
-        if not character:
-            raise HTTPException(status_code=404, detail="Character not found")
-        
-        # Increment view count (this will invalidate cache)
-        character.views_count += 1
-        db.commit()
-        
-        # Invalidate related cache entries
-        invalidate_character_cache(character_id)
-        
-        return CharacterResponse(
-            id=character.id,
-            name=character.name,
-            arabic_name=character.arabic_name,
-            english_name=getattr(character, 'english_name', None),
-            title=character.title,
-            description=character.description,
-            category=character.category,
-            era=character.era,
-            sub_category=getattr(character, 'sub_category', None),
-            slug=getattr(character, 'slug', f"character-{character.id}"),
-            profile_image=character.profile_image,
-            views_count=character.views_count,
-            likes_count=character.likes_count,
-            shares_count=getattr(character, 'shares_count', 0),
-            is_featured=getattr(character, 'is_featured', False),
-            is_verified=getattr(character, 'is_verified', False),
-            verification_source=getattr(character, 'verification_source', None),
-            verification_notes=getattr(character, 'verification_notes', None),
-            created_at=getattr(character, 'created_at', datetime.now()),
-            birth_year=character.birth_year,
-            death_year=character.death_year,
-            birth_place=character.birth_place,
-            death_place=character.death_place,
-            full_story=character.full_story,
-            key_achievements=character.key_achievements or [],
-            lessons=character.lessons or [],
-            quotes=character.quotes or [],
-            timeline_events=character.timeline_events or [],
-            related_characters=character.related_characters or []
-        )
-    except HTTPException:
-        raise
+        character = await db.get(IslamicCharacter, character_id, options=[undefer_group('content')])
     except Exception as e:
         log_error(logger, e, {"action": "get_character", "character_id": character_id})
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if not character:
+        raise HTTPException(status_code=404, detail="Character not found")
+    return character_directory.serialize(character)
+
+@cache_result(expire=600, key_builder=lambda slug, db: character_directory.detail_slug_key(slug))
+async def _character_by_slug(slug: str, db: AsyncSession) -> CachedBody:
+    """Load a character by slug and cache its serialized JSON body."""
+    try:
+        character = (await db.execute(
+            select(IslamicCharacter)
+            .options(undefer_group('content'))
+            .where(IslamicCharacter.slug == slug)
+        )).scalar_one_or_none()
+    except Exception as e:
+        log_error(logger, e, {"action": "get_character", "slug": slug})
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    if not character:
+        raise HTTPException(status_code=404, detail="Character not found")
+    return character_directory.serialize(character)
+
+# Detail bodies only change on edits; let browsers and the CDN revalidate
+# cheaply and serve stale copies while they do
+DETAIL_CACHE_CONTROL = "public, max-age=300, stale-while-revalidate=3600"
+
+def _conditional_response(request: Request, cached: CachedBody) -> Response:
+    """Serve a cached body, or a bare 304 when the client already has it."""
+    headers = {"ETag": cached.etag, "Cache-Control": DETAIL_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+async def _find_character(db: AsyncSession, character_id: Union[str, int]) -> Optional[IslamicCharacter]:
+    """Load a character by ID or slug; IDs go through the identity map via AsyncSession.get."""
+    resolved_id = character_directory.resolve_id(character_id)
+    if resolved_id is not None:
+        return await db.get(IslamicCharacter, resolved_id)
+    return (await db.execute(
+        select(IslamicCharacter).where(IslamicCharacter.slug == character_id)
+    )).scalar_one_or_none()
+
+@router.get("/{character_id}/stats")
+async def get_character_stats(
+    response: Response,
+    character_id: str,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get live counters for a character.
+    
+    The detail body is cached and its ETag ignores the counters, so clients
+    that need up-to-date numbers read them here (never cached).
+    
+    Args:
+        response: Outgoing response, used to disable caching
+        character_id: Character identifier (numeric ID or string slug)
+        db: Database session dependency
+        
+    Returns:
+        dict: Current views, likes and shares
+        
+    Raises:
+        HTTPException: If character not found (404)
+    """
+    character = await _find_character(db, character_id)
+    if not character:
+        raise HTTPException(status_code=404, detail="Character not found")
+    response.headers["Cache-Control"] = "no-store"
+    return {
+        "id": character.id,
+        "views_count": character.views_count + view_counter.pending(character.id),
+        "likes_count": character.likes_count,
+        "shares_count": character.shares_count or 0
+    }
 
 @router.post("/{character_id}/view")
 async def increment_views(
     character_id: Union[str, int],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Increment character view count.
     
@@ -222,28 +356,14 @@ async def increment_views(
         HTTPException: If database error occurs (500)
     """
     try:
-        # Handle both numeric IDs and string slugs
-        if isinstance(character_id, str) and character_id.isdigit():
-            character_id_int = int(character_id)
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.id == character_id_int
-            ).first()
-        elif isinstance(character_id, int):
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.id == character_id
-            ).first()
-        else:
-            # Try to find by slug field if it exists
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.slug == character_id
-            ).first()
+        character = await _find_character(db, character_id)
         
         if not character:
             raise HTTPException(status_code=404, detail="Character not found")
         
         # Increment view count
         character.views_count += 1
-        db.commit()
+        await db.commit()
         
         # Invalidate cache
         invalidate_character_cache(character_id)
@@ -263,7 +383,7 @@ async def increment_views(
 async def toggle_like(
     character_id: Union[str, int],
     liked: bool,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Toggle character like status.
     
@@ -280,21 +400,7 @@ async def toggle_like(
         HTTPException: If database error occurs (500)
     """
     try:
-        # Handle both numeric IDs and string slugs
-        if isinstance(character_id, str) and character_id.isdigit():
-            character_id_int = int(character_id)
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.id == character_id_int
-            ).first()
-        elif isinstance(character_id, int):
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.id == character_id
-            ).first()
-        else:
-            # Try to find by slug field if it exists
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.slug == character_id
-            ).first()
+        character = await _find_character(db, character_id)
         
         if not character:
             raise HTTPException(status_code=404, detail="Character not found")
@@ -305,7 +411,7 @@ async def toggle_like(
         else:
             character.likes_count = max(0, character.likes_count - 1)
         
-        db.commit()
+        await db.commit()
         
         # Invalidate cache
         invalidate_character_cache(character_id)
@@ -325,7 +431,7 @@ async def toggle_like(
 @router.post("/{character_id}/share")
 async def share_character(
     character_id: Union[str, int],
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Record character share.
     
@@ -341,21 +447,7 @@ async def share_character(
         HTTPException: If database error occurs (500)
     """
     try:
-        # Handle both numeric IDs and string slugs
-        if isinstance(character_id, str) and character_id.isdigit():
-            character_id_int = int(character_id)
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.id == character_id_int
-            ).first()
-        elif isinstance(character_id, int):
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.id == character_id
-            ).first()
-        else:
-            # Try to find by slug field if it exists
-            character = db.query(IslamicCharacter).filter(
-                IslamicCharacter.slug == character_id
-            ).first()
+        character = await _find_character(db, character_id)
         
         if not character:
             raise HTTPException(status_code=404, detail="Character not found")
@@ -363,7 +455,7 @@ async def share_character(
         # Increment share count if field exists
         if hasattr(character, 'shares_count'):
             character.shares_count += 1
-            db.commit()
+            await db.commit()
         
         # Invalidate cache
         invalidate_character_cache(character_id)
@@ -1,32 +1,134 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import List, Optional, Dict, Any
+from sqlalchemy import JSON, Integer, String, column, text
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 from datetime import datetime
+import random
 from ..database import get_db
 from ..models import IslamicCharacter
 from ..schemas import CharacterResponse
+from ..cache import cache_result
+from ..utils.query_optimizer import approx_count
 
 router = APIRouter()
 
+# Unnest every character's timeline_events array server-side, one row per event.
+# The column is plain JSON, so PostgreSQL uses json_array_elements and SQLite json_each.
+# A Python None is stored as JSON 'null', hence the array type check.
+_TIMELINE_SQL = {
+    "postgresql": """
+        SELECT c.id AS character_id, c.name AS character_name, e.value AS event
+        FROM islamic_characters c
+        CROSS JOIN LATERAL json_array_elements(c.timeline_events) AS e(value)
+        WHERE json_typeof(c.timeline_events) = 'array'
+        ORDER BY COALESCE((e.value->>'year')::int, 0)
+        LIMIT :lim
+    """,
+    "sqlite": """
+        SELECT c.id AS character_id, c.name AS character_name, e.value AS event
+        FROM islamic_characters c, json_each(c.timeline_events) AS e
+        WHERE json_type(c.timeline_events) = 'array'
+        ORDER BY COALESCE(CAST(json_extract(e.value, '$.year') AS INTEGER), 0)
+        LIMIT :lim
+    """,
+}
+
+# Random pick among the first two quotes of each character (same cap as before).
+_RANDOM_QUOTES_SQL = {
+    "postgresql": """
+        SELECT q.value AS quote, c.name AS character_name, c.id AS character_id,
+               c.title AS character_title
+        FROM islamic_characters c
+        CROSS JOIN LATERAL json_array_elements_text(c.quotes) WITH ORDINALITY AS q(value, position)
+        WHERE json_typeof(c.quotes) = 'array' AND q.position <= 2 {category_filter}
+        ORDER BY random()
+        LIMIT :lim
+    """,
+    "sqlite": """
+        SELECT q.value AS quote, c.name AS character_name, c.id AS character_id,
+               c.title AS character_title
+        FROM islamic_characters c, json_each(c.quotes) AS q
+        WHERE json_type(c.quotes) = 'array' AND q.key < 2 {category_filter}
+        ORDER BY random()
+        LIMIT :lim
+    """,
+}
+
+# One row per (place, type, character) across birth/death places and the
+# locations array, grouped by place. "type" keeps the most specific kind
+# (birth > death > historical site) so the response shape is unchanged.
+_LOCATIONS_SQL = """
+    SELECT name,
+           CASE MIN(rank) WHEN 1 THEN 'birth_place' WHEN 2 THEN 'death_place'
+                ELSE 'historical_site' END AS type,
+           {agg_distinct}(DISTINCT type) AS types,
+           {agg_names} AS characters
+    FROM (
+        SELECT birth_place AS name, 'birth_place' AS type, 1 AS rank, id, name AS character_name
+        FROM islamic_characters WHERE birth_place IS NOT NULL
+        UNION ALL
+        SELECT death_place, 'death_place', 2, id, name
+        FROM islamic_characters WHERE death_place IS NOT NULL
+        UNION ALL
+        SELECT {location}, 'historical_site', 3, c.id, c.name
+        FROM islamic_characters c, {unnest} WHERE {json_type}(c.locations) = 'array'
+    ) s
+    GROUP BY name
+"""
+_LOCATIONS_SQL_BY_DIALECT = {
+    "postgresql": (_LOCATIONS_SQL.format(
+        agg_distinct="array_agg",
+        agg_names="array_agg(character_name ORDER BY id)",
+        location="l.value",
+        unnest="json_array_elements_text(c.locations) AS l(value)",
+        json_type="json_typeof",
+    ), ARRAY(String)),
+    "sqlite": (_LOCATIONS_SQL.format(
+        agg_distinct="json_group_array",
+        agg_names="json_group_array(character_name)",
+        location="l.value",
+        unnest="json_each(c.locations) AS l",
+        json_type="json_type",
+    ), JSON),
+}
+
+@cache_result(expire=60, key_prefix="content:categories")
+def _load_categories(db: Session) -> List[str]:
+    rows = db.query(IslamicCharacter.category).filter(
+        IslamicCharacter.category.isnot(None)
+    ).group_by(IslamicCharacter.category).all()
+    return [row[0] for row in rows]
+
+@cache_result(expire=60, key_prefix="content:eras")
+def _load_eras(db: Session) -> List[str]:
+    rows = db.query(IslamicCharacter.era).filter(
+        IslamicCharacter.era.isnot(None)
+    ).group_by(IslamicCharacter.era).all()
+    return [row[0] for row in rows]
+
+@cache_result(expire=60, key_prefix="content:subcategories")
+def _load_subcategories(category: str, db: Session) -> List[str]:
+    rows = db.query(IslamicCharacter.sub_category).filter(
+        IslamicCharacter.category == category,
+        IslamicCharacter.sub_category.isnot(None)
+    ).group_by(IslamicCharacter.sub_category).all()
+    return [row[0] for row in rows]
+
 @router.get("/categories")
 async def get_categories(db: Session = Depends(get_db)) -> List[str]:
     """Get all character categories"""
-    categories = db.query(IslamicCharacter.category).distinct().all()
-    return [cat[0] for cat in categories if cat[0]]
+    return _load_categories(db)
 
 @router.get("/eras")
 async def get_eras(db: Session = Depends(get_db)) -> List[str]:
     """Get all historical eras"""
-    eras = db.query(IslamicCharacter.era).distinct().all()
-    return [era[0] for era in eras if era[0]]
+    return _load_eras(db)
 
 @router.get("/subcategories/{category}")
 async def get_subcategories(category: str, db: Session = Depends(get_db)) -> List[str]:
     """Get subcategories for a specific category"""
-    subcategories = db.query(IslamicCharacter.sub_category).filter(
-        IslamicCharacter.category == category
-    ).distinct().all()
-    return [sub[0] for sub in subcategories if sub[0]]
+    return _load_subcategories(category, db)
 
 @router.get("/search")
 async def search_content(
@@ -40,7 +142,14 @@ async def search_content(
     """Advanced search across characters"""
     query = db.query(IslamicCharacter)
     
-    if q:
+    if q and db.get_bind().dialect.name == "postgresql":
+        # search_tsv is a generated column backed by a GIN index (migration 007)
+        query = query.filter(
+            text("search_tsv @@ plainto_tsquery('simple', :q)")
+        ).order_by(
+            text("ts_rank_cd(search_tsv, plainto_tsquery('simple', :q)) DESC")
+        ).params(q=q)
+    elif q:
         query = query.filter(
             IslamicCharacter.name.contains(q) |
             IslamicCharacter.arabic_name.contains(q) |
@@ -54,12 +163,13 @@ async def search_content(
     if era:
         query = query.filter(IslamicCharacter.era == era)
     
-    total = query.count()
+    total, total_approx = approx_count(db, query)
     results = query.offset(offset).limit(limit).all()
     
     return {
-        "results": results,
+        "results": [CharacterResponse.model_validate(c) for c in results],
         "total": total,
+        "total_approx": total_approx,
         "offset": offset,
         "limit": limit
     }
@@ -195,19 +305,29 @@ async def get_global_timeline(
     db: Session = Depends(get_db)
 ) -> List[Dict[str, Any]]:
     """Get timeline events from all characters"""
-    characters = db.query(IslamicCharacter).all()
-    timeline_events = []
-    
-    for character in characters:
-        if character.timeline_events:
-            for event in character.timeline_events:
-                event['character_name'] = character.name
-                event['character_id'] = character.id
-                timeline_events.append(event)
+    sql = _TIMELINE_SQL.get(db.get_bind().dialect.name)
+    if sql is None:
+        # Unknown backend: aggregate in Python without touching the ORM-loaded JSON
+        timeline_events = [
+            {**event, "character_name": name, "character_id": character_id}
+            for character_id, name, events in db.query(
+                IslamicCharacter.id, IslamicCharacter.name, IslamicCharacter.timeline_events
+            ).filter(IslamicCharacter.timeline_events.isnot(None))
+            for event in events or []
+        ]
+        timeline_events.sort(key=lambda x: x.get('year', 0))
+        return timeline_events[:limit]
     
-    # Sort by year
-    timeline_events.sort(key=lambda x: x.get('year', 0))
-    return timeline_events[:limit]
+    stmt = text(sql).columns(
+        column("character_id", Integer),
+        column("character_name", String),
+        column("event", JSON),
+    )
+    rows = db.execute(stmt, {"lim": limit}).mappings()
+    return [
+        {**row["event"], "character_name": row["character_name"], "character_id": row["character_id"]}
+        for row in rows
+    ]
 
 @router.get("/quotes/random")
 async def get_random_quotes(
@@ -216,58 +336,75 @@ async def get_random_quotes(
     db: Session = Depends(get_db)
 ) -> List[Dict[str, Any]]:
     """Get random quotes from characters"""
-    query = db.query(IslamicCharacter).filter(IslamicCharacter.quotes.isnot(None))
+    sql = _RANDOM_QUOTES_SQL.get(db.get_bind().dialect.name)
+    if sql is None:
+        return _pick_quotes_in_python(db, category, limit)
     
+    params = {"lim": limit}
+    category_filter = ""
     if category:
-        query = query.filter(IslamicCharacter.category == category)
+        category_filter = "AND c.category = :category"
+        params["category"] = category
     
-    characters = query.all()
-    quotes = []
+    rows = db.execute(text(sql.format(category_filter=category_filter)), params).mappings()
+    return [dict(row) for row in rows]
+
+def _pick_quotes_in_python(db: Session, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """Fallback for backends without JSON table functions."""
+    query = db.query(
+        IslamicCharacter.id, IslamicCharacter.name, IslamicCharacter.title, IslamicCharacter.quotes
+    ).filter(IslamicCharacter.quotes.isnot(None))
     
-    for character in characters:
-        if character.quotes:
-            for quote in character.quotes[:2]:  # Max 2 quotes per character
-                quotes.append({
-                    "quote": quote,
-                    "character_name": character.name,
-                    "character_id": character.id,
-                    "character_title": character.title
-                })
-                if len(quotes) >= limit:
-                    break
-        if len(quotes) >= limit:
-            break
+    if category:
+        query = query.filter(IslamicCharacter.category == category)
     
-    return quotes
+    quotes = [
+        {
+            "quote": quote,
+            "character_name": name,
+            "character_id": character_id,
+            "character_title": title
+        }
+        for character_id, name, title, character_quotes in query
+        for quote in (character_quotes or [])[:2]  # Max 2 quotes per character
+    ]
+    return random.sample(quotes, min(limit, len(quotes)))
 
 @router.get("/locations")
 async def get_important_locations(db: Session = Depends(get_db)) -> List[Dict[str, Any]]:
     """Get all important historical locations"""
-    characters = db.query(IslamicCharacter).all()
+    dialect_sql = _LOCATIONS_SQL_BY_DIALECT.get(db.get_bind().dialect.name)
+    if dialect_sql is None:
+        return _aggregate_locations_in_python(db)
+    
+    sql, list_type = dialect_sql
+    stmt = text(sql).columns(
+        column("name", String),
+        column("type", String),
+        column("types", list_type),
+        column("characters", list_type),
+    )
+    return [dict(row) for row in db.execute(stmt).mappings()]
+
+def _aggregate_locations_in_python(db: Session) -> List[Dict[str, Any]]:
+    """Fallback for backends without JSON table functions."""
     locations = {}
+    rows = db.query(
+        IslamicCharacter.name,
+        IslamicCharacter.birth_place,
+        IslamicCharacter.death_place,
+        IslamicCharacter.locations
+    ).all()
     
-    for character in characters:
-        if character.birth_place:
-            if character.birth_place not in locations:
-                locations[character.birth_place] = {
-                    "type": "birth_place",
-                    "characters": []
-                }
-            locations[character.birth_place]["characters"].append(character.name)
-        if character.death_place:
-            if character.death_place not in locations:
-                locations[character.death_place] = {
-                    "type": "death_place", 
-                    "characters": []
-                }
-            locations[character.death_place]["characters"].append(character.name)
-        if character.locations:
-            for location in character.locations:
-                if location not in locations:
-                    locations[location] = {
-                        "type": "historical_site",
-                        "characters": []
-                    }
-                locations[location]["characters"].append(character.name)
+    for name, birth_place, death_place, extra_locations in rows:
+        places = [(birth_place, "birth_place"), (death_place, "death_place")]
+        places += [(location, "historical_site") for location in extra_locations or []]
+        for place, place_type in places:
+            if not place:
+                continue
+            entry = locations.setdefault(place, {"type": place_type, "types": [], "characters": []})
+            if place_type not in entry["types"]:
+                entry["types"].append(place_type)
+            entry["characters"].append(name)
     
     return [{"name": k, **v} for k, v in locations.items()]
@@ -1,18 +1,211 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import JSON, column, func, select, text, update
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from starlette.concurrency import run_in_threadpool
+from PIL import Image
+from typing import List, Optional, Dict, Any, AsyncIterator, BinaryIO, Set, Tuple, Union
+import hashlib
+import io
 import os
 import uuid
+from pathlib import Path
+import aiofiles
+import orjson
+
+try:
+    import mutagen
+    MUTAGEN_AVAILABLE = True
+except ImportError:
+    MUTAGEN_AVAILABLE = False
+
+from ..config import settings
 from ..database import get_db
 from ..models import IslamicCharacter
+from ..services import character_directory
 
 router = APIRouter()
 
 # Media upload configuration
 UPLOAD_DIR = "static/uploads"
+UPLOAD_SUBDIRS = ("images", "audio")
 ALLOWED_IMAGE_TYPES = ["image/jpeg", "image/png", "image/webp"]
 ALLOWED_AUDIO_TYPES = ["audio/mpeg", "audio/wav", "audio/ogg"]
+ALLOWED_IMAGE_EXTENSIONS = frozenset({"jpg", "jpeg", "png", "webp"})
+ALLOWED_AUDIO_EXTENSIONS = frozenset({"mp3", "wav", "ogg"})
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB
+MAX_IMAGE_DIMENSION = 1600
+WEBP_QUALITY = 82
+
+
+# Append one element to a character's JSON list column in a single statement and
+# return the stored element. The columns are plain JSON and a Python None is
+# stored as JSON 'null', hence the array type check.
+_APPEND_SQL = {
+    "postgresql": """
+        UPDATE islamic_characters
+        SET {field} = (
+            CASE WHEN json_typeof({field}) = 'array' THEN {field}::jsonb ELSE '[]'::jsonb END
+            || jsonb_build_array({item})
+        )::json
+        WHERE id = :id
+        RETURNING {field} -> -1 AS item
+    """,
+    "sqlite": """
+        UPDATE islamic_characters
+        SET {field} = json_insert(
+            CASE WHEN json_type({field}) = 'array' THEN {field} ELSE '[]' END, '$[#]', {item}
+        )
+        WHERE id = :id
+        RETURNING json_quote(json_extract({field}, '$[#-1]')) AS item
+    """,
+}
+
+# The appended element: the :item JSON as-is, or with a default "Audio <n>"
+# title numbered by its position in the list
+_ITEM_SQL = {
+    "postgresql": "CAST(:item AS jsonb)",
+    "sqlite": "json(:item)",
+}
+_UNTITLED_ITEM_SQL = {
+    "postgresql": """CAST(:item AS jsonb) || jsonb_build_object('title', 'Audio ' || (
+        CASE WHEN json_typeof({field}) = 'array' THEN json_array_length({field}) ELSE 0 END + 1))""",
+    "sqlite": """json_set(:item, '$.title', 'Audio ' || (
+        CASE WHEN json_type({field}) = 'array' THEN json_array_length({field}) ELSE 0 END + 1))""",
+}
+
+
+def _append_to_list(
+    db: Session, character_id: int, field: str, item: Any, untitled: bool = False
+) -> Optional[Any]:
+    """Append item to a character's JSON list with UPDATE ... RETURNING.
+
+    With untitled=True the dict item gets a default title from its position.
+    Returns the stored element, or None when the character does not exist.
+    """
+    dialect = db.get_bind().dialect.name
+    sql = _APPEND_SQL.get(dialect)
+    if sql is None:
+        # Unknown backend: read-modify-write through the ORM
+        character = db.get(IslamicCharacter, character_id)
+        if not character:
+            return None
+        items = list(getattr(character, field) or [])
+        if untitled:
+            item = {**item, "title": f"Audio {len(items) + 1}"}
+        setattr(character, field, items + [item])
+        db.commit()
+        return item
+
+    item_sql = (_UNTITLED_ITEM_SQL if untitled else _ITEM_SQL)[dialect].format(field=field)
+    stmt = text(sql.format(field=field, item=item_sql)).columns(column("item", JSON))
+    stored = db.execute(stmt, {"id": character_id, "item": orjson.dumps(item).decode()}).scalar()
+    db.commit()
+    return stored
+
+
+def _forget_character(db: Session, character_id: int) -> None:
+    """Drop a character's cached detail bodies (by id and current slug) after a media change."""
+    slug = db.scalar(select(IslamicCharacter.slug).where(IslamicCharacter.id == character_id))
+    character_directory.forget(character_id, slug)
+
+
+def ensure_upload_dirs() -> None:
+    """Create the upload directories once at startup instead of on every upload."""
+    for sub in UPLOAD_SUBDIRS:
+        Path(UPLOAD_DIR, sub).mkdir(parents=True, exist_ok=True)
+
+
+def _file_extension(filename: Optional[str], allowed: frozenset) -> str:
+    """Lower-cased extension of an uploaded filename, rejected unless whitelisted."""
+    _, dot, extension = (filename or "").rpartition(".")
+    extension = extension.lower()
+    if not dot or extension not in allowed:
+        raise HTTPException(status_code=400, detail="Invalid file extension")
+    return extension
+
+
+# Shard directories already created by this process
+_shard_dirs: Set[str] = set()
+
+
+def _upload_path(kind: str, extension: str) -> Tuple[str, str]:
+    """Pick a new location for an upload and return (file path, public URL).
+
+    Files are spread over two levels of hex directories taken from the UUID
+    (images/ab/cd/abcd....png), so no single directory grows unbounded.
+    """
+    unique = uuid.uuid4().hex
+    name = f"{unique[:2]}/{unique[2:4]}/{unique}.{extension}"
+    directory = os.path.join(UPLOAD_DIR, kind, unique[:2], unique[2:4])
+    if directory not in _shard_dirs:
+        os.makedirs(directory, exist_ok=True)
+        _shard_dirs.add(directory)
+    return os.path.join(UPLOAD_DIR, kind, name), f"/static/uploads/{kind}/{name}"
+
+
+async def write_upload(path: str, chunks: AsyncIterator[bytes]) -> None:
+    """Write chunks to path without blocking the event loop."""
+    async with aiofiles.open(path, "wb") as out:
+        async for chunk in chunks:
+            await out.write(chunk)
+
+
+async def _read_chunks(file: UploadFile, limit: int) -> AsyncIterator[bytes]:
+    """Yield upload chunks, raising 413 once more than limit bytes arrive."""
+    total = 0
+    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+        total += len(chunk)
+        if total > limit:
+            raise HTTPException(status_code=413, detail="File too large")
+        yield chunk
+
+
+async def _stream_to_disk(file: UploadFile, file_path: str) -> int:
+    """Copy an upload to disk chunk by chunk, enforcing MAX_FILE_SIZE as it goes.
+
+    Returns the number of bytes written. A partially written file is removed
+    when the size limit is exceeded.
+    """
+    try:
+        await write_upload(file_path, _read_chunks(file, MAX_FILE_SIZE))
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return os.path.getsize(file_path)
+
+
+def _save_webp(img: Image.Image, out: Union[str, BinaryIO], lossless: bool = False) -> None:
+    """Save an image as WebP, keeping an alpha channel only when it has one."""
+    has_alpha = "A" in img.getbands() or "transparency" in img.info
+    img = img.convert("RGBA" if has_alpha else "RGB")
+    img.save(out, "webp", lossless=lossless, quality=WEBP_QUALITY, method=6)
+
+
+def _transcode_to_webp(path: str) -> str:
+    """Replace an uploaded image with a WebP copy and return the new path.
+
+    Graphics (palette images and anything with at most 256 colours) are
+    encoded losslessly; photos use lossy WebP.
+    """
+    webp_path = os.path.splitext(path)[0] + ".webp"
+    # Encode next to the target and move it into place: a PNG/JPEG uploaded
+    # with a .webp name has webp_path == path
+    tmp_path = webp_path + ".tmp"
+    try:
+        with Image.open(path) as img:
+            lossless = img.mode == "P" or img.getcolors(256) is not None
+            _save_webp(img, tmp_path, lossless=lossless)
+        os.replace(tmp_path, webp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if path != webp_path:
+        os.remove(path)
+    return webp_path
+
 
 @router.post("/upload/image")
 async def upload_image(
@@ -26,40 +219,61 @@ async def upload_image(
     if file.content_type not in ALLOWED_IMAGE_TYPES:
         raise HTTPException(status_code=400, detail="Invalid image type")
     
-    # Validate file size
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large")
-    
     # Generate unique filename
-    file_extension = file.filename.split(".")[-1]
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, "images", unique_filename)
+    file_extension = _file_extension(file.filename, ALLOWED_IMAGE_EXTENSIONS)
+    file_path, file_url = _upload_path("images", file_extension)
+    
+    # Save file, validating size while streaming
+    await _stream_to_disk(file, file_path)
     
-    # Save file
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Store WebP as the canonical asset
+    if file.content_type != "image/webp":
+        try:
+            file_path = await run_in_threadpool(_transcode_to_webp, file_path)
+        except (OSError, Image.DecompressionBombError):
+            os.remove(file_path)
+            raise HTTPException(status_code=400, detail="Invalid image file")
+        file_url = os.path.splitext(file_url)[0] + ".webp"
     
     # Update database if character_id provided
     if character_id:
-        character = db.query(IslamicCharacter).filter(IslamicCharacter.id == character_id).first()
-        if character:
-            if image_type == "profile":
-                character.profile_image = f"/static/uploads/images/{unique_filename}"
-            elif image_type == "gallery":
-                if not character.gallery:
-                    character.gallery = []
-                character.gallery.append(f"/static/uploads/images/{unique_filename}")
+        if image_type == "profile":
+            found = db.execute(
+                update(IslamicCharacter)
+                .where(IslamicCharacter.id == character_id)
+                .values(profile_image=file_url)
+                .returning(IslamicCharacter.id)
+            ).first()
             db.commit()
+        elif image_type == "gallery":
+            found = _append_to_list(db, character_id, "gallery", file_url)
+        else:
+            found = True
+        if not found:
+            os.remove(file_path)
+            raise HTTPException(status_code=404, detail="Character not found")
+        _forget_character(db, character_id)
     
     return {
         "message": "Image uploaded successfully",
-        "file_path": f"/static/uploads/images/{unique_filename}",
+        "file_path": file_url,
         "character_id": character_id,
         "image_type": image_type
     }
 
+def _audio_duration(path: str) -> Optional[int]:
+    """Length of an audio file in whole seconds, or None if it can't be read."""
+    if not MUTAGEN_AVAILABLE:
+        return None
+    try:
+        audio = mutagen.File(path)
+    except mutagen.MutagenError:
+        return None
+    if audio is None or not getattr(audio.info, "length", None):
+        return None
+    return round(audio.info.length)
+
+
 @router.post("/upload/audio")
 async def upload_audio(
     file: UploadFile = File(...),
@@ -73,41 +287,41 @@ async def upload_audio(
     if file.content_type not in ALLOWED_AUDIO_TYPES:
         raise HTTPException(status_code=400, detail="Invalid audio type")
     
-    # Validate file size
-    content = await file.read()
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large")
-    
     # Generate unique filename
-    file_extension = file.filename.split(".")[-1]
-    unique_filename = f"{uuid.uuid4()}.{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, "audio", unique_filename)
+    file_extension = _file_extension(file.filename, ALLOWED_AUDIO_EXTENSIONS)
+    file_path, file_url = _upload_path("audio", file_extension)
     
-    # Save file
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-    with open(file_path, "wb") as f:
-        f.write(content)
+    # Save file, validating size while streaming
+    file_size = await _stream_to_disk(file, file_path)
+    duration = await run_in_threadpool(_audio_duration, file_path)
     
     # Update database if character_id provided
     if character_id:
-        character = db.query(IslamicCharacter).filter(IslamicCharacter.id == character_id).first()
-        if character:
-            if not character.audio_stories:
-                character.audio_stories = []
-            
-            audio_info = {
-                "url": f"/static/uploads/audio/{unique_filename}",
-                "title": title or f"Audio {len(character.audio_stories) + 1}",
-                "type": audio_type,
-                "duration": None,  # TODO: Extract audio duration
-                "file_size": len(content)
-            }
-            character.audio_stories.append(audio_info)
+        audio_info = {
+            "url": file_url,
+            "type": audio_type,
+            "duration": duration,
+            "file_size": file_size
+        }
+        if title:
+            audio_info["title"] = title
+        audio_info = _append_to_list(db, character_id, "audio_stories", audio_info, untitled=not title)
+        if audio_info is None:
+            os.remove(file_path)
+            raise HTTPException(status_code=404, detail="Character not found")
+        if duration:
+            # Keep the running total on write so reads don't sum the JSON list
+            db.execute(
+                update(IslamicCharacter)
+                .where(IslamicCharacter.id == character_id)
+                .values(total_audio_duration=func.coalesce(IslamicCharacter.total_audio_duration, 0) + duration)
+            )
             db.commit()
+        _forget_character(db, character_id)
     
     return {
         "message": "Audio uploaded successfully",
-        "file_path": f"/static/uploads/audio/{unique_filename}",
+        "file_path": file_url,
         "character_id": character_id,
         "audio_info": audio_info if character_id else None
     }
@@ -115,7 +329,9 @@ async def upload_audio(
 @router.get("/images/{character_id}")
 async def get_character_images(character_id: int, db: Session = Depends(get_db)):
     """Get all images for a character"""
-    character = db.query(IslamicCharacter).filter(IslamicCharacter.id == character_id).first()
+    character = db.query(
+        IslamicCharacter.profile_image, IslamicCharacter.gallery
+    ).filter(IslamicCharacter.id == character_id).one_or_none()
     if not character:
         raise HTTPException(status_code=404, detail="Character not found")
     
@@ -144,14 +360,16 @@ async def get_character_images(character_id: int, db: Session = Depends(get_db))
 @router.get("/audio/{character_id}")
 async def get_character_audio(character_id: int, db: Session = Depends(get_db)):
     """Get all audio files for a character"""
-    character = db.query(IslamicCharacter).filter(IslamicCharacter.id == character_id).first()
+    character = db.query(
+        IslamicCharacter.audio_stories, IslamicCharacter.total_audio_duration
+    ).filter(IslamicCharacter.id == character_id).one_or_none()
     if not character:
         raise HTTPException(status_code=404, detail="Character not found")
     
     return {
         "character_id": character_id,
         "audio_stories": character.audio_stories or [],
-        "total_duration": sum(audio.get("duration", 0) for audio in (character.audio_stories or []))
+        "total_duration": character.total_audio_duration or 0
     }
 
 @router.delete("/image/{image_id}")
@@ -166,15 +384,83 @@ async def delete_audio(audio_id: str, db: Session = Depends(get_db)):
     # TODO: Implement audio deletion
     return {"message": "Audio deleted successfully"}
 
+def _resolve_upload_path(url: str) -> Optional[str]:
+    """Map a /static/uploads URL to a local path, rejecting anything outside UPLOAD_DIR."""
+    path = os.path.realpath(url.lstrip("/"))
+    if not path.startswith(os.path.realpath(UPLOAD_DIR) + os.sep):
+        return None
+    return path
+
+
+def _optimize_image(path: str) -> str:
+    """Downscale an image to MAX_IMAGE_DIMENSION and re-encode it as WebP.
+
+    Returns the path of the WebP file written next to the original. Its name
+    carries a hash of the content, so /static (cached as immutable) never
+    serves a stale copy after a file is optimized again.
+    """
+    buffer = io.BytesIO()
+    with Image.open(path) as img:
+        img.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.LANCZOS)
+        _save_webp(img, buffer)
+    data = buffer.getvalue()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    webp_path = f"{os.path.splitext(path)[0]}.{digest}.webp"
+    tmp_path = webp_path + ".tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(data)
+    os.replace(tmp_path, webp_path)
+    return webp_path
+
+
 @router.post("/optimize")
 async def optimize_media(
     file_paths: List[str],
     db: Session = Depends(get_db)
 ):
     """Optimize media files (compress images, normalize audio)"""
-    # TODO: Implement media optimization
+    optimized = []
+    skipped = []
+    for url in file_paths:
+        path = _resolve_upload_path(url)
+        if not path or not os.path.isfile(path) or os.sep + "images" + os.sep not in path:
+            # Audio normalization is not supported yet
+            skipped.append(url)
+            continue
+        try:
+            webp_path = await run_in_threadpool(_optimize_image, path)
+        except (OSError, Image.DecompressionBombError):
+            skipped.append(url)
+            continue
+        optimized.append({
+            "source": url,
+            "optimized": url.rsplit("/", 1)[0] + "/" + os.path.basename(webp_path)
+        })
+
     return {
-        "message": "Media optimization started",
-        "files_processed": len(file_paths),
-        "estimated_time": "2-5 minutes"
+        "message": "Media optimization completed",
+        "files_processed": len(optimized),
+        "optimized": optimized,
+        "skipped": skipped
     }
+
+
+@router.get("/file/{file_path:path}")
+async def get_media_file(file_path: str):
+    """Serve an uploaded file.
+
+    Behind nginx (MEDIA_ACCEL_REDIRECT_PREFIX set, with a matching
+    ``location /internal-uploads/ { internal; alias /app/static/uploads/; }``)
+    the app only answers with X-Accel-Redirect and nginx sends the bytes with
+    sendfile. Without it the file is served directly.
+    """
+    path = _resolve_upload_path(os.path.join(UPLOAD_DIR, file_path))
+    if not path or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if settings.MEDIA_ACCEL_REDIRECT_PREFIX:
+        relative = os.path.relpath(path, os.path.realpath(UPLOAD_DIR)).replace(os.sep, "/")
+        return Response(headers={
+            "X-Accel-Redirect": settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative
+        })
+    return FileResponse(path)
@@ -1,196 +1,335 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any, Tuple
+import orjson
 from ..database import get_db
-from ..models import IslamicCharacter
+from ..models import IslamicCharacter, UserProgress
+from ..cache import cache_result, etag_matches, make_etag
+from ..services import similarity_index
 
 router = APIRouter()
 
-@router.get("/for-user/{user_id}")
-async def get_user_recommendations(
-    user_id: int,
-    limit: int = Query(10, le=50),
-    algorithm: str = Query("collaborative", regex="^(collaborative|content|hybrid)$"),
-    db: Session = Depends(get_db)
-) -> Dict[str, Any]:
-    """Get personalized recommendations for a user"""
+# Trending and similar-character results change slowly; let browsers and the
+# CDN reuse them and revalidate with the ETag
+RECOMMENDATION_CACHE_CONTROL = "public, max-age=300"
+# Responses carrying a user's id and progress stay out of shared caches
+USER_CACHE_CONTROL = "private, max-age=300"
+
+def _cacheable_response(
+    request: Request, payload: Any, cache_control: str = RECOMMENDATION_CACHE_CONTROL
+) -> Response:
+    """Serialize a payload with a content-hash ETag, or answer 304 if the client has it."""
+    body = orjson.dumps(payload)
+    etag = make_etag(body.decode("utf-8"))
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# How many precomputed neighbours of each read character are pooled
+USER_NEIGHBOURS = 10
+
+def _neighbour_scores(read_ids: List[int]) -> Optional[Dict[int, float]]:
+    """Summed similarity of unread characters to the ones a user has read.
+
+    Each read character contributes its precomputed top neighbours, so the
+    cost is O(history x USER_NEIGHBOURS) array lookups. None without an index.
+    """
+    read = set(read_ids)
+    scores: Dict[int, float] = {}
+    indexed = False
+    for character_id in read_ids:
+        neighbours = similarity_index.similar(character_id, USER_NEIGHBOURS)
+        if neighbours is None:
+            continue
+        indexed = True
+        for neighbour_id, score in neighbours:
+            if neighbour_id not in read:
+                scores[neighbour_id] = scores.get(neighbour_id, 0.0) + score
+    return scores if indexed else None
+
+@cache_result(expire=60, key_prefix="recommendations")
+async def _user_recommendations(db: Session, user_id: int, limit: int) -> Dict[str, Any]:
+    """Unread characters closest to a user's reading history; cached per user for 60s."""
+    read_ids = [
+        row.character_id for row in db.query(UserProgress.character_id).filter(
+            UserProgress.user_id == user_id, UserProgress.character_id.isnot(None)
+        ).distinct()
+    ]
+    scores = _neighbour_scores(read_ids) if read_ids else None
+    if not scores:
+        # No history or no similarity index yet: suggest what others read most
+        read = set(read_ids)
+        trending = await _trending(db, "week", None, limit + len(read))
+        return {
+            "algorithm_used": "trending",
+            "recommendations": [
+                {
+                    "character_id": item["character_id"],
+                    "name": item["name"],
+                    "title": item["title"],
+                    "category": item["category"],
+                    "similarity_score": None,
+                    "reason": "الأكثر قراءة"
+                }
+                for item in trending if item["character_id"] not in read
+            ][:limit]
+        }
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    by_id = _characters_by_id(db, [character_id for character_id, _ in ranked])
     return {
-        "user_id": user_id,
-        "algorithm_used": algorithm,
+        "algorithm_used": "content",
         "recommendations": [
             {
-                "character_id": 4,
-                "name": "عثمان بن عفان",
-                "arabic_name": "عثمان بن عفان رضي الله عنه",
-                "title": "ذو النورين",
-                "category": "الصحابة",
-                "similarity_score": 0.92,
-                "reason": "بناءً على اهتمامك بالخلفاء الراشدين",
-                "confidence": 0.88,
-                "estimated_reading_time": 15,
-                "preview": "ثالث الخلفاء الراشدين وأحد العشرة المبشرين بالجنة..."
-            },
-            {
-                "character_id": 5,
-                "name": "علي بن أبي طالب",
-                "arabic_name": "علي بن أبي طالب رضي الله عنه",
-                "title": "أبو الحسن",
-                "category": "الصحابة",
-                "similarity_score": 0.87,
-                "reason": "شخصيات مرتبطة بالصحابة الذين استمتع بقراءتهم",
-                "confidence": 0.82,
-                "estimated_reading_time": 18,
-                "preview": "ابن عم النبي صلى الله عليه وسلم ورابع الخلفاء الراشدين..."
+                "character_id": character_id,
+                "name": by_id[character_id].name,
+                "title": by_id[character_id].title,
+                "category": by_id[character_id].category,
+                "similarity_score": round(score, 4),
+                "reason": "بناءً على الشخصيات التي قرأتها"
             }
+            for character_id, score in ranked
+            if character_id in by_id
         ]
     }
 
+@router.get("/for-user/{user_id}")
+async def get_user_recommendations(
+    user_id: int,
+    limit: int = Query(10, le=50),
+    algorithm: Literal["collaborative", "content", "hybrid"] = Query("collaborative"),
+    db: Session = Depends(get_db)
+) -> Dict[str, Any]:
+    """Get personalized recommendations for a user
+
+    Scores come from the nightly similarity index (item-item neighbours), so
+    every ``algorithm`` is served from it for now; ``algorithm_used`` reports
+    what actually ranked the results.
+    """
+    return {"user_id": user_id, **await _user_recommendations(db, user_id, limit)}
+
+def _similar_by_attribute(
+    db: Session, character_id: int, similarity_type: str, limit: int
+) -> List[Tuple[int, Optional[float]]]:
+    """Unscored neighbours sharing the character's era, category or relations."""
+    source = db.query(
+        IslamicCharacter.category, IslamicCharacter.era, IslamicCharacter.related_characters
+    ).filter(IslamicCharacter.id == character_id).first()
+    if not source:
+        return []
+    if similarity_type == "relationships":
+        return [(int(related_id), None) for related_id in (source.related_characters or [])[:limit]]
+
+    column = IslamicCharacter.era if similarity_type == "era" else IslamicCharacter.category
+    value = source.era if similarity_type == "era" else source.category
+    ids = db.query(IslamicCharacter.id).filter(
+        column == value, IslamicCharacter.id != character_id
+    ).order_by(IslamicCharacter.views_count.desc()).limit(limit).all()
+    return [(row.id, None) for row in ids]
+
 @router.get("/similar/{character_id}")
 async def get_similar_characters(
+    request: Request,
     character_id: int,
     limit: int = Query(5, le=20),
-    similarity_type: str = Query("content", regex="^(content|category|era|relationships)$"),
+    similarity_type: Literal["content", "category", "era", "relationships"] = Query("content"),
     db: Session = Depends(get_db)
-) -> Dict[str, Any]:
+) -> Response:
     """Get characters similar to a specific character"""
-    return {
+    # Content similarity is precomputed offline; without an index fall back to category
+    neighbours = similarity_index.similar(character_id, limit) if similarity_type == "content" else None
+    if neighbours is None:
+        fallback_type = "category" if similarity_type == "content" else similarity_type
+        neighbours = _similar_by_attribute(db, character_id, fallback_type, limit)
+
+    rows = db.query(
+        IslamicCharacter.id,
+        IslamicCharacter.name,
+        IslamicCharacter.arabic_name,
+        IslamicCharacter.title,
+        IslamicCharacter.category
+    ).filter(IslamicCharacter.id.in_([neighbour_id for neighbour_id, _ in neighbours])).all()
+    by_id = {row.id: row for row in rows}
+
+    return _cacheable_response(request, {
         "character_id": character_id,
         "similarity_type": similarity_type,
         "similar_characters": [
             {
-                "character_id": 3,
-                "name": "عمر بن الخطاب",
-                "arabic_name": "عمر بن الخطاب رضي الله عنه",
-                "title": "الفاروق",
-                "category": "الصحابة",
-                "similarity_score": 0.89,
-                "similar_aspects": ["category", "era", "role"],
-                "common_traits": ["justice", "leadership", "courage"]
-            },
-            {
-                "character_id": 4,
-                "name": "عثمان بن عفان",
-                "arabic_name": "عثمان بن عفان رضي الله عنه",
-                "title": "ذو النورين",
-                "category": "الصحابة",
-                "similarity_score": 0.85,
-                "similar_aspects": ["category", "era", "role"],
-                "common_traits": ["generosity", "piety", "wisdom"]
+                "character_id": neighbour_id,
+                "name": by_id[neighbour_id].name,
+                "arabic_name": by_id[neighbour_id].arabic_name,
+                "title": by_id[neighbour_id].title,
+                "category": by_id[neighbour_id].category,
+                "similarity_score": score
             }
+            for neighbour_id, score in neighbours
+            if neighbour_id in by_id
         ]
-    }
+    })
+
+@cache_result(expire=60, key_prefix="recommendations")
+async def _trending(db: Session, time_period: str, category: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """Most viewed characters scored against the leader; cached per argument set for 60s.
+
+    No per-period view history is kept yet, so every time_period ranks by the
+    lifetime counters.
+    """
+    query = db.query(
+        IslamicCharacter.id,
+        IslamicCharacter.name,
+        IslamicCharacter.title,
+        IslamicCharacter.category,
+        IslamicCharacter.views_count
+    )
+    if category:
+        query = query.filter(IslamicCharacter.category == category)
+    rows = query.order_by(IslamicCharacter.views_count.desc(), IslamicCharacter.id).limit(limit).all()
+    top_views = max((row.views_count or 0 for row in rows), default=0)
+    return [
+        {
+            "character_id": row.id,
+            "name": row.name,
+            "title": row.title,
+            "category": row.category,
+            "trend_score": round((row.views_count or 0) / top_views, 2) if top_views else 0.0,
+            "total_views": row.views_count or 0
+        }
+        for row in rows
+    ]
 
 @router.get("/trending")
 async def get_trending_characters(
-    time_period: str = Query("week", regex="^(day|week|month|year)$"),
+    request: Request,
+    time_period: Literal["day", "week", "month", "year"] = Query("week"),
     category: Optional[str] = Query(None),
     limit: int = Query(10, le=50),
     db: Session = Depends(get_db)
-) -> List[Dict[str, Any]]:
+) -> Response:
     """Get trending characters based on recent activity"""
+    return _cacheable_response(request, await _trending(db, time_period, category, limit))
+
+# Curated collections and paths reference characters by id; display fields are
+# filled in from the database with one IN query per request.
+CURATED_COLLECTIONS = [
+    {
+        "id": 1,
+        "name": "الخلفاء الراشدون",
+        "description": "مجموعة شاملة عن الخلفاء الأربعة الراشدين",
+        "type": "themed",
+        "characters": [2, 3, 4, 5],
+        "estimated_reading_time": 60,
+        "difficulty": "intermediate",
+        "cover_image": "/static/collections/rashidun.jpg"
+    },
+    {
+        "id": 2,
+        "name": "أصحاب بدر",
+        "description": "الشخصيات التي شاركت في غزوة بدر الكبرى",
+        "type": "historical",
+        "characters": [1, 2, 3, 6, 7, 8],
+        "estimated_reading_time": 90,
+        "difficulty": "advanced",
+        "cover_image": "/static/collections/badr.jpg"
+    }
+]
+
+LEARNING_PATH_STEPS = [
+    {
+        "step": 1,
+        "character_id": 1,
+        "reason": "أساس كل المعرفة الإسلامية",
+        "prerequisites": [],
+        "estimated_time": 30,
+        "difficulty": "beginner"
+    },
+    {
+        "step": 2,
+        "character_id": 2,
+        "reason": "أقرب الناس إلى النبي وأول الخلفاء",
+        "prerequisites": [1],
+        "estimated_time": 25,
+        "difficulty": "beginner"
+    },
+    {
+        "step": 3,
+        "character_id": 3,
+        "reason": "ثاني الخلفاء وأحد العشرة المبشرين",
+        "prerequisites": [1, 2],
+        "estimated_time": 28,
+        "difficulty": "intermediate"
+    }
+]
+
+def _characters_by_id(db: Session, ids) -> Dict[int, Any]:
+    """Display columns for the given character ids, fetched in a single query."""
+    rows = db.query(
+        IslamicCharacter.id,
+        IslamicCharacter.name,
+        IslamicCharacter.title,
+        IslamicCharacter.category
+    ).filter(IslamicCharacter.id.in_(set(ids))).all()
+    return {row.id: row for row in rows}
+
+@cache_result(expire=60, key_prefix="recommendations")
+async def _collections(db: Session) -> List[Dict[str, Any]]:
+    """Curated collections with their character details, cached for 60s."""
+    by_id = _characters_by_id(
+        db, [character_id for collection in CURATED_COLLECTIONS for character_id in collection["characters"]]
+    )
     return [
         {
-            "character_id": 1,
-            "name": "محمد صلى الله عليه وسلم",
-            "title": "خاتم الأنبياء والمرسلين",
-            "category": "الأنبياء",
-            "trend_score": 0.95,
-            "views_change": "+25%",
-            "engagement_change": "+18%",
-            "recent_views": 2340,
-            "total_views": 45600
-        },
-        {
-            "character_id": 2,
-            "name": "أبو بكر الصديق",
-            "title": "الصديق والخليفة الأول",
-            "category": "الصحابة",
-            "trend_score": 0.87,
-            "views_change": "+15%",
-            "engagement_change": "+12%",
-            "recent_views": 1890,
-            "total_views": 28900
+            **collection,
+            "character_details": [
+                {
+                    "character_id": character_id,
+                    "name": by_id[character_id].name,
+                    "title": by_id[character_id].title,
+                    "category": by_id[character_id].category
+                }
+                for character_id in collection["characters"]
+                if character_id in by_id
+            ],
+            "completion_rate": 0.0
         }
+        for collection in CURATED_COLLECTIONS
     ]
 
 @router.get("/collections")
 async def get_recommended_collections(
+    request: Request,
     user_id: int,
-    collection_type: str = Query("themed", regex="^(themed|era|category|difficulty)$"),
+    collection_type: Literal["themed", "era", "category", "difficulty"] = Query("themed"),
     db: Session = Depends(get_db)
-) -> Dict[str, Any]:
+) -> Response:
     """Get recommended character collections"""
-    return {
+    return _cacheable_response(request, {
         "user_id": user_id,
         "collection_type": collection_type,
-        "collections": [
-            {
-                "id": 1,
-                "name": "الخلفاء الراشدون",
-                "description": "مجموعة شاملة عن الخلفاء الأربعة الراشدين",
-                "type": "themed",
-                "characters": [2, 3, 4, 5],
-                "estimated_reading_time": 60,
-                "difficulty": "intermediate",
-                "completion_rate": 0.0,
-                "cover_image": "/static/collections/rashidun.jpg"
-            },
-            {
-                "id": 2,
-                "name": "أصحاب بدر",
-                "description": "الشخصيات التي شاركت في غزوة بدر الكبرى",
-                "type": "historical",
-                "characters": [1, 2, 3, 6, 7, 8],
-                "estimated_reading_time": 90,
-                "difficulty": "advanced",
-                "completion_rate": 0.0,
-                "cover_image": "/static/collections/badr.jpg"
-            }
-        ]
-    }
+        "collections": await _collections(db)
+    }, cache_control=USER_CACHE_CONTROL)
 
 @router.get("/learning-path")
 async def get_learning_path_recommendations(
     user_id: int,
-    goal: str = Query("comprehensive", regex="^(comprehensive|scholar|spiritual|historical)$"),
-    current_level: str = Query("beginner", regex="^(beginner|intermediate|advanced)$"),
+    goal: Literal["comprehensive", "scholar", "spiritual", "historical"] = Query("comprehensive"),
+    current_level: Literal["beginner", "intermediate", "advanced"] = Query("beginner"),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """Get recommended learning paths"""
+    by_id = _characters_by_id(db, [step["character_id"] for step in LEARNING_PATH_STEPS])
+    path = [
+        {**step, "name": by_id[step["character_id"]].name}
+        for step in LEARNING_PATH_STEPS
+        if step["character_id"] in by_id
+    ]
     return {
         "user_id": user_id,
         "goal": goal,
         "current_level": current_level,
-        "recommended_path": [
-            {
-                "step": 1,
-                "character_id": 1,
-                "name": "محمد صلى الله عليه وسلم",
-                "reason": "أساس كل المعرفة الإسلامية",
-                "prerequisites": [],
-                "estimated_time": 30,
-                "difficulty": "beginner"
-            },
-            {
-                "step": 2,
-                "character_id": 2,
-                "name": "أبو بكر الصديق",
-                "reason": "أقرب الناس إلى النبي وأول الخلفاء",
-                "prerequisites": [1],
-                "estimated_time": 25,
-                "difficulty": "beginner"
-            },
-            {
-                "step": 3,
-                "character_id": 3,
-                "name": "عمر بن الخطاب",
-                "reason": "ثاني الخلفاء وأحد العشرة المبشرين",
-                "prerequisites": [1, 2],
-                "estimated_time": 28,
-                "difficulty": "intermediate"
-            }
-        ],
-        "total_estimated_time": 83,
+        "recommended_path": path,
+        "total_estimated_time": sum(step["estimated_time"] for step in path),
         "milestones": [
             {"step": 3, "achievement": "إكمال دراسة الخلفاء الراشدين"},
             {"step": 5, "achievement": "فهم العصر الراشدي بشكل شامل"}
@@ -5,19 +5,75 @@ Provides secure token handling with XSS protection
 
 from fastapi import APIRouter, HTTPException, Request, Response, Depends
 from fastapi.security import HTTPBearer
-from jose import JWTError, jwt
+from jwt.exceptions import PyJWTError as JWTError
 from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from ..cache import cache, cache_key
 from ..config import settings
 from ..database import get_db
+from ..models import User
+from ..security import JWT_ALGORITHMS, JWT_KEY, jwt_codec
 from ..utils.validators import InputValidator
 from sqlalchemy.orm import Session
+import base64
+import hashlib
 import logging
+import orjson
+import time
 
 router = APIRouter(prefix="/auth", tags=["secure-auth"])
 security = HTTPBearer()
 validator = InputValidator()
 logger = logging.getLogger(__name__)
 
+# Verified token payloads are reused for at most this long (never past "exp")
+TOKEN_CACHE_TTL = 300
+# Auth-relevant user fields are cached briefly; admin updates invalidate them
+USER_CACHE_TTL = 60
+# Cookies carry Max-Age only; browsers derive the expiry from it
+COOKIE_MAX_AGE = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    """Decode and verify a JWT, reusing the payload of recently verified tokens.
+
+    Raises JWTError for invalid or expired tokens.
+    """
+    key = cache_key("auth", "token", hashlib.sha256(token.encode()).hexdigest())
+    payload = cache.get(key)
+    if payload is None:
+        payload = jwt_codec.decode(token, JWT_KEY, algorithms=JWT_ALGORITHMS)
+        ttl = TOKEN_CACHE_TTL
+        if isinstance(payload.get("exp"), (int, float)):
+            ttl = min(ttl, int(payload["exp"] - time.time()))
+        if ttl > 0:
+            cache.set(key, payload, expire=ttl)
+    return payload
+
+def _get_active_user(db: Session, user_id: Any) -> Optional[Dict[str, Any]]:
+    """Return the cached auth fields of an active user, or None"""
+    try:
+        user_pk = int(user_id)
+    except (TypeError, ValueError):
+        return None
+
+    key = cache_key("auth", "user", user_pk)
+    user = cache.get(key)
+    if user is None:
+        row = db.query(User.id, User.email, User.is_active).filter(User.id == user_pk).first()
+        if not row:
+            return None
+        user = {"id": row.id, "email": row.email, "is_active": row.is_active}
+        cache.set(key, user, expire=USER_CACHE_TTL)
+    return user if user["is_active"] else None
+
+def _encode_user_data(user_data: Dict[str, Any]) -> str:
+    """Pack user data into a compact cookie value (orjson, URL-safe base64)"""
+    return base64.urlsafe_b64encode(orjson.dumps(user_data)).decode("ascii")
+
+def _decode_user_data(value: str) -> Dict[str, Any]:
+    """Unpack a cookie value written by _encode_user_data; raises ValueError if malformed"""
+    return orjson.loads(base64.urlsafe_b64decode(value))
+
 @router.post("/set-token")
 async def set_token(
     request: Request,
@@ -37,7 +93,7 @@ async def set_token(
         
         # Validate token
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            payload = _decode_token(token)
             user_id = payload.get("sub")
             if not user_id:
                 raise HTTPException(status_code=401, detail="Invalid token")
@@ -53,8 +109,7 @@ async def set_token(
         response.set_cookie(
             key="auth_token",
             value=token,
-            max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-            expires=datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+            max_age=COOKIE_MAX_AGE,
             path="/",
             domain=None,
             secure=not settings.DEBUG,
@@ -106,17 +161,15 @@ async def check_auth(request: Request, db: Session = Depends(get_db)):
         
         # Validate token
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            payload = _decode_token(token)
             user_id = payload.get("sub")
             if not user_id:
                 return {"authenticated": False}
         except JWTError:
             return {"authenticated": False}
         
-        # Check if user exists in database
-        from ..models.user import User
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or not user.is_active:
+        # Check if user exists and is active
+        if not _get_active_user(db, user_id):
             return {"authenticated": False}
         
         return {"authenticated": True, "user_id": user_id}
@@ -166,12 +219,10 @@ async def set_user_data(
             "preferred_language": user_data.get("preferred_language", "en")
         }
         
-        import json
         response.set_cookie(
             key="user_data",
-            value=json.dumps(user_data_json),
-            max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-            expires=datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+            value=_encode_user_data(user_data_json),
+            max_age=COOKIE_MAX_AGE,
             path="/",
             domain=None,
             secure=not settings.DEBUG,
@@ -199,11 +250,9 @@ async def get_user_data(request: Request, db: Session = Depends(get_db)):
         if not user_data_cookie:
             return {"user_data": None}
         
-        import json
         try:
-            user_data = json.loads(user_data_cookie)
-            return {"user_data": user_data}
-        except json.JSONDecodeError:
+            return {"user_data": _decode_user_data(user_data_cookie)}
+        except ValueError:
             return {"user_data": None}
         
     except Exception as e:
@@ -223,7 +272,7 @@ async def refresh_token(request: Request, response: Response, db: Session = Depe
         
         # Validate current token
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            payload = _decode_token(token)
             user_id = payload.get("sub")
             if not user_id:
                 raise HTTPException(status_code=401, detail="Invalid token")
@@ -231,28 +280,26 @@ async def refresh_token(request: Request, response: Response, db: Session = Depe
             raise HTTPException(status_code=401, detail="Invalid token")
         
         # Check if user exists and is active
-        from ..models.user import User
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or not user.is_active:
+        user = _get_active_user(db, user_id)
+        if not user:
             raise HTTPException(status_code=401, detail="User not found or inactive")
         
         # Generate new token
-        from datetime import datetime, timedelta
+        issued_at = datetime.utcnow()
         new_payload = {
-            "sub": str(user.id),
-            "email": user.email,
-            "exp": datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
-            "iat": datetime.utcnow()
+            "sub": str(user["id"]),
+            "email": user["email"],
+            "exp": issued_at + timedelta(seconds=COOKIE_MAX_AGE),
+            "iat": issued_at
         }
         
-        new_token = jwt.encode(new_payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        new_token = jwt_codec.encode(new_payload, JWT_KEY, algorithm=settings.ALGORITHM)
         
         # Set new token in cookie
         response.set_cookie(
             key="auth_token",
             value=new_token,
-            max_age=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
-            expires=datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
+            max_age=COOKIE_MAX_AGE,
             path="/",
             domain=None,
             secure=not settings.DEBUG,
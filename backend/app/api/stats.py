@@ -1,54 +1,115 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
 from typing import Dict, Any
+from datetime import datetime, timedelta
+from ..database import get_db
+from ..models import IslamicCharacter, User, UserProgress
+from ..cache import cache_result
+from ..services import analytics_views
 
 router = APIRouter()
 
-# Mock data - replace with actual statistics calculation
+# Views and likes are already kept as counter columns on islamic_characters
+# (bumped on write), so the endpoints below read those counters plus one
+# aggregate per table and cache the result briefly.
+
+
+def _character_totals(db: Session):
+    """Character count and summed view/like counters in a single query"""
+    return db.query(
+        func.count(IslamicCharacter.id),
+        func.coalesce(func.sum(IslamicCharacter.views_count), 0),
+        func.coalesce(func.sum(IslamicCharacter.likes_count), 0)
+    ).one()
+
+
+def _progress_totals(db: Session):
+    """Completed lessons and bookmarks across all progress records"""
+    return db.query(
+        func.coalesce(func.sum(case((UserProgress.is_completed == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((UserProgress.bookmarked == True, 1), else_=0)), 0)
+    ).one()
+
+
 @router.get("/")
-async def get_stats() -> Dict[str, Any]:
+@cache_result(expire=60, key_prefix="stats")
+async def get_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Get application statistics"""
+    total_characters, _, _ = _character_totals(db)
+    lessons_completed, _ = _progress_totals(db)
+    top = analytics_views.top_characters(db, limit=1)
     return {
-        "total_characters": 3,
-        "total_users": 1,
-        "total_lessons_completed": 0,
-        "most_popular_character": "محمد صلى الله عليه وسلم"
+        "total_characters": total_characters,
+        "total_users": db.query(func.count(User.id)).scalar(),
+        "total_lessons_completed": int(lessons_completed),
+        "most_popular_character": top[0]["name"] if top else None
     }
 
+
 @router.get("/character/{character_id}")
-async def get_character_stats(character_id: int) -> Dict[str, Any]:
+@cache_result(expire=60, key_prefix="stats")
+async def get_character_stats(character_id: int, db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Get statistics for a specific character"""
+    views, likes = db.query(
+        IslamicCharacter.views_count, IslamicCharacter.likes_count
+    ).filter(IslamicCharacter.id == character_id).first() or (0, 0)
+
+    completions, bookmarks, average_rating = db.query(
+        func.coalesce(func.sum(case((UserProgress.is_completed == True, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((UserProgress.bookmarked == True, 1), else_=0)), 0),
+        func.avg(UserProgress.rating)
+    ).filter(UserProgress.character_id == character_id).one()
+
     return {
         "character_id": character_id,
-        "views": 15000,
-        "likes": 8500,
-        "completions": 120,
-        "bookmarks": 45,
-        "average_rating": 4.8
+        "views": views or 0,
+        "likes": likes or 0,
+        "completions": int(completions),
+        "bookmarks": int(bookmarks),
+        "average_rating": round(float(average_rating), 1) if average_rating is not None else None
     }
 
+
 @router.get("/overall")
-async def get_overall_stats() -> Dict[str, Any]:
+@cache_result(expire=60, key_prefix="stats")
+async def get_overall_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Get overall application statistics"""
+    total_characters, total_views, total_likes = _character_totals(db)
+    lessons_completed, bookmarks = _progress_totals(db)
     return {
-        "total_characters": 3,
-        "total_users": 1,
-        "total_lessons_completed": 0,
-        "total_views": 37000,
-        "total_likes": 20500,
-        "total_bookmarks": 145
+        "total_characters": total_characters,
+        "total_users": db.query(func.count(User.id)).scalar(),
+        "total_lessons_completed": int(lessons_completed),
+        "total_views": int(total_views),
+        "total_likes": int(total_likes),
+        "total_bookmarks": int(bookmarks)
     }
 
+
 @router.get("/progress")
-async def get_progress_stats() -> Dict[str, Any]:
+@cache_result(expire=60, key_prefix="stats")
+async def get_progress_stats(db: Session = Depends(get_db)) -> Dict[str, Any]:
     """Get progress statistics"""
+    now = datetime.utcnow()
+
+    def active_since(days: int):
+        return func.coalesce(func.sum(case((User.last_active >= now - timedelta(days=days), 1), else_=0)), 0)
+
+    daily, weekly, monthly = db.query(active_since(1), active_since(7), active_since(30)).one()
+    completed, average_seconds = db.query(
+        func.count(UserProgress.id), func.avg(UserProgress.time_spent)
+    ).filter(UserProgress.is_completed == True).one()
+
     return {
-        "daily_active_users": 25,
-        "weekly_active_users": 120,
-        "monthly_active_users": 450,
-        "total_completed_lessons": 1250,
-        "average_completion_time": 45
+        "daily_active_users": int(daily),
+        "weekly_active_users": int(weekly),
+        "monthly_active_users": int(monthly),
+        "total_completed_lessons": completed,
+        "average_completion_time": round(float(average_seconds) / 60) if average_seconds else 0
     }
 
+
 @router.get("/user/{user_id}")
 async def get_user_stats(user_id: int) -> Dict[str, Any]:
     """Get statistics for a specific user"""
@@ -1,13 +1,102 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
+import orjson
 from ..database import get_db
 from ..models import IslamicCharacter
 
 router = APIRouter()
 
+# The profile sub-resources below are still placeholder data that only differs
+# by user_id; serialize each once and splice the id in per request
+def _user_body(payload: Dict[str, Any]) -> bytes:
+    """JSON body of a payload, minus its opening brace, for _user_response"""
+    return orjson.dumps(payload)[1:]
+
+def _user_response(user_id: int, body: bytes) -> Response:
+    """Prebuilt body with ``user_id`` as its first field"""
+    return Response(content=b'{"user_id":%d,' % user_id + body, media_type="application/json")
+
+_ACHIEVEMENTS_BODY = _user_body({
+    "total_achievements": 12,
+    "unlocked_achievements": 8,
+    "achievements": [
+        {
+            "id": 1,
+            "name": "أول الخطوات",
+            "description": "أكمل قراءة أول شخصية",
+            "icon": "👣",
+            "unlocked_at": "2024-01-01T10:00:00Z",
+            "points": 10
+        },
+        {
+            "id": 2,
+            "name": "باحث عن العلم",
+            "description": "اقرأ عن 5 صحابة",
+            "icon": "📚",
+            "unlocked_at": "2024-01-05T14:30:00Z",
+            "points": 25
+        },
+        {
+            "id": 3,
+            "name": "حافظ القرآن",
+            "description": "اقرأ 10 قصص تتعلق بالقرآن",
+            "icon": "🕌",
+            "locked": True,
+            "required_progress": 10,
+            "current_progress": 7,
+            "points": 50
+        }
+    ]
+})
+
+_STATISTICS_BODY = _user_body({
+    "reading_stats": {
+        "total_characters_read": 8,
+        "total_reading_time": 240,  # minutes
+        "average_reading_time_per_character": 30,
+        "pages_read": 156,
+        "days_active": 15
+    },
+    "progress_stats": {
+        "completion_rate": 0.75,  # 75%
+        "bookmarks_count": 12,
+        "notes_count": 5,
+        "shares_count": 3
+    },
+    "category_stats": {
+        "الأنبياء": {"read": 2, "total": 5},
+        "الصحابة": {"read": 4, "total": 10},
+        "التابعون": {"read": 1, "total": 8},
+        "العلماء": {"read": 1, "total": 6}
+    },
+    "activity_timeline": [
+        {"date": "2024-01-10", "activity": "completed_character", "count": 1},
+        {"date": "2024-01-09", "activity": "bookmarked", "count": 2},
+        {"date": "2024-01-08", "activity": "reading_time", "count": 45}
+    ]
+})
+
+_RECOMMENDATIONS_BODY = _user_body({
+    "recommendations": [
+        {
+            "character_id": 4,
+            "name": "عثمان بن عفان",
+            "reason": "بناءً على اهتمامك بالخلفاء الراشدين",
+            "similarity_score": 0.9
+        },
+        {
+            "character_id": 5,
+            "name": "علي بن أبي طالب",
+            "reason": "شخصية مرتبطة بالصحابة الذين قرأتهم",
+            "similarity_score": 0.85
+        }
+    ]
+})
+
+
 # Pydantic models
 class UserCreate(BaseModel):
     username: str
@@ -105,70 +194,12 @@ async def get_user_profile(user_id: int, db: Session = Depends(get_db)):
 @router.get("/{user_id}/achievements")
 async def get_user_achievements(user_id: int, db: Session = Depends(get_db)):
     """Get user achievements and badges"""
-    return {
-        "user_id": user_id,
-        "total_achievements": 12,
-        "unlocked_achievements": 8,
-        "achievements": [
-            {
-                "id": 1,
-                "name": "أول الخطوات",
-                "description": "أكمل قراءة أول شخصية",
-                "icon": "👣",
-                "unlocked_at": "2024-01-01T10:00:00Z",
-                "points": 10
-            },
-            {
-                "id": 2,
-                "name": "باحث عن العلم",
-                "description": "اقرأ عن 5 صحابة",
-                "icon": "📚",
-                "unlocked_at": "2024-01-05T14:30:00Z",
-                "points": 25
-            },
-            {
-                "id": 3,
-                "name": "حافظ القرآن",
-                "description": "اقرأ 10 قصص تتعلق بالقرآن",
-                "icon": "🕌",
-                "locked": True,
-                "required_progress": 10,
-                "current_progress": 7,
-                "points": 50
-            }
-        ]
-    }
+    return _user_response(user_id, _ACHIEVEMENTS_BODY)
 
 @router.get("/{user_id}/statistics")
 async def get_user_statistics(user_id: int, db: Session = Depends(get_db)):
     """Get detailed user statistics"""
-    return {
-        "user_id": user_id,
-        "reading_stats": {
-            "total_characters_read": 8,
-            "total_reading_time": 240,  # minutes
-            "average_reading_time_per_character": 30,
-            "pages_read": 156,
-            "days_active": 15
-        },
-        "progress_stats": {
-            "completion_rate": 0.75,  # 75%
-            "bookmarks_count": 12,
-            "notes_count": 5,
-            "shares_count": 3
-        },
-        "category_stats": {
-            "الأنبياء": {"read": 2, "total": 5},
-            "الصحابة": {"read": 4, "total": 10},
-            "التابعون": {"read": 1, "total": 8},
-            "العلماء": {"read": 1, "total": 6}
-        },
-        "activity_timeline": [
-            {"date": "2024-01-10", "activity": "completed_character", "count": 1},
-            {"date": "2024-01-09", "activity": "bookmarked", "count": 2},
-            {"date": "2024-01-08", "activity": "reading_time", "count": 45}
-        ]
-    }
+    return _user_response(user_id, _STATISTICS_BODY)
 
 @router.post("/{user_id}/preferences")
 async def update_user_preferences(
@@ -198,20 +229,4 @@ async def get_user_recommendations(
 ):
     """Get personalized character recommendations"""
     # TODO: Implement recommendation algorithm based on user history
-    return {
-        "user_id": user_id,
-        "recommendations": [
-            {
-                "character_id": 4,
-                "name": "عثمان بن عفان",
-                "reason": "بناءً على اهتمامك بالخلفاء الراشدين",
-                "similarity_score": 0.9
-            },
-            {
-                "character_id": 5,
-                "name": "علي بن أبي طالب",
-                "reason": "شخصية مرتبطة بالصحابة الذين قرأتهم",
-                "similarity_score": 0.85
-            }
-        ]
-    }
+    return _user_response(user_id, _RECOMMENDATIONS_BODY)
@@ -1,60 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 
 from .. import crud, schemas
-from ..database import get_db
-from ..utils.helpers import get_current_user
+from ..database import get_async_db
+from ..security import get_current_user
+from ..utils.query_optimizer import decode_cursor
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.CharacterResponse])
-def read_characters(
-    skip: int = 0,
+async def read_characters(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page"),
     limit: int = 100,
     category: Optional[str] = Query(None, description="Filter by category"),
     era: Optional[str] = Query(None, description="Filter by era"),
     featured: Optional[bool] = Query(None, description="Filter featured characters"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get list of Islamic characters with optional filters
+    
+    The cursor for the next page is returned in the X-Next-Cursor header.
     """
-    characters = crud.get_characters(
-        db, skip=skip, limit=limit,
-        category=category, era=era, featured=featured
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor, "name")
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    characters, next_cursor = await crud.get_characters(
+        db, limit=limit,
+        category=category, era=era, featured=featured, after=after
     )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return characters
 
 @router.get("/search/", response_model=List[schemas.CharacterResponse])
-def search_characters(
+async def search_characters(
     q: str = Query(..., min_length=2, description="Search query"),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Search characters by name or description
     """
-    characters = crud.search_characters(db, query=q, limit=limit)
+    characters = await crud.search_characters(db, query=q, limit=limit)
     return characters
 
 @router.get("/{character_id}", response_model=schemas.CharacterDetailResponse)
-def read_character(
+async def read_character(
     character_id: int = Path(..., gt=0, description="Character ID"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get detailed information about a specific character
     """
-    character = crud.get_character(db, character_id=character_id)
+    character = await crud.get_character(db, character_id=character_id)
     if character is None:
         raise HTTPException(status_code=404, detail="Character not found")
     return character
 
 @router.post("/", response_model=schemas.CharacterResponse)
-def create_character(
+async def create_character(
     character: schemas.CharacterCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
     """
@@ -63,14 +76,14 @@ def create_character(
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_character = crud.create_character(db=db, character=character)
+    db_character = await crud.create_character(db=db, character=character)
     return db_character
 
 @router.put("/{character_id}", response_model=schemas.CharacterResponse)
-def update_character(
+async def update_character(
     character_id: int,
     character_update: schemas.CharacterUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
     """
@@ -79,7 +92,7 @@ def update_character(
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    db_character = crud.update_character(
+    db_character = await crud.update_character(
         db=db, character_id=character_id, character_update=character_update
     )
     if db_character is None:
@@ -87,9 +100,9 @@ def update_character(
     return db_character
 
 @router.delete("/{character_id}")
-def delete_character(
+async def delete_character(
     character_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.UserResponse = Depends(get_current_user)
 ):
     """
@@ -98,27 +111,20 @@ def delete_character(
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    success = crud.delete_character(db=db, character_id=character_id)
+    success = await crud.delete_character(db=db, character_id=character_id)
     if not success:
         raise HTTPException(status_code=404, detail="Character not found")
     return {"message": "Character deleted successfully"}
 
 @router.get("/{character_id}/related", response_model=List[schemas.CharacterResponse])
-def get_related_characters(
+async def get_related_characters(
     character_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Get characters related to the specified character
     """
-    character = crud.get_character(db, character_id=character_id)
-    if character is None:
+    related = await crud.get_related_characters(db, character_id=character_id)
+    if related is None:
         raise HTTPException(status_code=404, detail="Character not found")
-    
-    related_ids = character.related_characters or []
-    if not related_ids:
-        return []
-    
-    return db.query(models.IslamicCharacter).filter(
-        models.IslamicCharacter.id.in_(related_ids)
-    ).all()
\ No newline at end of file
+    return related
\ No newline at end of file
@@ -2,11 +2,17 @@
 In-memory caching utilities using cachetools.
 """
 
-import time
 import asyncio
-from typing import Any, Optional, Callable, TypeVar, cast, Union
+import inspect
+import typing
+from typing import Any, Dict, List, Optional, Callable, TypeVar, cast, Union, NamedTuple
 from functools import wraps
-from cachetools import TTLCache, cached
+from cachetools import TLRUCache, cached
+from pydantic import BaseModel
+import orjson
+import hashlib
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 from .config import settings
 from .logging_config import get_logger
 
@@ -15,12 +21,19 @@ logger = get_logger(__name__)
 # Type variable for generic function typing
 F = TypeVar('F', bound=Callable[..., Any])
 
+class _Entry(NamedTuple):
+    """Cached value together with its own time-to-live"""
+    value: Any
+    ttl: float
+
 class CacheManager:
     """In-memory cache manager using cachetools"""
     
     def __init__(self, maxsize: int = 1000, ttl: int = 300):
         """Initialize the cache with max size and default TTL"""
-        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._ttl = ttl
+        # Each entry expires after its own ttl, so expire= may exceed the default
+        self._cache = TLRUCache(maxsize=maxsize, ttu=lambda key, entry, now: now + entry.ttl)
         logger.info("In-memory cache initialized")
     
     def is_available(self) -> bool:
@@ -28,9 +41,10 @@ class CacheManager:
         return True
     
     def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
+        """Get value from cache, honouring any per-item expiry set via set()"""
         try:
-            return self._cache.get(key)
+            entry = self._cache.get(key)
+            return None if entry is None else entry.value
         except Exception as e:
             logger.error(f"Cache get error for key {key}: {e}")
             return None
@@ -38,25 +52,24 @@ class CacheManager:
     def set(self, key: str, value: Any, expire: Optional[int] = None) -> bool:
         """Set value in cache with optional expiration"""
         try:
-            self._cache[key] = value
-            if expire is not None:
-                # cachetools doesn't support per-item TTL, so we'll store the expiry time
-                # and check it in get()
-                self._cache[f"_expiry_{key}"] = time.time() + expire
+            self._cache[key] = _Entry(value, self._ttl if expire is None else expire)
             return True
         except Exception as e:
             logger.error(f"Cache set error for key {key}: {e}")
             return False
     
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values in one call, in key order (None for misses)"""
+        return [self.get(key) for key in keys]
+    
+    def set_many(self, mapping: Dict[str, Any], expire: Optional[int] = None) -> bool:
+        """Set several values with the same optional expiration"""
+        return all([self.set(key, value, expire=expire) for key, value in mapping.items()])
+    
     def delete(self, key: str) -> bool:
         """Delete key from cache"""
         try:
-            if key in self._cache:
-                del self._cache[key]
-                # Also clean up any expiry entry
-                expiry_key = f"_expiry_{key}"
-                if expiry_key in self._cache:
-                    del self._cache[expiry_key]
+            self._cache.pop(key, None)
             return True
         except Exception as e:
             logger.error(f"Cache delete error for key {key}: {e}")
@@ -65,32 +78,26 @@ class CacheManager:
     def clear_pattern(self, pattern: str) -> int:
         """Clear all keys matching pattern (supports simple * wildcard)"""
         try:
-            count = 0
-            keys_to_delete = []
-            
             # Convert pattern to startswith/endswith for simple patterns
             if pattern.endswith('*'):
                 prefix = pattern[:-1]
-                keys_to_delete = [k for k in self._cache if k.startswith(prefix)]
+                matches = lambda k: k.startswith(prefix)
             elif pattern.startswith('*'):
                 suffix = pattern[1:]
-                keys_to_delete = [k for k in self._cache if k.endswith(suffix)]
+                matches = lambda k: k.endswith(suffix)
             else:
-                # Exact match
-                if pattern in self._cache:
-                    keys_to_delete = [pattern]
+                # Exact match: no need to walk the cache
+                matches = None
+            
+            keys_to_delete = [pattern] if matches is None else [k for k in list(self._cache) if matches(k)]
             
-            # Delete the keys
+            # pop() rather than del: an entry can expire between the scan and
+            # the delete, which must not abort the rest of the invalidation
+            count = 0
             for key in keys_to_delete:
-                del self._cache[key]
-                count += 1
-                
-                # Also clean up any expiry entry
-                if not key.startswith('_expiry_'):
-                    expiry_key = f"_expiry_{key}"
-                    if expiry_key in self._cache:
-                        del self._cache[expiry_key]
-                        
+                if self._cache.pop(key, None) is not None:
+                    count += 1
+            
             return count
         except Exception as e:
             logger.error(f"Cache clear pattern error for {pattern}: {e}")
@@ -107,77 +114,145 @@ class CacheManager:
 # Global cache instance (1000 items max, 5 minutes default TTL)
 cache = CacheManager(maxsize=1000, ttl=300)
 
+def dump_json(model: BaseModel) -> bytes:
+    """Serialize a response model to JSON bytes once, so cache hits skip re-encoding"""
+    return orjson.dumps(model.model_dump())
+
+class CachedBody(NamedTuple):
+    """Pre-serialized JSON body together with its entity id and ETag"""
+    id: int
+    etag: str
+    body: bytes
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag derived from the given version parts"""
+    digest = hashlib.md5(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header value covers the given ETag"""
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
+
 def cache_key(*parts: str) -> str:
     """Generate consistent cache key from parts"""
     return ":".join(str(part) for part in parts)
 
-def cache_result(expire: int = 300, key_prefix: str = "") -> Callable[[F], F]:
-    """Decorator for caching function results with TTL"""
+# Longer keys are replaced by a digest so large arguments don't bloat the cache;
+# the prefix and function name stay readable for pattern invalidation
+MAX_CACHE_KEY_LENGTH = 200
+
+# Computations in progress for async cache_result keys; concurrent misses on
+# the same key wait for the first one instead of running the function again
+_inflight: Dict[str, asyncio.Future] = {}
+
+def _key_part(value: Any) -> str:
+    """String form of an argument for a cache key; dicts and lists are canonical JSON"""
+    if isinstance(value, (dict, list)):
+        try:
+            return orjson.dumps(value, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass
+    return str(value)
+
+def _annotations(func: Callable) -> dict:
+    """Resolved parameter annotations of a function (raw ones if they can't be resolved)"""
+    try:
+        return typing.get_type_hints(func)
+    except Exception:
+        return getattr(func, "__annotations__", {})
+
+def cache_result(
+    expire: int = 300,
+    key_prefix: str = "",
+    key_builder: Optional[Callable[..., str]] = None
+) -> Callable[[F], F]:
+    """Decorator for caching function results with TTL
+
+    ``key_builder``, when given, is called with the function's arguments and
+    returns the complete cache key, replacing the generic argument encoding.
+    Parameters annotated as a SQLAlchemy ``Session`` or ``AsyncSession`` are
+    left out of the key.
+    """
     def decorator(func: F) -> F:
-        @wraps(func)
-        async def async_wrapper(*args, **kwargs):
-            # Generate cache key
-            key_parts = [key_prefix, func.__name__]
-            
-            # Add relevant args to key
+        # Everything that doesn't depend on the call is worked out once here:
+        # the key prefix, and which parameters are DB sessions (they differ
+        # per request, so they stay out of the key)
+        base_key = cache_key(key_prefix, func.__name__)
+        session_params = frozenset(
+            name for name, annotation in _annotations(func).items()
+            if isinstance(annotation, type) and issubclass(annotation, (Session, AsyncSession))
+        )
+        session_positions = frozenset(
+            position for position, name in enumerate(inspect.signature(func).parameters)
+            if name in session_params
+        )
+        
+        def build_key(args: tuple, kwargs: dict) -> str:
+            if key_builder is not None:
+                return key_builder(*args, **kwargs)
+            key_parts = [base_key]
             if args:
-                key_parts.extend(str(arg) for arg in args)
+                key_parts.extend(_key_part(arg) for position, arg in enumerate(args) if position not in session_positions)
             if kwargs:
-                key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
+                key_parts.extend(f"{k}={_key_part(v)}" for k, v in sorted(kwargs.items()) if k not in session_params)
             
-            cache_key_str = cache_key(*key_parts)
+            key = ":".join(key_parts)
+            if len(key) > MAX_CACHE_KEY_LENGTH:
+                digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+                key = cache_key(base_key, "h", digest)
+            return key
+        
+        @wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            cache_key_str = build_key(args, kwargs)
             
-            # Check cache first
-            cached_result = cache.get(cache_key_str)
-            if cached_result is not None:
-                # Check if the item has expired
-                expiry_key = f"_expiry_{cache_key_str}"
-                expiry_time = cache.get(expiry_key)
-                if expiry_time is None or time.time() < expiry_time:
+            while True:
+                # cache.get() already drops entries past their expiry
+                cached_result = cache.get(cache_key_str)
+                if cached_result is not None:
                     return cached_result
-                # If expired, remove it
-                cache.delete(cache_key_str)
-            
-            # Call function if not in cache or expired
-            result = await func(*args, **kwargs)
-            
-            # Cache the result with TTL
-            cache.set(cache_key_str, result)
-            if expire is not None:
-                cache.set(f"_expiry_{cache_key_str}", time.time() + expire)
+                
+                pending = _inflight.get(cache_key_str)
+                if pending is None:
+                    break
+                # wait() doesn't cancel the shared future when this waiter is
+                # cancelled, nor raise when the leading call was
+                await asyncio.wait((pending,))
+                if not pending.cancelled():
+                    return pending.result()
+                # The leading call was cancelled (e.g. its client went away):
+                # look again and compute the value here if nobody else has
             
-            return result
+            pending = _inflight[cache_key_str] = asyncio.get_running_loop().create_future()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                pending.set_exception(e)
+                # Mark it retrieved so a miss nobody waited on isn't logged again
+                pending.exception()
+                raise
+            except BaseException:
+                pending.cancel()
+                raise
+            else:
+                cache.set(cache_key_str, result, expire=expire)
+                pending.set_result(result)
+                return result
+            finally:
+                del _inflight[cache_key_str]
         
-        # For sync functions, use cachetools directly
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            key_parts = [key_prefix, func.__name__]
-            if args:
-                key_parts.extend(str(arg) for arg in args)
-            if kwargs:
-                key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
+            cache_key_str = build_key(args, kwargs)
             
-            cache_key_str = cache_key(*key_parts)
-            
-            # Check cache first
             cached_result = cache.get(cache_key_str)
             if cached_result is not None:
-                # Check if the item has expired
-                expiry_key = f"_expiry_{cache_key_str}"
-                expiry_time = cache.get(expiry_key)
-                if expiry_time is None or time.time() < expiry_time:
-                    return cached_result
-                # If expired, remove it
-                cache.delete(cache_key_str)
+                return cached_result
             
-            # Call function if not in cache or expired
             result = func(*args, **kwargs)
-            
-            # Cache the result with TTL
-            cache.set(cache_key_str, result)
-            if expire is not None:
-                cache.set(f"_expiry_{cache_key_str}", time.time() + expire)
-            
+            cache.set(cache_key_str, result, expire=expire)
             return result
         
         # Return the appropriate wrapper based on whether the function is async
@@ -218,6 +293,21 @@ class CharacterCache:
         """Generate cache key for character detail"""
         return cache_key("character", "detail", str(character_id))
     
+    @staticmethod
+    def get_character_item_key(character_id: Union[str, int]) -> str:
+        """Generate cache key for a character's list-item representation"""
+        return cache_key("character", "item", str(character_id))
+    
+    @staticmethod
+    def get_character_slug_key(slug: str) -> str:
+        """Generate cache key for a character row looked up by slug"""
+        return cache_key("character", "slug", slug)
+    
+    @staticmethod
+    def get_related_ids_key(character_id: Union[str, int]) -> str:
+        """Generate cache key for the related-character id list of a character"""
+        return cache_key("character", "related", str(character_id))
+    
     @staticmethod
     def get_search_key(query: str, category: str = None) -> str:
         """Generate cache key for search results"""
@@ -256,6 +346,14 @@ def invalidate_character_cache(character_id: Union[str, int] = None):
     for pattern in patterns:
         invalidate_cache_pattern(pattern)
 
+def invalidate_analytics_cache():
+    """Invalidate cached analytics responses (call after recording analytics events)"""
+    invalidate_cache_pattern("analytics:*")
+
+def invalidate_user_cache(user_id: Union[str, int]):
+    """Invalidate the cached auth lookup for a user (call after changing the user row)"""
+    invalidate_cache_pattern(cache_key("auth", "user", user_id))
+
 def invalidate_progress_cache(user_id: int = None, character_id: Union[str, int] = None):
     """Invalidate progress-related cache entries"""
     patterns = ["progress:*"]
@@ -6,6 +6,9 @@ class Settings(BaseSettings):
     # Database
     DATABASE_URL: str = "sqlite:///./on_their_footsteps.db"
     DATABASE_TEST_URL: str = "sqlite:///./test.db"
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_PREPARE_THRESHOLD: int = 5  # psycopg 3: server-side prepare after N executions
     
     # Security
     SECRET_KEY: str = secrets.token_urlsafe(32)  # Generate secure key if not provided
@@ -24,11 +27,26 @@ class Settings(BaseSettings):
     HOST: Optional[str] = "0.0.0.0"
     PORT: Optional[int] = 8000
     LOG_LEVEL: Optional[str] = "INFO"
+    # Polling endpoints (health checks, metric scrapes) left out of the request log
+    LOG_EXCLUDE_PATHS: List[str] = ["/api/health", "/api/metrics", "/api/metrics/prometheus"]
+    # Log collector (rsyslog/Fluent Bit) receiving JSON lines over UDP; when set,
+    # only errors are still written to local files
+    LOG_REMOTE_HOST: Optional[str] = None
+    LOG_REMOTE_PORT: Optional[int] = 5140
     
     # Upload
     UPLOAD_DIR: Optional[str] = "./static/uploads"
     MAX_FILE_SIZE: Optional[int] = 10 * 1024 * 1024  # 10MB
     ALLOWED_IMAGE_TYPES: Optional[List[str]] = ["image/jpeg", "image/png", "image/webp"]
+    # Internal nginx location aliased to the uploads directory; when set, uploaded
+    # files are handed to nginx with X-Accel-Redirect instead of streamed by the app
+    MEDIA_ACCEL_REDIRECT_PREFIX: Optional[str] = None  # e.g. "/internal-uploads/"
+    # Set when a reverse proxy serves /static from disk itself; the app then
+    # doesn't mount its own static files route
+    BEHIND_PROXY: Optional[bool] = False
+    
+    # Recommendations
+    SIMILARITY_INDEX_DIR: Optional[str] = "./data/similarity"
     
     # Redis
     REDIS_URL: Optional[str] = "redis://localhost:6379"
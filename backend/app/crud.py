@@ -1,58 +1,176 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import Optional, List, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, load_only, raiseload, undefer_group
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import Integer, case, func, literal_column, desc, select, text, true, tuple_, update
+from typing import Optional, List, Dict, Any, Tuple
 from . import models, schemas
-from .utils.validators import validate_character_data
+from .cache import CharacterCache, cache, cache_result, invalidate_character_cache
+from .services import view_counter
+from .utils.query_optimizer import CHARACTER_LIST_COLUMNS, encode_cursor
+from .utils.validators import InputValidator
+
+# List items are cached per character; writers clear them via invalidate_character_cache
+CHARACTER_ITEM_TTL = 60
+
+def loaded(stmt, *loaders):
+    """Apply explicit loader options and make any other lazy load raise.
+
+    List queries go through this so a response that touches an undeclared
+    relationship fails loudly instead of issuing one SELECT per row.
+    """
+    return stmt.options(*loaders, raiseload("*"))
+
+def character_list(stmt):
+    """Load only the columns a character list item serializes."""
+    return loaded(stmt, load_only(*CHARACTER_LIST_COLUMNS))
 
 # Character CRUD Operations
-def get_characters(
-    db: Session,
-    skip: int = 0,
+async def get_characters(
+    db: AsyncSession,
     limit: int = 100,
     category: Optional[str] = None,
     era: Optional[str] = None,
-    featured: Optional[bool] = None
-) -> List[models.IslamicCharacter]:
-    query = db.query(models.IslamicCharacter)
+    featured: Optional[bool] = None,
+    after: Optional[Tuple[str, int]] = None
+) -> Tuple[List[models.IslamicCharacter], Optional[str]]:
+    """Characters ordered by (name, id), seeking past the ``after`` key.
+
+    Returns the page and the cursor of its last row (None on the last page).
+    """
+    stmt = character_list(select(models.IslamicCharacter))
     
     if category:
-        query = query.filter(models.IslamicCharacter.category == category)
+        stmt = stmt.where(models.IslamicCharacter.category == category)
     if era:
-        query = query.filter(models.IslamicCharacter.era == era)
+        stmt = stmt.where(models.IslamicCharacter.era == era)
     if featured is not None:
-        query = query.filter(models.IslamicCharacter.is_featured == featured)
+        stmt = stmt.where(models.IslamicCharacter.is_featured == featured)
+    if after is not None:
+        stmt = stmt.where(tuple_(models.IslamicCharacter.name, models.IslamicCharacter.id) > tuple_(*after))
     
-    return query.order_by(models.IslamicCharacter.name).offset(skip).limit(limit).all()
+    # Fetch one extra row to learn whether another page exists
+    stmt = stmt.order_by(models.IslamicCharacter.name, models.IslamicCharacter.id).limit(limit + 1)
+    rows = (await db.execute(stmt)).scalars().all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].name, rows[-1].id)
 
-def get_character(db: Session, character_id: int) -> Optional[models.IslamicCharacter]:
-    character = db.query(models.IslamicCharacter).filter(
-        models.IslamicCharacter.id == character_id
-    ).first()
+async def get_character(db: AsyncSession, character_id: int) -> Optional[models.IslamicCharacter]:
+    # Detail responses read the deferred content and media columns; load them
+    # up front since async sessions can't lazy-load on attribute access
+    stmt = select(models.IslamicCharacter).options(
+        undefer_group('content'), undefer_group('media')
+    ).where(models.IslamicCharacter.id == character_id).execution_options(populate_existing=True)
+    character = (await db.execute(stmt)).scalar_one_or_none()
     
     if character:
-        # Increment view count
-        character.views_count += 1
-        db.commit()
-        db.refresh(character)
+        # Count the view in the batched counter instead of writing the row;
+        # report it right away without marking the instance dirty
+        await view_counter.bump(character_id)
+        set_committed_value(
+            character, "views_count", (character.views_count or 0) + view_counter.pending(character_id)
+        )
     
     return character
 
-def create_character(db: Session, character: schemas.CharacterCreate) -> models.IslamicCharacter:
+async def get_characters_by_ids(db: AsyncSession, character_ids: List[int]) -> List[Dict[str, Any]]:
+    """List-item dicts for the given ids, in order; unknown ids are skipped.
+
+    Looks every id up in the cache in one batch and loads only the misses,
+    with a single IN query, writing them back in one batch as well.
+    """
+    keys = [CharacterCache.get_character_item_key(character_id) for character_id in character_ids]
+    items = dict(zip(character_ids, cache.get_many(keys)))
+    missing = [character_id for character_id, item in items.items() if item is None]
+    if missing:
+        stmt = character_list(select(models.IslamicCharacter).where(models.IslamicCharacter.id.in_(missing)))
+        fetched = {
+            row.id: schemas.CharacterResponse.model_validate(row).model_dump()
+            for row in (await db.execute(stmt)).scalars()
+        }
+        cache.set_many(
+            {CharacterCache.get_character_item_key(character_id): item for character_id, item in fetched.items()},
+            expire=CHARACTER_ITEM_TTL
+        )
+        items.update(fetched)
+    return [items[character_id] for character_id in character_ids if items.get(character_id) is not None]
+
+def _related_rows_stmt(db: AsyncSession, character_id: int):
+    """One statement returning a character's related characters in list order.
+
+    The parent's related_characters JSON array is expanded in SQL and joined
+    back to islamic_characters, so neither the parent row nor a separate id
+    list has to come back to Python first.
+    """
+    parent = aliased(models.IslamicCharacter)
+    postgresql = db.get_bind().dialect.name == "postgresql"
+    # A JSON null or scalar is expanded as an empty array: PostgreSQL rejects
+    # it ("cannot extract elements from a scalar") and SQLite would yield the
+    # scalar itself as an id
+    json_type = func.json_typeof if postgresql else func.json_type
+    related = case(
+        (json_type(parent.related_characters) == "array", parent.related_characters),
+        else_=literal_column("'[]'")
+    )
+    if postgresql:
+        elements = func.json_array_elements_text(related).table_valued(
+            "value", with_ordinality="position"
+        ).render_derived()
+        related_id, position = elements.c.value.cast(Integer), elements.c.position
+    else:
+        elements = func.json_each(related).table_valued("value", "key")
+        related_id, position = elements.c.value, elements.c.key
+    
+    return character_list(
+        select(models.IslamicCharacter)
+        .select_from(parent)
+        .join(elements, true())
+        .join(models.IslamicCharacter, models.IslamicCharacter.id == related_id)
+        .where(parent.id == character_id)
+        .order_by(position)
+    )
+
+async def get_related_characters(db: AsyncSession, character_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Characters listed in a character's related_characters, or None if it doesn't exist.
+
+    The related id list is cached next to the list items, so a warm lookup
+    issues no query; a cold one loads the related rows in a single statement
+    (no parent content load, no view bump).
+    """
+    ids_key = CharacterCache.get_related_ids_key(character_id)
+    related_ids = cache.get(ids_key)
+    if related_ids is not None:
+        return await get_characters_by_ids(db, related_ids)
+    
+    rows = (await db.execute(_related_rows_stmt(db, character_id))).scalars().all()
+    if not rows and await db.get(models.IslamicCharacter, character_id) is None:
+        return None
+    
+    items = [schemas.CharacterResponse.model_validate(row).model_dump() for row in rows]
+    cache.set_many(
+        {CharacterCache.get_character_item_key(item["id"]): item for item in items},
+        expire=CHARACTER_ITEM_TTL
+    )
+    cache.set(ids_key, [item["id"] for item in items], expire=CHARACTER_ITEM_TTL)
+    return items
+
+async def create_character(db: AsyncSession, character: schemas.CharacterCreate) -> models.IslamicCharacter:
     # Validate data
-    validate_character_data(character.dict())
+    InputValidator.validate_character_data(character.dict())
     
     db_character = models.IslamicCharacter(**character.dict())
     db.add(db_character)
-    db.commit()
-    db.refresh(db_character)
+    await db.commit()
+    await db.refresh(db_character)
     return db_character
 
-def update_character(
-    db: Session,
+async def update_character(
+    db: AsyncSession,
     character_id: int,
     character_update: schemas.CharacterUpdate
 ) -> Optional[models.IslamicCharacter]:
-    db_character = get_character(db, character_id)
+    db_character = await db.get(models.IslamicCharacter, character_id)
     if not db_character:
         return None
     
@@ -60,39 +178,86 @@ def update_character(
     for field, value in update_data.items():
         setattr(db_character, field, value)
     
-    db.commit()
-    db.refresh(db_character)
+    await db.commit()
+    await db.refresh(db_character)
+    invalidate_character_cache(character_id)
     return db_character
 
-def delete_character(db: Session, character_id: int) -> bool:
-    db_character = get_character(db, character_id)
+async def delete_character(db: AsyncSession, character_id: int) -> bool:
+    db_character = await db.get(models.IslamicCharacter, character_id)
     if not db_character:
         return False
     
-    db.delete(db_character)
-    db.commit()
+    await db.delete(db_character)
+    await db.commit()
+    invalidate_character_cache(character_id)
     return True
 
-def search_characters(db: Session, query: str, limit: int = 20) -> List[models.IslamicCharacter]:
-    return db.query(models.IslamicCharacter).filter(
-        models.IslamicCharacter.name.ilike(f"%{query}%") |
-        models.IslamicCharacter.arabic_name.ilike(f"%{query}%") |
-        models.IslamicCharacter.description.ilike(f"%{query}%")
-    ).limit(limit).all()
+async def search_characters(db: AsyncSession, query: str, limit: int = 20) -> List[models.IslamicCharacter]:
+    pattern = f"%{query}%"
+    if db.get_bind().dialect.name == "postgresql":
+        # Substring matches on the names use the trigram index (migration 011);
+        # description goes through the search_tsv GIN index (migration 007)
+        stmt = select(models.IslamicCharacter).where(
+            models.IslamicCharacter.name.ilike(pattern) |
+            models.IslamicCharacter.arabic_name.ilike(pattern) |
+            text("search_tsv @@ plainto_tsquery('simple', :q)")
+        ).order_by(
+            func.greatest(
+                func.similarity(models.IslamicCharacter.name, query),
+                func.similarity(models.IslamicCharacter.arabic_name, query)
+            ).desc(),
+            models.IslamicCharacter.id
+        ).params(q=query)
+    else:
+        stmt = select(models.IslamicCharacter).where(
+            models.IslamicCharacter.name.ilike(pattern) |
+            models.IslamicCharacter.arabic_name.ilike(pattern) |
+            models.IslamicCharacter.description.ilike(pattern)
+        )
+    return (await db.execute(character_list(stmt.limit(limit)))).scalars().all()
 
 # User Progress CRUD
-def get_user_progress(db: Session, user_id: int, character_id: int) -> Optional[models.UserProgress]:
-    return db.query(models.UserProgress).filter(
+async def get_user_progress(db: AsyncSession, user_id: int, character_id: int) -> Optional[models.UserProgress]:
+    stmt = select(models.UserProgress).where(
         models.UserProgress.user_id == user_id,
         models.UserProgress.character_id == character_id
-    ).first()
+    ).limit(1)
+    return (await db.execute(stmt)).scalars().first()
 
-def create_or_update_progress(
-    db: Session,
+async def get_user_progress_list(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 50,
+    completed: Optional[bool] = None,
+    bookmarked: Optional[bool] = None,
+    after: Optional[Tuple[int, int]] = None
+) -> Tuple[List[models.UserProgress], Optional[str]]:
+    """A user's progress records ordered by (character_id, id), seeking past ``after``."""
+    stmt = loaded(select(models.UserProgress).where(
+        models.UserProgress.user_id == user_id
+    ))
+    
+    if completed is not None:
+        stmt = stmt.where(models.UserProgress.is_completed == completed)
+    if bookmarked is not None:
+        stmt = stmt.where(models.UserProgress.bookmarked == bookmarked)
+    if after is not None:
+        stmt = stmt.where(tuple_(models.UserProgress.character_id, models.UserProgress.id) > tuple_(*after))
+    
+    stmt = stmt.order_by(models.UserProgress.character_id, models.UserProgress.id).limit(limit + 1)
+    rows = (await db.execute(stmt)).scalars().all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].character_id, rows[-1].id)
+
+async def create_or_update_progress(
+    db: AsyncSession,
     user_id: int,
     progress: schemas.ProgressCreate
 ) -> models.UserProgress:
-    db_progress = get_user_progress(db, user_id, progress.character_id)
+    db_progress = await get_user_progress(db, user_id, progress.character_id)
     
     if db_progress:
         # Update existing progress
@@ -111,41 +276,66 @@ def create_or_update_progress(
         )
         db.add(db_progress)
     
-    db.commit()
-    db.refresh(db_progress)
+    await db.commit()
+    await db.refresh(db_progress)
     return db_progress
 
-def get_user_progress_summary(db: Session, user_id: int) -> Dict[str, Any]:
-    progress = db.query(models.UserProgress).filter(
-        models.UserProgress.user_id == user_id
-    ).all()
+async def update_progress_details(
+    db: AsyncSession,
+    user_id: int,
+    character_id: int,
+    progress_update: schemas.ProgressUpdate
+) -> Optional[models.UserProgress]:
+    """Apply the set fields in one UPDATE ... RETURNING; None if there is no such record."""
+    update_data = progress_update.dict(exclude_unset=True)
+    if not update_data:
+        return await get_user_progress(db, user_id, character_id)
     
-    total_completed = sum(1 for p in progress if p.is_completed)
-    total_time = sum(p.time_spent for p in progress)
-    total_bookmarks = sum(1 for p in progress if p.bookmarked)
+    stmt = update(models.UserProgress).where(
+        models.UserProgress.user_id == user_id,
+        models.UserProgress.character_id == character_id
+    ).values(**update_data).returning(models.UserProgress).execution_options(populate_existing=True)
+    progress = (await db.execute(stmt)).scalars().first()
+    await db.commit()
+    return progress
+
+async def get_user_progress_summary(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    stmt = select(
+        func.count(models.UserProgress.id).label("started"),
+        func.coalesce(func.sum(case((models.UserProgress.is_completed == True, 1), else_=0)), 0).label("completed"),
+        func.coalesce(func.sum(models.UserProgress.time_spent), 0).label("time_spent"),
+        func.coalesce(func.sum(case((models.UserProgress.bookmarked == True, 1), else_=0)), 0).label("bookmarks")
+    ).where(models.UserProgress.user_id == user_id)
+    row = (await db.execute(stmt)).one()
     
     return {
-        "total_stories_started": len(progress),
-        "total_stories_completed": total_completed,
-        "total_time_spent_minutes": total_time // 60,
-        "total_bookmarks": total_bookmarks,
-        "completion_rate": (total_completed / len(progress) * 100) if progress else 0
+        "total_stories_started": row.started,
+        "total_stories_completed": int(row.completed),
+        "total_time_spent_minutes": int(row.time_spent) // 60,
+        "total_bookmarks": int(row.bookmarks),
+        "completion_rate": (row.completed / row.started * 100) if row.started else 0
     }
 
 # Statistics
-def get_application_stats(db: Session) -> Dict[str, Any]:
-    total_characters = db.query(func.count(models.IslamicCharacter.id)).scalar()
-    total_users = db.query(func.count(models.User.id)).scalar()
-    total_progress = db.query(func.count(models.UserProgress.id)).scalar()
+@cache_result(expire=60, key_prefix="stats")
+async def get_application_stats(db: AsyncSession) -> Dict[str, Any]:
+    """Totals and the most viewed characters, cached for a minute."""
+    totals = (await db.execute(select(
+        select(func.count(models.IslamicCharacter.id)).scalar_subquery().label("characters"),
+        select(func.count(models.User.id)).scalar_subquery().label("users"),
+        select(func.count(models.UserProgress.id)).scalar_subquery().label("progress")
+    ))).one()
     
-    most_viewed = db.query(models.IslamicCharacter).order_by(
-        desc(models.IslamicCharacter.views_count)
-    ).limit(5).all()
+    most_viewed = (await db.execute(
+        select(
+            models.IslamicCharacter.id, models.IslamicCharacter.name, models.IslamicCharacter.views_count
+        ).order_by(desc(models.IslamicCharacter.views_count)).limit(5)
+    )).all()
     
     return {
-        "total_characters": total_characters or 0,
-        "total_users": total_users or 0,
-        "total_stories_started": total_progress or 0,
+        "total_characters": totals.characters or 0,
+        "total_users": totals.users or 0,
+        "total_stories_started": totals.progress or 0,
         "most_viewed_characters": [
             {
                 "id": char.id,
@@ -157,7 +347,8 @@ def get_application_stats(db: Session) -> Dict[str, Any]:
     }
 
 # Categories
-def get_categories(db: Session) -> List[models.ContentCategory]:
-    return db.query(models.ContentCategory).filter(
+async def get_categories(db: AsyncSession) -> List[models.ContentCategory]:
+    stmt = select(models.ContentCategory).where(
         models.ContentCategory.is_active == True
-    ).order_by(models.ContentCategory.sort_order).all()
\ No newline at end of file
+    ).order_by(models.ContentCategory.sort_order)
+    return (await db.execute(stmt)).scalars().all()
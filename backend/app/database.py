@@ -1,24 +1,106 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
 
+# Prefer the psycopg 3 driver for PostgreSQL when it is installed: it keeps
+# server-side prepared statements for hot queries; psycopg2 stays the fallback
+try:
+    import psycopg  # noqa: F401
+    PSYCOPG3_AVAILABLE = True
+except ImportError:
+    PSYCOPG3_AVAILABLE = False
+
+
+def _engine_url(url: str) -> str:
+    """Route plain postgresql:// URLs to psycopg 3 when available."""
+    if PSYCOPG3_AVAILABLE and url.startswith(("postgresql://", "postgres://")):
+        return "postgresql+psycopg://" + url.split("://", 1)[1]
+    return url
+
+
+def _async_engine_url(url: str) -> str:
+    """Map the configured URL onto its asyncio driver (asyncpg / aiosqlite)."""
+    scheme, rest = url.split("://", 1)
+    if scheme.startswith(("postgresql", "postgres")):
+        return "postgresql+asyncpg://" + rest
+    if scheme.startswith("sqlite"):
+        return "sqlite+aiosqlite://" + rest
+    return url
+
+
+DATABASE_URL = _engine_url(settings.DATABASE_URL)
+ASYNC_DATABASE_URL = _async_engine_url(settings.DATABASE_URL)
+
+# Per-connection SQLite settings: WAL lets readers run alongside a writer,
+# NORMAL sync is durable enough under WAL, and a larger page cache plus
+# mmap keep hot pages in memory for the life of the pooled connection
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in SQLITE_PRAGMAS:
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+# A file database keeps a small pool of warm connections (in-memory ones
+# keep SQLAlchemy's single shared connection)
+SQLITE_FILE_DB = 'sqlite' in DATABASE_URL and ":memory:" not in DATABASE_URL and not DATABASE_URL.endswith("://")
+SQLITE_POOL = {"pool_size": 5, "max_overflow": 10} if SQLITE_FILE_DB else {}
+
 # Create SQLAlchemy engine with SQLite configuration
-if 'sqlite' in settings.DATABASE_URL:
-    # SQLite configuration - disable connection pooling
+if 'sqlite' in DATABASE_URL:
     engine = create_engine(
-        settings.DATABASE_URL,
+        DATABASE_URL,
         connect_args={"check_same_thread": False},
-        pool_pre_ping=True
+        pool_pre_ping=True,
+        **SQLITE_POOL
     )
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 else:
     # For other databases, use connection pooling
+    connect_args = {}
+    if DATABASE_URL.startswith("postgresql+psycopg://"):
+        connect_args["prepare_threshold"] = settings.DB_PREPARE_THRESHOLD
     engine = create_engine(
-        settings.DATABASE_URL,
+        DATABASE_URL,
+        connect_args=connect_args,
+        isolation_level="READ COMMITTED",
         pool_pre_ping=True,
         pool_recycle=300,
-        pool_size=5,
-        max_overflow=10,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=30
+    )
+
+# Async engine for handlers that await their queries instead of blocking the
+# event loop; pooled with the same limits as the sync engine
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        **({"poolclass": AsyncAdaptedQueuePool, **SQLITE_POOL} if SQLITE_FILE_DB else {})
+    )
+    event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+else:
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
         pool_timeout=30
     )
 
@@ -30,6 +112,13 @@ SessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base class for models
 Base = declarative_base()
 
@@ -46,4 +135,9 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get an async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
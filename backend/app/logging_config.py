@@ -1,45 +1,233 @@
+import asyncio
+import atexit
+import copy
+import contextvars
 import logging
+import logging.handlers
+import os
+import queue
+import struct
 import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
-import json
+from typing import Any, Dict, Iterator, Optional
+import orjson
 
 from .config import settings
 
+# Context fields (request_id, ip_address, ...) of the current request or task;
+# set through LogContext and added to every structured entry logged within it
+_log_ctx: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar("log_ctx", default={})
+
+# Bound once: looked up for every record the formatter writes
+_dumps = orjson.dumps
+_utcfromtimestamp = datetime.utcfromtimestamp
+
 class StructuredFormatter(logging.Formatter):
     """Custom formatter for structured JSON logging"""
     
+    # Context attributes copied into the entry when a record carries them
+    EXTRA_FIELDS = ('user_id', 'request_id', 'ip_address', 'character_id', 'action', 'duration')
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Records arrive in bursts within the same second; format its date/time once
+        self._second = None
+        self._second_text = ""
+    
+    def _timestamp(self, created: float) -> str:
+        second = int(created)
+        if second != self._second:
+            self._second = second
+            self._second_text = _utcfromtimestamp(second).strftime("%Y-%m-%dT%H:%M:%S")
+        return f"{self._second_text}.{int((created - second) * 1_000_000):06d}Z"
+    
     def format(self, record: logging.LogRecord) -> str:
+        # app.log and errors.log share this formatter, so an ERROR record is
+        # serialized once and the text reused by the second handler
+        cached = record.__dict__.get("_structured")
+        if cached is not None and cached[0] is self:
+            return cached[1]
+        
         log_entry = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": self._timestamp(record.created),
             "level": record.levelname,
             "logger": record.name,
-            "message": record.getMessage(),
+            "message": record.getMessage() if record.args else str(record.msg),
             "module": record.module,
             "function": record.funcName,
             "line": record.lineno
         }
         
-        # Add extra fields if present
-        if hasattr(record, 'user_id'):
-            log_entry['user_id'] = record.user_id
-        if hasattr(record, 'request_id'):
-            log_entry['request_id'] = record.request_id
-        if hasattr(record, 'ip_address'):
-            log_entry['ip_address'] = record.ip_address
-        if hasattr(record, 'character_id'):
-            log_entry['character_id'] = record.character_id
-        if hasattr(record, 'action'):
-            log_entry['action'] = record.action
-        if hasattr(record, 'duration'):
-            log_entry['duration'] = record.duration
+        # Queued records carry the context captured when they were logged
+        attributes = record.__dict__
+        context = attributes.get("log_context", _log_ctx.get())
+        if context:
+            log_entry.update(context)
         
-        # Add exception info if present
+        # Add extra fields if present (one dict probe each, nulls left out)
+        for field in self.EXTRA_FIELDS:
+            value = attributes.get(field)
+            if value is not None:
+                log_entry[field] = value
+        
+        # Add exception info if present (already rendered for queued records)
         if record.exc_info:
             log_entry['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            log_entry['exception'] = record.exc_text
         
-        return json.dumps(log_entry, ensure_ascii=False)
+        text = _dumps(log_entry, default=str).decode('utf-8')
+        record._structured = (self, text)
+        return text
+
+# Binary request log: the per-request api_request/api_response records are
+# written as fixed-layout little-endian records instead of JSON lines.
+#   header  <BQ   kind, timestamp (ns since the epoch)
+#   request <B    method id, then the path and client IP as <H-length UTF-8
+#   response<BHI  method id, status code, duration (us), then the path and client IP
+REQUEST_LOG_ACTIONS = frozenset({"api_request", "api_response"})
+REQUEST_LOG_METHODS = ("OTHER", "GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS")
+_METHOD_IDS = {method: method_id for method_id, method in enumerate(REQUEST_LOG_METHODS)}
+_KIND_REQUEST, _KIND_RESPONSE = 1, 2
+_HEADER = struct.Struct("<BQ")
+_REQUEST = struct.Struct("<B")
+_RESPONSE = struct.Struct("<BHI")
+_LENGTH = struct.Struct("<H")
+
+def _pack_text(value: Any) -> bytes:
+    data = str(value or "").encode("utf-8")[:0xFFFF]
+    return _LENGTH.pack(len(data)) + data
+
+def _unpack_text(data: bytes, offset: int):
+    (length,) = _LENGTH.unpack_from(data, offset)
+    offset += _LENGTH.size
+    return data[offset:offset + length].decode("utf-8", "replace"), offset + length
+
+class RequestLogFilter(logging.Filter):
+    """Pass only request/response records (or, with ``exclude``, everything else)"""
+    
+    def __init__(self, exclude: bool = False):
+        super().__init__()
+        self.exclude = exclude
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        return (getattr(record, "action", None) in REQUEST_LOG_ACTIONS) != self.exclude
+
+# Log files are written through a large buffer and flushed by flush_loop()
+# (and right away for ERROR and above) instead of after every record, and
+# rotated at a size cap so a long uptime can't fill the disk
+LOG_BUFFER_SIZE = 64 * 1024
+LOG_FLUSH_INTERVAL = 0.2  # seconds
+LOG_MAX_BYTES = 64 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+class BufferedFileHandler(logging.handlers.RotatingFileHandler):
+    """Size-rotated file handler that doesn't flush per record, except for errors
+    
+    The size is tracked as records are written rather than asked of the file,
+    since tell() would flush the buffer; text records count in characters.
+    """
+    
+    def __init__(self, filename, mode: str = "a", encoding: Optional[str] = None,
+                 delay: bool = True, buffer_size: int = LOG_BUFFER_SIZE,
+                 max_bytes: int = LOG_MAX_BYTES, backup_count: int = LOG_BACKUP_COUNT):
+        self.buffer_size = buffer_size
+        self.size = 0
+        super().__init__(filename, mode=mode, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding if "b" not in mode else None, delay=delay)
+        # RotatingFileHandler forces text append mode when a size cap is set
+        self.mode = mode
+    
+    def _open(self):
+        if "b" in self.mode:
+            stream = open(self.baseFilename, self.mode, buffering=self.buffer_size)
+        else:
+            stream = open(self.baseFilename, self.mode, buffering=self.buffer_size,
+                          encoding=self.encoding, errors=self.errors)
+        self.size = os.path.getsize(self.baseFilename)
+        return stream
+    
+    def serialize(self, record: logging.LogRecord):
+        return self.format(record) + self.terminator
+    
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            data = self.serialize(record)
+            if self.stream is None:
+                self.stream = self._open()
+            if self.maxBytes and self.size + len(data) > self.maxBytes and self.size:
+                self.doRollover()
+                if self.stream is None:
+                    self.stream = self._open()
+            self.stream.write(data)
+            self.size += len(data)
+            if record.levelno >= logging.ERROR:
+                self.flush()
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+class BinaryRequestLogHandler(BufferedFileHandler):
+    """Append request/response records to a file in the binary layout above"""
+    
+    def __init__(self, filename):
+        super().__init__(filename, mode="ab")
+    
+    def serialize(self, record: logging.LogRecord) -> bytes:
+        method_id = _METHOD_IDS.get(getattr(record, "method", None), 0)
+        path = _pack_text(getattr(record, "path", None))
+        timestamp = int(record.created * 1_000_000_000)
+        if record.action == "api_response":
+            duration = getattr(record, "duration", None) or 0
+            return (
+                _HEADER.pack(_KIND_RESPONSE, timestamp)
+                + _RESPONSE.pack(method_id, getattr(record, "status_code", 0) or 0, min(int(duration), 0xFFFFFFFF))
+                + path
+                + _pack_text(getattr(record, "ip_address", None))
+            )
+        return (
+            _HEADER.pack(_KIND_REQUEST, timestamp)
+            + _REQUEST.pack(method_id)
+            + path
+            + _pack_text(getattr(record, "ip_address", None))
+        )
+
+
+def decode_request_log(path) -> Iterator[Dict[str, Any]]:
+    """Read back a binary request log, one dict per record"""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        kind, timestamp = _HEADER.unpack_from(data, offset)
+        offset += _HEADER.size
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.utcfromtimestamp(timestamp / 1_000_000_000).isoformat() + "Z"
+        }
+        if kind == _KIND_RESPONSE:
+            method_id, status_code, duration_us = _RESPONSE.unpack_from(data, offset)
+            offset += _RESPONSE.size
+            entry.update(action="api_response", status_code=status_code, duration=duration_us)
+        else:
+            (method_id,) = _REQUEST.unpack_from(data, offset)
+            offset += _REQUEST.size
+            entry["action"] = "api_request"
+        entry["method"] = REQUEST_LOG_METHODS[method_id] if method_id < len(REQUEST_LOG_METHODS) else "OTHER"
+        entry["path"], offset = _unpack_text(data, offset)
+        entry["ip_address"], offset = _unpack_text(data, offset)
+        yield entry
+
+class JSONDatagramHandler(logging.handlers.DatagramHandler):
+    """Send each record to a log collector as one JSON datagram
+
+    DatagramHandler pickles the record by default; rsyslog/Fluent Bit take
+    the formatted line instead.
+    """
+    
+    def makePickle(self, record: logging.LogRecord) -> bytes:
+        return self.format(record).encode("utf-8")
 
 class ColoredFormatter(logging.Formatter):
     """Colored formatter for console output in development"""
@@ -53,10 +241,100 @@ class ColoredFormatter(logging.Formatter):
     }
     RESET = '\033[0m'
     
+    # How the level name is written in each format style
+    _LEVELNAME_FIELDS = {'%': '%(levelname)s', '{': '{levelname}', '$': '${levelname}'}
+    
+    def __init__(self, fmt: Optional[str] = None, datefmt: Optional[str] = None, style: str = '%', **kwargs):
+        super().__init__(fmt, datefmt, style, **kwargs)
+        # One formatter per level with the colored name baked into the format
+        # string, so the record (shared with the JSON file handlers) is never
+        # modified
+        field = self._LEVELNAME_FIELDS[style]
+        self._by_level = {
+            logging.getLevelName(level): logging.Formatter(
+                self._fmt.replace(field, f"{color}{level}{self.RESET}"), datefmt, style, **kwargs
+            )
+            for level, color in self.COLORS.items()
+        }
+    
     def format(self, record: logging.LogRecord) -> str:
-        color = self.COLORS.get(record.levelname, self.RESET)
-        record.levelname = f"{color}{record.levelname}{self.RESET}"
-        return super().format(record)
+        formatter = self._by_level.get(record.levelno)
+        return super().format(record) if formatter is None else formatter.format(record)
+
+# File output goes through a queue: callers only enqueue the record and a
+# single listener thread does the formatting and disk writes
+LOG_QUEUE_SIZE = 10000
+
+_log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_running = False
+
+class BackpressureFilter(logging.Filter):
+    """Drop DEBUG/INFO records once the log queue is more than 2/3 full"""
+    
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__()
+        self.log_queue = log_queue
+        self.threshold = log_queue.maxsize * 2 // 3
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or self.log_queue.qsize() <= self.threshold
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the caller and keeps records structured"""
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now, while the arguments are
+        # still current; keep the extra fields for StructuredFormatter
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        # The listener thread doesn't see the caller's context variables
+        record.log_context = _log_ctx.get()
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Lossy by design: a full queue means the disk can't keep up
+            pass
+
+def start_log_listener():
+    """Start writing queued records to the log files (no-op if already running)"""
+    global _listener_running
+    if _listener is not None and not _listener_running:
+        _listener.start()
+        _listener_running = True
+
+def stop_log_listener():
+    """Write out the queued records and stop the listener thread"""
+    global _listener_running
+    if _listener is not None and _listener_running:
+        _listener.stop()
+        _listener_running = False
+        flush_log_files()
+
+def flush_log_files():
+    """Flush the buffered log files"""
+    if _listener is not None:
+        for handler in _listener.handlers:
+            handler.flush()
+
+async def flush_loop(interval: float = LOG_FLUSH_INTERVAL) -> None:
+    """Flush the log files every ``interval`` seconds until cancelled."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(flush_log_files)
+    except asyncio.CancelledError:
+        flush_log_files()
+        raise
+
+atexit.register(stop_log_listener)
 
 def setup_logging():
     """Setup application logging configuration"""
@@ -71,6 +349,7 @@ def setup_logging():
     
     # Clear existing handlers
     root_logger.handlers.clear()
+    stop_log_listener()
     
     # Console handler for development
     if settings.DEBUG:
@@ -84,26 +363,48 @@ def setup_logging():
         console_handler.setFormatter(console_formatter)
         root_logger.addHandler(console_handler)
     
-    # File handler for structured logs
-    file_handler = logging.FileHandler(
-        log_dir / "app.log",
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.INFO)
-    
     # Use structured JSON formatter for files
     structured_formatter = StructuredFormatter()
-    file_handler.setFormatter(structured_formatter)
-    root_logger.addHandler(file_handler)
     
     # Separate error log file
-    error_handler = logging.FileHandler(
+    error_handler = BufferedFileHandler(
         log_dir / "errors.log",
         encoding='utf-8'
     )
     error_handler.setLevel(logging.ERROR)
     error_handler.setFormatter(structured_formatter)
-    root_logger.addHandler(error_handler)
+    
+    if settings.LOG_REMOTE_HOST:
+        # Everything else goes to the log collector, keeping log writes off
+        # the disk the database uses
+        remote_handler = JSONDatagramHandler(settings.LOG_REMOTE_HOST, settings.LOG_REMOTE_PORT)
+        remote_handler.setLevel(logging.INFO)
+        remote_handler.setFormatter(structured_formatter)
+        handlers = [remote_handler, error_handler]
+    else:
+        # File handler for structured logs
+        file_handler = BufferedFileHandler(
+            log_dir / "app.log",
+            encoding='utf-8'
+        )
+        file_handler.setLevel(logging.INFO)
+        file_handler.setFormatter(structured_formatter)
+        # Request/response records go to the binary request log instead
+        file_handler.addFilter(RequestLogFilter(exclude=True))
+        
+        request_handler = BinaryRequestLogHandler(log_dir / "requests.bin")
+        request_handler.setLevel(logging.INFO)
+        request_handler.addFilter(RequestLogFilter())
+        handlers = [file_handler, error_handler, request_handler]
+    
+    # All log output is written by the listener thread, so a slow disk or
+    # collector never blocks the caller
+    global _listener
+    _listener = logging.handlers.QueueListener(_log_queue, *handlers, respect_handler_level=True)
+    start_log_listener()
+    queue_handler = NonBlockingQueueHandler(_log_queue)
+    queue_handler.addFilter(BackpressureFilter(_log_queue))
+    root_logger.addHandler(queue_handler)
     
     # Suppress noisy third-party loggers
     logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
@@ -117,31 +418,41 @@ def get_logger(name: str) -> logging.Logger:
 
 # Log context manager for request tracking
 class LogContext:
-    """Context manager for adding structured logging context"""
+    """Context manager for adding structured logging context
+    
+    The fields are kept in a context variable, so they follow the request
+    across ``await`` points and are added to every structured entry logged
+    inside the block, by any logger.
+    """
     
     def __init__(self, logger: logging.Logger, **context):
         self.logger = logger
         self.context = context
-        self.old_adapter = None
+        self._token = None
     
     def __enter__(self):
-        self.old_adapter = logging.getLoggerAdapter(self.logger, self.context)
-        return self.old_adapter
+        self._token = _log_ctx.set({**_log_ctx.get(), **self.context})
+        return self.logger
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         if exc_type:
             self.logger.error(
                 "Exception in context",
-                exc_info=(exc_type, exc_val, exc_tb),
-                extra=self.context
+                exc_info=(exc_type, exc_val, exc_tb)
             )
+        _log_ctx.reset(self._token)
+
+# Utility functions for common logging patterns; they return before building
+# the message or the extra dict when the level is disabled
+_INFO = logging.INFO
 
-# Utility functions for common logging patterns
 def log_api_request(logger: logging.Logger, method: str, path: str, 
                    user_id: str = None, ip_address: str = None):
     """Log API request"""
+    if not logger.isEnabledFor(_INFO):
+        return
     logger.info(
-        f"API {method} {path}",
+        "API %s %s", method, path,
         extra={
             "action": "api_request",
             "method": method,
@@ -152,24 +463,29 @@ def log_api_request(logger: logging.Logger, method: str, path: str,
     )
 
 def log_api_response(logger: logging.Logger, method: str, path: str, 
-                   status_code: int, duration: float = None):
-    """Log API response"""
+                   status_code: int, duration: int = None, ip_address: str = None):
+    """Log API response (``duration`` in whole microseconds)"""
+    if not logger.isEnabledFor(_INFO):
+        return
     logger.info(
-        f"API {method} {path} - {status_code}",
+        "API %s %s - %s", method, path, status_code,
         extra={
             "action": "api_response",
             "method": method,
             "path": path,
             "status_code": status_code,
-            "duration": duration
+            "duration": duration,
+            "ip_address": ip_address
         }
     )
 
 def log_database_operation(logger: logging.Logger, operation: str, table: str, 
                        record_id: int = None, user_id: str = None):
     """Log database operation"""
+    if not logger.isEnabledFor(_INFO):
+        return
     logger.info(
-        f"DB {operation} on {table}",
+        "DB %s on %s", operation, table,
         extra={
             "action": "database_operation",
             "operation": operation,
@@ -16,18 +16,24 @@ Example:
     'على خطاهم API'
 """
 
-from fastapi import FastAPI, Depends, Request
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import MutableHeaders
 from contextlib import asynccontextmanager
+import asyncio
 import os
+import logging
 import time
-import uuid
 
-from .database import init_db, get_db
+from .database import async_engine, init_db, get_db
 from .api import characters, progress, stats, auth, content, users, media, analytics, recommendations, performance, admin, levels, learning_paths, content_pipeline
 from .config import settings
-from .logging_config import get_logger, log_api_request, log_api_response, log_security_event
+from .services import view_counter, analytics_views, character_directory, similarity_index
+# Imported for its Session after_flush listener, which keeps cached rows fresh
+from .services import row_cache  # noqa: F401
+from .logging_config import LogContext, get_logger, log_api_request, log_api_response, log_security_event, start_log_listener, stop_log_listener, flush_loop as log_flush_loop
 
 # Import monitoring modules with error handling
 try:
@@ -78,19 +84,19 @@ async def lifespan(app: FastAPI):
         >>> # Application will startup and shutdown properly
     """
     # Startup
+    start_log_listener()
     logger.info("Application starting up...")
     logger.info(f"Database initialized: {settings.DATABASE_URL}")
     
     try:
-        # Initialize database and create tables
-        init_db()
+        # Initialize database and create tables (sync DDL, kept off the event loop)
+        await asyncio.to_thread(init_db)
         logger.info("Database initialization successful")
         
-        # Test database connection
-        db = next(get_db())
+        # Test database connection through the async engine requests use
         from sqlalchemy import text
-        db.execute(text("SELECT 1"))
-        db.close()
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
         logger.info("Database connection test successful")
         
         # Initialize rate limiter without Redis
@@ -106,91 +112,142 @@ async def lifespan(app: FastAPI):
         logger.error(f"Startup failed: {e}")
         raise
     
-    # Ensure upload directory exists
+    # Ensure upload directories exist
     upload_dir = settings.UPLOAD_DIR
     os.makedirs(upload_dir, exist_ok=True)
+    media.ensure_upload_dirs()
     logger.info(f"Upload directory: {upload_dir}")
     
+    # Batch view-count writes in the background
+    view_flush_task = asyncio.create_task(view_counter.flush_loop())
+    # Keep the analytics materialized views fresh (PostgreSQL only)
+    analytics_refresh_task = asyncio.create_task(analytics_views.refresh_loop())
+    # Slug map and preloaded responses for the hottest characters
+    directory_refresh_task = asyncio.create_task(character_directory.refresh_loop())
+    # Flush the buffered log files a few times a second
+    log_flush_task = asyncio.create_task(log_flush_loop())
+    
+    # Map the nightly-built similarity index, if one has been built, and pick
+    # up later builds without a restart
+    if not similarity_index.load():
+        logger.info("No similarity index found; similar-character lookups use category matches")
+    similarity_refresh_task = asyncio.create_task(similarity_index.refresh_loop())
+    
     logger.info("Application startup complete")
     yield
     
     # Shutdown
     logger.info("Application shutting down...")
+    background_tasks = (
+        similarity_refresh_task, log_flush_task, directory_refresh_task, analytics_refresh_task, view_flush_task
+    )
+    for task in background_tasks:
+        task.cancel()
+    for task in background_tasks:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    
+    # Flush buffered log records to disk before the process exits
+    stop_log_listener()
 
 app = FastAPI(
     title="على خطاهم API",
     description="API لتطبيق قصص الشخصيات الإسلامية",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/api/docs",
     redoc_url="/api/redoc",
     openapi_url="/api/openapi.json"
 )
 
 # CORS middleware - Updated for development
+# Origins are checked on every CORS request, so they're matched against a
+# set; browsers may cache a preflight answer for a day
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://127.0.0.1:3000",
-        "https://on-their-footsteps.vercel.app"
-    ],
+    allow_origins=frozenset(settings.ALLOWED_ORIGINS),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
     expose_headers=["*"],
+    max_age=86400,
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Uploaded and optimized files get unique (uuid or content-hash) names and are
+# never rewritten in place
+STATIC_CACHE_CONTROL = "public, max-age=31536000, immutable"
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    """Log incoming requests and outgoing responses.
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that lets browsers and CDNs keep files for a year"""
     
-    Adds request ID and process time headers to responses.
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", STATIC_CACHE_CONTROL)
+        return response
+
+# Mount static files (behind a proxy, nginx serves them without the app)
+if not settings.BEHIND_PROXY:
+    app.mount("/static", CachedStaticFiles(directory="static"), name="static")
+
+# Paths polled by load balancers and monitoring; they'd dominate the log
+SKIP_LOG_PATHS = frozenset(settings.LOG_EXCLUDE_PATHS)
+
+class LogRequestsMiddleware:
+    """Log outgoing responses and add request ID and process time headers.
+    
+    Plain ASGI middleware: it reads method, path and client straight from the
+    scope and catches the status from the response start message, so the
+    response isn't relayed through an extra task and stream the way
+    ``@app.middleware("http")`` (BaseHTTPMiddleware) does.
     
     Args:
-        request (Request): The incoming request instance
-        call_next (Callable): The next middleware or route handler
-        
-    Returns:
-        Response: The outgoing response instance
+        app (ASGIApp): The wrapped application
     """
-    start_time = time.time()
-    request_id = str(uuid.uuid4())
-    
-    # Get client IP
-    client_ip = request.client.host if request.client else "unknown"
     
-    # Log request
-    log_api_request(
-        logger,
-        request.method,
-        str(request.url),
-        ip_address=client_ip
-    )
-    
-    # Process request
-    response = await call_next(request)
-    
-    # Calculate duration
-    process_time = time.time() - start_time
-    
-    # Log response
-    log_api_response(
-        logger,
-        request.method,
-        str(request.url),
-        response.status_code,
-        duration=process_time
-    )
-    
-    # Add headers
-    response.headers["X-Request-ID"] = request_id
-    response.headers["X-Process-Time"] = str(process_time)
+    def __init__(self, app):
+        self.app = app
     
-    return response
+    async def __call__(self, scope, receive, send):
+        # CORS preflights (OPTIONS) aren't logged either
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in SKIP_LOG_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter_ns()
+        request_id = os.urandom(12).hex()
+        method = scope["method"]
+        path = scope["path"]
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+        status_code = 500
+        
+        async def send_with_headers(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                duration_us = (time.perf_counter_ns() - start_time) // 1000
+                headers = MutableHeaders(scope=message)
+                headers.append("X-Request-ID", request_id)
+                headers.append("X-Process-Time", f"{duration_us}us")
+            await send(message)
+        
+        # Every record logged while handling the request carries its id and IP
+        with LogContext(logger, request_id=request_id, ip_address=client_ip):
+            # One record per request, written at response time; the separate
+            # request record is only kept when debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                log_api_request(logger, method, path, ip_address=client_ip)
+            
+            try:
+                await self.app(scope, receive, send_with_headers)
+            finally:
+                duration_us = (time.perf_counter_ns() - start_time) // 1000
+                log_api_response(logger, method, path, status_code, duration=duration_us, ip_address=client_ip)
+
+app.add_middleware(LogRequestsMiddleware)
 
 # Health check endpoint
 @app.get("/api/health", tags=["Health"])
@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, Boolean, ForeignKey, Float, CheckConstraint, Index, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func, and_
 from datetime import datetime
 from typing import List, Optional
@@ -24,28 +24,30 @@ class IslamicCharacter(Base):
     sub_category = Column(String(100))  # خليفة، قائد، فقيه
     slug = Column(String(200), unique=True, index=True)  # URL-friendly identifier
     
-    # Content
-    full_story = Column(Text)
-    key_achievements = Column(JSON)
-    lessons = Column(JSON)
-    quotes = Column(JSON)
+    # Content (large columns are deferred: loaded together, only when a
+    # read path asks for the group via undefer_group('content'))
+    full_story = deferred(Column(Text), group='content')
+    key_achievements = deferred(Column(JSON), group='content')
+    lessons = deferred(Column(JSON), group='content')
+    quotes = deferred(Column(JSON), group='content')
     
     # Media
     profile_image = Column(String(500))
-    gallery = Column(JSON)  # List of image URLs
-    audio_stories = Column(JSON)  # List of audio URLs
-    animations = Column(JSON)  # List of animation data
+    gallery = deferred(Column(JSON), group='media')  # List of image URLs
+    audio_stories = deferred(Column(JSON), group='media')  # List of audio URLs
+    total_audio_duration = Column(Integer, default=0)  # Seconds, summed on upload
+    animations = deferred(Column(JSON), group='media')  # List of animation data
     
     # Timeline
-    timeline_events = Column(JSON)
+    timeline_events = deferred(Column(JSON), group='content')
     
     # Location
     birth_place = Column(String(200))
     death_place = Column(String(200))
-    locations = Column(JSON)  # Important locations
+    locations = deferred(Column(JSON), group='content')  # Important locations
     
     # Relationships
-    related_characters = Column(JSON)  # IDs of related characters
+    related_characters = deferred(Column(JSON), group='content')  # IDs of related characters
     
     # Statistics
     views_count = Column(Integer, default=0)
@@ -64,6 +66,33 @@ class IslamicCharacter(Base):
     # Relationships
     progress_records = relationship("UserProgress", back_populates="character")
 
+# Composite indexes matching the filter + sort pairs of the character list endpoint
+Index('ix_char_cat_name', IslamicCharacter.category, IslamicCharacter.name)
+Index('ix_char_era_name', IslamicCharacter.era, IslamicCharacter.name)
+Index('ix_char_cat_views', IslamicCharacter.category, IslamicCharacter.views_count.desc())
+Index('ix_char_cat_likes', IslamicCharacter.category, IslamicCharacter.likes_count.desc())
+Index('ix_char_cat_era_name', IslamicCharacter.category, IslamicCharacter.era,
+      IslamicCharacter.is_featured, IslamicCharacter.name, IslamicCharacter.id)
+
+# Partial indexes for the distinct category / era / sub-category lookups
+Index('ix_char_category', IslamicCharacter.category,
+      postgresql_where=IslamicCharacter.category.isnot(None),
+      sqlite_where=IslamicCharacter.category.isnot(None))
+Index('ix_char_era', IslamicCharacter.era,
+      postgresql_where=IslamicCharacter.era.isnot(None),
+      sqlite_where=IslamicCharacter.era.isnot(None))
+Index('ix_char_cat_subcat', IslamicCharacter.category, IslamicCharacter.sub_category,
+      postgresql_where=IslamicCharacter.sub_category.isnot(None),
+      sqlite_where=IslamicCharacter.sub_category.isnot(None))
+
+# Partial indexes for the featured listings (filter on is_featured, sort by name)
+Index('ix_char_featured_name', IslamicCharacter.name,
+      postgresql_where=IslamicCharacter.is_featured == True,
+      sqlite_where=IslamicCharacter.is_featured == True)
+Index('ix_char_featured_cat_name', IslamicCharacter.category, IslamicCharacter.name,
+      postgresql_where=IslamicCharacter.is_featured == True,
+      sqlite_where=IslamicCharacter.is_featured == True)
+
 # Association table for many-to-many relationship between users and completed quizzes
 user_quiz_association = Table(
     'user_quiz_association',
@@ -210,6 +239,10 @@ class UserProgress(Base):
     user = relationship("User", back_populates="progress_records")
     character = relationship("IslamicCharacter", back_populates="progress_records")
 
+# Filter columns of the progress list, then its (character_id, id) seek key
+Index('ix_progress_user_state', UserProgress.user_id, UserProgress.is_completed,
+      UserProgress.bookmarked, UserProgress.character_id, UserProgress.id)
+
 class ContentCategory(Base):
     __tablename__ = "content_categories"
     
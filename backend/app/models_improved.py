@@ -1,11 +1,31 @@
-from sqlalchemy import Column, Integer, String, Text, JSON, DateTime, Boolean, ForeignKey, Float, CheckConstraint, Index, Table, UniqueConstraint
-from sqlalchemy.orm import relationship
+"""
+Proposed revision of the character models.
+
+Nothing in the app imports this module: the served tables are defined in
+app.models and changed through the Alembic migrations. It defines the same
+islamic_characters table on the shared Base, so it can't be imported next
+to app.models either. Its JSONB columns, GIN indexes and constraints reach
+the database only once they are ported to app.models with a migration.
+"""
+
+from sqlalchemy import insert, select, true, Column, Integer, String, Text, JSON, DateTime, Boolean, ForeignKey, Float, CheckConstraint, Index, Table, UniqueConstraint
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import aliased, backref, contains_eager, relationship
 from sqlalchemy.sql import func, and_
+import re
 from datetime import datetime
 from typing import List, Optional
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, ConfigDict, create_model, field_validator, model_validator
 from .database import Base
 
+# JSON on SQLite, JSONB on PostgreSQL so the columns can carry GIN indexes
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
+# Shared by the table's check constraint and the schema validators
+CHARACTER_CATEGORIES = ("الأنبياء", "الصحابة", "التابعون", "العلماء", "الخلفاء", "القادة", "الفقهاء", "المحدثون", "المفكرون")
+_VALID_CATEGORIES = frozenset(CHARACTER_CATEGORIES)
+_SLUG_RE = re.compile(r'^[a-z0-9-]+$')
+
 # Association table for many-to-many relationship between characters
 character_relationships = Table(
     'character_relationships',
@@ -36,31 +56,34 @@ class IslamicCharacter(Base):
     
     # Content
     full_story = Column(Text)
-    key_achievements = Column(JSON)  # Should be validated JSON
-    lessons = Column(JSON)  # Should be validated JSON
-    quotes = Column(JSON)  # Should be validated JSON
+    key_achievements = Column(JSONType)  # Should be validated JSON
+    lessons = Column(JSONType)  # Should be validated JSON
+    quotes = Column(JSONType)  # Should be validated JSON
     
     # Media
     profile_image = Column(String(500))
-    gallery = Column(JSON)  # List of image URLs - should be validated
-    audio_stories = Column(JSON)  # List of audio URLs - should be validated
-    animations = Column(JSON)  # List of animation data - should be validated
+    gallery = Column(JSONType)  # List of image URLs - should be validated
+    audio_stories = Column(JSONType)  # List of audio URLs - should be validated
+    animations = Column(JSONType)  # List of animation data - should be validated
     
     # Timeline
-    timeline_events = Column(JSON)  # Should be validated JSON
+    timeline_events = Column(JSONType)  # Should be validated JSON
     
     # Location
     birth_place = Column(String(200))
     death_place = Column(String(200))
-    locations = Column(JSON)  # Important locations - should be validated JSON
+    locations = Column(JSONType)  # Important locations - should be validated JSON
     
     # Relationships - now using proper relationships
+    # Never lazy loaded (one query per character in a listing); use
+    # list_with_relations() to fetch characters together with their relations
     related_characters = relationship(
         "IslamicCharacter",
         secondary=character_relationships,
         primaryjoin="IslamicCharacter.id==character_relationships.c.character_id",
         secondaryjoin="IslamicCharacter.id==character_relationships.c.related_character_id",
-        backref="related_by"
+        backref=backref("related_by", lazy="raise"),
+        lazy="raise"
     )
     
     # Statistics
@@ -87,13 +110,26 @@ class IslamicCharacter(Base):
         CheckConstraint('birth_year IS NULL OR (birth_year >= 500 AND birth_year <= 1500)', name='check_birth_year_range'),
         CheckConstraint('death_year IS NULL OR (death_year >= 500 AND death_year <= 1500)', name='check_death_year_range'),
         CheckConstraint('birth_year IS NULL OR death_year IS NULL OR birth_year < death_year', name='check_birth_before_death'),
-        CheckConstraint('category IN ("الأنبياء", "الصحابة", "التابعون", "العلماء", "الخلفاء", "القادة", "الفقهاء", "المحدثون", "المفكرون")', name='check_valid_category'),
+        CheckConstraint(
+            'category IN (%s)' % ", ".join(f"'{category}'" for category in CHARACTER_CATEGORIES),
+            name='check_valid_category'
+        ),
         CheckConstraint('views_count >= 0', name='check_views_non_negative'),
         CheckConstraint('likes_count >= 0', name='check_likes_non_negative'),
         CheckConstraint('shares_count >= 0', name='check_shares_non_negative'),
         Index('idx_category_era', 'category', 'era'),
-        Index('idx_featured_verified', 'is_featured', 'is_verified'),
+        # Featured/verified listings ordered by views; on PostgreSQL the card
+        # columns are included so the listing is an index-only scan (this also
+        # covers lookups on is_featured, is_verified alone)
+        Index('idx_char_feat_ver_views', 'is_featured', 'is_verified', 'views_count',
+              postgresql_include=['name', 'arabic_name', 'slug', 'profile_image']),
         Index('idx_birth_death_year', 'birth_year', 'death_year'),
+        # Containment (@>) lookups on places and timeline events; jsonb_path_ops
+        # indexes are smaller than the default ones and only serve @>
+        Index('idx_char_locations_gin', 'locations', postgresql_using='gin',
+              postgresql_ops={'locations': 'jsonb_path_ops'}).ddl_if(dialect='postgresql'),
+        Index('idx_char_timeline_events_gin', 'timeline_events', postgresql_using='gin',
+              postgresql_ops={'timeline_events': 'jsonb_path_ops'}).ddl_if(dialect='postgresql'),
         UniqueConstraint('name', 'category', name='uq_name_category'),
     )
 
@@ -101,42 +137,14 @@ class IslamicCharacter(Base):
         return f"<IslamicCharacter(id={self.id}, name='{self.name}', category='{self.category}')>"
 
     def to_dict(self):
-        """Convert character to dictionary with proper JSON serialization"""
-        return {
-            'id': self.id,
-            'name': self.name,
-            'arabic_name': self.arabic_name,
-            'english_name': self.english_name,
-            'title': self.title,
-            'description': self.description,
-            'birth_year': self.birth_year,
-            'death_year': self.death_year,
-            'era': self.era,
-            'category': self.category,
-            'sub_category': self.sub_category,
-            'slug': self.slug,
-            'full_story': self.full_story,
-            'key_achievements': self.key_achievements,
-            'lessons': self.lessons,
-            'quotes': self.quotes,
-            'profile_image': self.profile_image,
-            'gallery': self.gallery,
-            'audio_stories': self.audio_stories,
-            'animations': self.animations,
-            'timeline_events': self.timeline_events,
-            'birth_place': self.birth_place,
-            'death_place': self.death_place,
-            'locations': self.locations,
-            'views_count': self.views_count,
-            'likes_count': self.likes_count,
-            'shares_count': self.shares_count,
-            'is_featured': self.is_featured,
-            'is_verified': self.is_verified,
-            'verification_source': self.verification_source,
-            'verification_notes': self.verification_notes,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
-        }
+        """Convert character to a dictionary of its column values
+        
+        Datetimes are returned as-is; the ORJSON responses serialize them.
+        """
+        return {key: getattr(self, key) for key in _CHAR_COLS}
+
+# Column attribute names, read once instead of listed out in to_dict()
+_CHAR_COLS = tuple(column.key for column in IslamicCharacter.__table__.columns)
 
 # Association table for many-to-many relationship between users and completed quizzes
 user_quiz_association = Table(
@@ -323,73 +331,101 @@ class QuizAttempt(Base):
     user = relationship("User", back_populates="quiz_attempts")
     quiz = relationship("Quiz", back_populates="attempts")
 
+# Seeding and imports insert plain row dicts through Core executemany batches
+# instead of session.add() per object, which flushes one INSERT per row
+BULK_INSERT_CHUNK = 10000
+
+def bulk_insert(session, model, rows: List[dict], chunk_size: int = BULK_INSERT_CHUNK) -> int:
+    """Insert rows (dicts with the same keys) into a model's table; returns the count"""
+    statement = insert(model.__table__)
+    for start in range(0, len(rows), chunk_size):
+        session.execute(statement, rows[start:start + chunk_size])
+    session.commit()
+    return len(rows)
+
+RELATED_LIMIT = 10
+
+def list_with_relations(session, ids: List[int], k: int = RELATED_LIMIT) -> List[IslamicCharacter]:
+    """Characters by id with up to k related characters each, in one query"""
+    links = character_relationships.c
+    if session.get_bind().dialect.name == "postgresql":
+        # Per character: its first k links, read from the primary key index
+        related = select(links.related_character_id).where(
+            links.character_id == IslamicCharacter.id
+        ).order_by(links.related_character_id).limit(k).lateral()
+        join_on = true()
+    else:
+        # No LATERAL on SQLite: number each character's links and keep the first k
+        ranked = select(
+            links.character_id,
+            links.related_character_id,
+            func.row_number().over(
+                partition_by=links.character_id, order_by=links.related_character_id
+            ).label("rank")
+        ).where(links.character_id.in_(ids)).subquery()
+        related = select(ranked.c.character_id, ranked.c.related_character_id).where(
+            ranked.c.rank <= k
+        ).subquery()
+        join_on = related.c.character_id == IslamicCharacter.id
+    
+    Related = aliased(IslamicCharacter)
+    stmt = (
+        select(IslamicCharacter)
+        .where(IslamicCharacter.id.in_(ids))
+        .outerjoin(related, join_on)
+        .outerjoin(Related, Related.id == related.c.related_character_id)
+        .options(contains_eager(IslamicCharacter.related_characters.of_type(Related)))
+    )
+    return session.scalars(stmt).unique().all()
+
+# Cached by-slug and level lookups live in app.services.row_cache, on the
+# served models
+
 # Pydantic schemas for validation
-class CharacterCreate(BaseModel):
-    name: str
-    arabic_name: str
-    english_name: Optional[str] = None
-    title: Optional[str] = None
-    description: Optional[str] = None
-    birth_year: Optional[int] = None
-    death_year: Optional[int] = None
-    era: Optional[str] = None
-    category: str
-    sub_category: Optional[str] = None
-    slug: Optional[str] = None
-    full_story: Optional[str] = None
-    key_achievements: Optional[List[str]] = []
-    lessons: Optional[List[str]] = []
-    quotes: Optional[List[str]] = []
-    profile_image: Optional[str] = None
-    gallery: Optional[List[str]] = []
-    audio_stories: Optional[List[str]] = []
-    animations: Optional[List[dict]] = []
-    timeline_events: Optional[List[dict]] = []
-    birth_place: Optional[str] = None
-    death_place: Optional[str] = None
-    locations: Optional[List[str]] = []
-    is_featured: Optional[bool] = False
-    is_verified: Optional[bool] = False
-    verification_source: Optional[str] = None
-    verification_notes: Optional[str] = None
+class CharacterValidators(BaseModel):
+    """Field checks shared by CharacterCreate and CharacterUpdate"""
     
-    @validator('name')
+    # Strings are stripped by pydantic-core before the validators below run
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+    
+    @field_validator('name', check_fields=False)
+    @classmethod
     def validate_name(cls, v):
-        if len(v.strip()) < 2:
+        if v is None:
+            return v
+        if len(v) < 2:
             raise ValueError('Name must be at least 2 characters long')
         if len(v) > 200:
             raise ValueError('Name must be less than 200 characters')
-        return v.strip()
+        return v
     
-    @validator('arabic_name')
+    @field_validator('arabic_name', check_fields=False)
+    @classmethod
     def validate_arabic_name(cls, v):
-        if len(v.strip()) < 2:
+        if v is None:
+            return v
+        if len(v) < 2:
             raise ValueError('Arabic name must be at least 2 characters long')
         if len(v) > 200:
             raise ValueError('Arabic name must be less than 200 characters')
-        return v.strip()
+        return v
     
-    @validator('birth_year', 'death_year')
+    @field_validator('birth_year', 'death_year', check_fields=False)
+    @classmethod
     def validate_years(cls, v):
         if v is not None and (v < 500 or v > 1500):
             raise ValueError('Year must be between 500 and 1500 CE (Islamic history range)')
         return v
     
-    @validator('death_year')
-    def validate_death_after_birth(cls, v, values):
-        if v is not None and 'birth_year' in values and values['birth_year'] is not None:
-            if v <= values['birth_year']:
-                raise ValueError('Death year must be after birth year')
-        return v
-    
-    @validator('category')
+    @field_validator('category', check_fields=False)
+    @classmethod
     def validate_category(cls, v):
-        valid_categories = ["الأنبياء", "الصحابة", "التابعون", "العلماء", "الخلفاء", "القادة", "الفقهاء", "المحدثون", "المفكرون"]
-        if v not in valid_categories:
-            raise ValueError(f'Category must be one of: {", ".join(valid_categories)}')
+        if v is not None and v not in _VALID_CATEGORIES:
+            raise ValueError(f'Category must be one of: {", ".join(CHARACTER_CATEGORIES)}')
         return v
     
-    @validator('slug')
+    @field_validator('slug', check_fields=False)
+    @classmethod
     def validate_slug(cls, v):
         if v is not None:
             if len(v) < 2:
@@ -397,15 +433,47 @@ class CharacterCreate(BaseModel):
             if len(v) > 200:
                 raise ValueError('Slug must be less than 200 characters')
             # Check slug format
-            import re
-            if not re.match(r'^[a-z0-9-]+$', v):
+            if not _SLUG_RE.match(v):
                 raise ValueError('Slug must contain only lowercase letters, numbers, and hyphens')
         return v
     
-    class Config:
-        extra = "forbid"  # Prevent extra fields
+    @model_validator(mode='after')
+    def validate_death_after_birth(self):
+        if self.birth_year is not None and self.death_year is not None:
+            if self.death_year <= self.birth_year:
+                raise ValueError('Death year must be after birth year')
+        return self
+
+class CharacterCreate(CharacterValidators):
+    name: str
+    arabic_name: str
+    english_name: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    birth_year: Optional[int] = None
+    death_year: Optional[int] = None
+    era: Optional[str] = None
+    category: str
+    sub_category: Optional[str] = None
+    slug: Optional[str] = None
+    full_story: Optional[str] = None
+    key_achievements: Optional[List[str]] = []
+    lessons: Optional[List[str]] = []
+    quotes: Optional[List[str]] = []
+    profile_image: Optional[str] = None
+    gallery: Optional[List[str]] = []
+    audio_stories: Optional[List[str]] = []
+    animations: Optional[List[dict]] = []
+    timeline_events: Optional[List[dict]] = []
+    birth_place: Optional[str] = None
+    death_place: Optional[str] = None
+    locations: Optional[List[str]] = []
+    is_featured: Optional[bool] = False
+    is_verified: Optional[bool] = False
+    verification_source: Optional[str] = None
+    verification_notes: Optional[str] = None
 
-class CharacterUpdate(BaseModel):
+class CharacterUpdate(CharacterValidators):
     name: Optional[str] = None
     arabic_name: Optional[str] = None
     english_name: Optional[str] = None
@@ -433,52 +501,20 @@ class CharacterUpdate(BaseModel):
     is_verified: Optional[bool] = None
     verification_source: Optional[str] = None
     verification_notes: Optional[str] = None
-    
-    # Reuse validators from CharacterCreate
-    _validate_name = validator('name', allow_reuse=True)(CharacterCreate.validate_name.__func__)
-    _validate_arabic_name = validator('arabic_name', allow_reuse=True)(CharacterCreate.validate_arabic_name.__func__)
-    _validate_years = validator('birth_year', 'death_year', allow_reuse=True)(CharacterCreate.validate_years.__func__)
-    _validate_death_after_birth = validator('death_year', allow_reuse=True)(CharacterCreate.validate_death_after_birth.__func__)
-    _validate_category = validator('category', allow_reuse=True)(CharacterCreate.validate_category.__func__)
-    _validate_slug = validator('slug', allow_reuse=True)(CharacterCreate.validate_slug.__func__)
-    
-    class Config:
-        extra = "forbid"
 
-class CharacterResponse(BaseModel):
-    id: int
-    name: str
-    arabic_name: str
-    english_name: Optional[str]
-    title: Optional[str]
-    description: Optional[str]
-    birth_year: Optional[int]
-    death_year: Optional[int]
-    era: Optional[str]
-    category: str
-    sub_category: Optional[str]
-    slug: str
-    full_story: Optional[str]
-    key_achievements: Optional[List[str]]
-    lessons: Optional[List[str]]
-    quotes: Optional[List[str]]
-    profile_image: Optional[str]
-    gallery: Optional[List[str]]
-    audio_stories: Optional[List[str]]
-    animations: Optional[List[dict]]
-    timeline_events: Optional[List[dict]]
-    birth_place: Optional[str]
-    death_place: Optional[str]
-    locations: Optional[List[str]]
-    views_count: int
-    likes_count: int
-    shares_count: int
-    is_featured: bool
-    is_verified: bool
-    verification_source: Optional[str]
-    verification_notes: Optional[str]
-    created_at: datetime
-    updated_at: Optional[datetime]
-    
-    class Config:
-        from_attributes = True
+def _response_field(column):
+    """Pydantic (type, default) for a column; nullable columns are optional"""
+    if isinstance(column.type, JSON):
+        python_type = list
+    else:
+        python_type = column.type.python_type
+    if column.nullable:
+        return Optional[python_type], None
+    return python_type, ...
+
+# Generated from the table so the response can't drift from the model
+CharacterResponse = create_model(
+    "CharacterResponse",
+    __config__=ConfigDict(from_attributes=True),
+    **{column.key: _response_field(column) for column in IslamicCharacter.__table__.columns}
+)
@@ -4,12 +4,15 @@ import re
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from passlib.context import CryptContext
-from jose import JWTError, jwt
+import jwt
+from jwt.exceptions import PyJWTError as JWTError
 from fastapi import HTTPException, status, Request, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import bleach
+from sqlalchemy.orm import Session
 
 from .config import settings
+from .database import get_db
 from .logging_config import get_logger, log_security_event
 
 logger = get_logger(__name__)
@@ -20,6 +23,12 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # JWT token scheme
 security = HTTPBearer()
 
+# Resolved once per worker: PyJWT would otherwise look up the algorithm and
+# re-derive the key (PEM parsing for asymmetric algorithms) on every call.
+JWT_ALGORITHMS = [settings.ALGORITHM]
+JWT_KEY = jwt.algorithms.get_default_algorithms()[settings.ALGORITHM].prepare_key(settings.SECRET_KEY)
+jwt_codec = jwt.PyJWT()
+
 class SecurityManager:
     """Centralized security management"""
     
@@ -43,14 +52,14 @@ class SecurityManager:
             expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         
         to_encode.update({"exp": expire})
-        encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+        encoded_jwt = jwt_codec.encode(to_encode, JWT_KEY, algorithm=settings.ALGORITHM)
         return encoded_jwt
     
     @staticmethod
     def verify_token(token: str) -> dict:
         """Verify and decode JWT token"""
         try:
-            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            payload = jwt_codec.decode(token, JWT_KEY, algorithms=JWT_ALGORITHMS)
             return payload
         except JWTError as e:
             log_security_event(logger, "invalid_token", {"error": str(e)})
@@ -211,9 +220,15 @@ class SecurityManager:
         return True
 
 # Dependency to get current user
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Get current authenticated user from JWT token"""
-    from .database import get_db
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Get current authenticated user from JWT token
+    
+    Uses the request's own database session (FastAPI resolves ``get_db``
+    once per request) rather than checking out a second connection.
+    """
     from .models import User
     
     token = credentials.credentials
@@ -226,33 +241,25 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Invalid authentication credentials"
         )
     
-    # Get database session
-    db_gen = get_db()
-    db = next(db_gen)
+    # Fetch user from database
+    user = db.query(User).filter(User.email == user_email).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found"
+        )
     
-    try:
-        # Fetch user from database
-        user = db.query(User).filter(User.email == user_email).first()
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found"
-            )
-        
-        if not user.is_active:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Inactive user"
-            )
-        
-        return user
-    finally:
-        db.close()
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Inactive user"
+        )
+    
+    return user
 
 # Dependency to get current active user
-async def get_current_active_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_active_user(user = Depends(get_current_user)):
     """Get current authenticated and active user from JWT token"""
-    user = await get_current_user(credentials)
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -0,0 +1,101 @@
+"""
+Precomputed analytics aggregates.
+
+On PostgreSQL the per-character and per-category aggregates live in the
+materialized views from migration 009 and are refreshed hourly by a
+background task; reads are a plain indexed SELECT. Other backends (SQLite in
+development) run the equivalent aggregate live.
+"""
+
+import asyncio
+from typing import Any, Dict, List
+
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from ..database import SessionLocal, engine
+from ..logging_config import get_logger
+from ..models import IslamicCharacter
+
+logger = get_logger(__name__)
+
+REFRESH_INTERVAL = 3600  # seconds
+
+MATERIALIZED_VIEWS = ("mv_top_characters", "mv_category_performance")
+
+
+_views_available = None
+
+
+def _uses_materialized_views(db: Session) -> bool:
+    """True when running on PostgreSQL with migration 009 applied (checked once)."""
+    global _views_available
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    if _views_available is None:
+        _views_available = db.execute(
+            text("SELECT to_regclass('mv_top_characters') IS NOT NULL")
+        ).scalar()
+    return _views_available
+
+
+def top_characters(db: Session, limit: int = 10) -> List[Dict[str, Any]]:
+    """Most viewed characters as ``{"name", "views"}`` rows."""
+    if _uses_materialized_views(db):
+        rows = db.execute(
+            text("SELECT name, views FROM mv_top_characters ORDER BY views DESC LIMIT :lim"),
+            {"lim": limit}
+        ).all()
+    else:
+        rows = db.query(IslamicCharacter.name, IslamicCharacter.views_count).order_by(
+            IslamicCharacter.views_count.desc()
+        ).limit(limit).all()
+    return [{"name": name, "views": views} for name, views in rows]
+
+
+def popular_categories(db: Session, limit: int = 10) -> List[Dict[str, Any]]:
+    """Categories by total views as ``{"category", "views"}`` rows."""
+    if _uses_materialized_views(db):
+        rows = db.execute(
+            text("SELECT category, total_views FROM mv_category_performance ORDER BY total_views DESC LIMIT :lim"),
+            {"lim": limit}
+        ).all()
+    else:
+        total_views = func.sum(IslamicCharacter.views_count)
+        rows = db.query(IslamicCharacter.category, total_views).filter(
+            IslamicCharacter.category.isnot(None)
+        ).group_by(IslamicCharacter.category).order_by(total_views.desc()).limit(limit).all()
+    return [{"category": category, "views": int(views or 0)} for category, views in rows]
+
+
+def _refresh() -> None:
+    db = SessionLocal()
+    try:
+        for view in MATERIALIZED_VIEWS:
+            db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def refresh_loop(interval: float = REFRESH_INTERVAL) -> None:
+    """Refresh the materialized views every ``interval`` seconds until cancelled."""
+    if engine.dialect.name != "postgresql":
+        return
+    db = SessionLocal()
+    try:
+        if not _uses_materialized_views(db):
+            logger.info("Analytics materialized views missing - aggregating live")
+            return
+    finally:
+        db.close()
+    while True:
+        try:
+            await asyncio.to_thread(_refresh)
+            logger.debug("Analytics materialized views refreshed")
+        except Exception as e:
+            logger.error(f"Analytics view refresh failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,153 @@
+"""
+In-process directory of characters for the detail endpoint.
+
+Keeps a slug -> id map for every character and pre-serialized JSON bodies
+for the most viewed ones, so the hottest reads skip the database entirely.
+Both are rebuilt in the background every few minutes; writers call
+``forget`` so edits are not served stale, neither from these maps nor from
+the cached detail bodies, until the next rebuild.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+from sqlalchemy.orm import Session, undefer_group
+
+from ..cache import CachedBody, cache, dump_json, make_etag
+from ..database import SessionLocal
+from ..logging_config import get_logger
+from ..models import IslamicCharacter
+from ..schemas import CharacterResponse
+
+logger = get_logger(__name__)
+
+HOT_SET_SIZE = 20
+REFRESH_INTERVAL = 300  # seconds
+
+SLUG_TO_ID: Dict[str, int] = {}
+HOT_CHARACTERS: Dict[int, CachedBody] = {}
+
+
+def resolve_id(character_id: Union[str, int]) -> Optional[int]:
+    """Map an id or slug to a character id without touching the database."""
+    if isinstance(character_id, int):
+        return character_id
+    if character_id.isdigit():
+        return int(character_id)
+    return SLUG_TO_ID.get(character_id)
+
+
+def get_hot(character_id: Optional[int]) -> Optional[CachedBody]:
+    """Return the preloaded JSON body for a hot character, if any."""
+    if character_id is None:
+        return None
+    return HOT_CHARACTERS.get(character_id)
+
+
+def detail_id_key(character_id: int) -> str:
+    """Cache key of a character's detail body looked up by id."""
+    return f"character_detail:id:{character_id}"
+
+
+def detail_slug_key(slug: str) -> str:
+    """Cache key of a character's detail body looked up by slug."""
+    return f"character_detail:slug:{slug}"
+
+
+def forget(character_id: int, *slugs: Optional[str]) -> None:
+    """Drop a character from both maps and its cached detail bodies after it was edited or deleted.
+
+    ``slugs`` are slugs the caller knows the character has had (e.g. the one
+    before a rename); those in the slug map are dropped as well.
+    """
+    HOT_CHARACTERS.pop(character_id, None)
+    known = {s for s, cid in SLUG_TO_ID.items() if cid == character_id}
+    for slug in known:
+        del SLUG_TO_ID[slug]
+    cache.delete(detail_id_key(character_id))
+    for slug in known.union(slugs):
+        if slug:
+            cache.delete(detail_slug_key(slug))
+
+
+def _to_response(character: IslamicCharacter) -> CharacterResponse:
+    """Build the detail response from a loaded character row."""
+    return CharacterResponse(
+        id=character.id,
+        name=character.name,
+        arabic_name=character.arabic_name,
+        english_name=getattr(character, 'english_name', None),
+        title=character.title,
+        description=character.description,
+        category=character.category,
+        era=character.era,
+        sub_category=getattr(character, 'sub_category', None),
+        slug=getattr(character, 'slug', f"character-{character.id}"),
+        profile_image=character.profile_image,
+        views_count=character.views_count,
+        likes_count=character.likes_count,
+        shares_count=getattr(character, 'shares_count', 0),
+        is_featured=getattr(character, 'is_featured', False),
+        is_verified=getattr(character, 'is_verified', False),
+        verification_source=getattr(character, 'verification_source', None),
+        verification_notes=getattr(character, 'verification_notes', None),
+        created_at=getattr(character, 'created_at', datetime.now()),
+        birth_year=character.birth_year,
+        death_year=character.death_year,
+        birth_place=character.birth_place,
+        death_place=character.death_place,
+        full_story=character.full_story,
+        key_achievements=character.key_achievements or [],
+        lessons=character.lessons or [],
+        quotes=character.quotes or [],
+        timeline_events=character.timeline_events or [],
+        related_characters=character.related_characters or []
+    )
+
+
+def serialize(character: IslamicCharacter) -> CachedBody:
+    """Encode a character's detail body once, tagged with an ETag that ignores the counters."""
+    version = character.updated_at or character.created_at
+    return CachedBody(
+        id=character.id,
+        etag=make_etag(character.id, version.isoformat() if version else ""),
+        body=dump_json(_to_response(character)),
+    )
+
+
+def reload(db: Session) -> None:
+    """Rebuild the slug map and the hot set from the database."""
+    slugs = {
+        slug: cid
+        for cid, slug in db.query(IslamicCharacter.id, IslamicCharacter.slug).filter(
+            IslamicCharacter.slug.isnot(None)
+        )
+    }
+    hot = db.query(IslamicCharacter).options(undefer_group('content')).order_by(
+        IslamicCharacter.views_count.desc()
+    ).limit(HOT_SET_SIZE).all()
+    
+    # Swap whole dicts so readers never see a half-built map
+    global SLUG_TO_ID, HOT_CHARACTERS
+    SLUG_TO_ID = slugs
+    HOT_CHARACTERS = {c.id: serialize(c) for c in hot}
+
+
+def _reload() -> None:
+    db = SessionLocal()
+    try:
+        reload(db)
+    finally:
+        db.close()
+
+
+async def refresh_loop(interval: float = REFRESH_INTERVAL) -> None:
+    """Rebuild the directory now and then every ``interval`` seconds until cancelled."""
+    while True:
+        try:
+            await asyncio.to_thread(_reload)
+            logger.debug(f"Character directory reloaded: {len(SLUG_TO_ID)} slugs, {len(HOT_CHARACTERS)} hot")
+        except Exception as e:
+            logger.error(f"Character directory reload failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,65 @@
+"""
+Cached lookups of hot, rarely written rows.
+
+Characters by slug and levels by id are kept in the in-memory cache as
+column dicts (ORM instances can't outlive their session). An ``after_flush``
+listener on every Session, sync or async, drops the entries for rows a flush
+updates or deletes, including a character's previous slug. Bulk UPDATE
+statements bypass the listener, so counters such as views_count can lag by
+up to the cache's default TTL.
+"""
+
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from ..cache import CharacterCache, cache, cache_key
+from ..models import IslamicCharacter, Level
+
+LEVEL_CACHE_TTL = 3600  # seconds; levels change only through admin edits
+
+
+def _level_key(level_id: int) -> str:
+    return cache_key("level", str(level_id))
+
+
+def get_character_by_slug(db: Session, slug: str) -> Optional[Dict[str, Any]]:
+    """Character column values by slug, cached until the character is written"""
+    key = CharacterCache.get_character_slug_key(slug)
+    data = cache.get(key)
+    if data is None:
+        table = IslamicCharacter.__table__
+        row = db.execute(select(table).where(table.c.slug == slug)).mappings().first()
+        if row is None:
+            return None
+        data = dict(row)
+        cache.set(key, data)
+    return data
+
+
+def get_level(db: Session, level_id: int) -> Optional[Dict[str, Any]]:
+    """Level column values by id, kept for LEVEL_CACHE_TTL"""
+    key = _level_key(level_id)
+    data = cache.get(key)
+    if data is None:
+        table = Level.__table__
+        row = db.execute(select(table).where(table.c.id == level_id)).mappings().first()
+        if row is None:
+            return None
+        data = dict(row)
+        cache.set(key, data, expire=LEVEL_CACHE_TTL)
+    return data
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidate_cached_rows(session: Session, flush_context) -> None:
+    for obj in (*session.dirty, *session.deleted):
+        if isinstance(obj, IslamicCharacter):
+            # A renamed slug leaves its old value in the attribute history
+            history = inspect(obj).attrs.slug.history
+            for slug in (obj.slug, *history.deleted):
+                if slug:
+                    cache.delete(CharacterCache.get_character_slug_key(slug))
+        elif isinstance(obj, Level):
+            cache.delete(_level_key(obj.id))
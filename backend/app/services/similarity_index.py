@@ -0,0 +1,168 @@
+"""
+Precomputed character similarity.
+
+A nightly job (``python -m app.services.similarity_index``) builds TF-IDF
+vectors from each character's descriptive fields, computes cosine similarity
+once and writes the top-K neighbours of every character to flat files:
+
+    ids.i32        character id of each row              (N,)    int32
+    neighbors.i32  neighbour character ids, best first   (N, K)  int32
+    scores.f16     matching cosine scores                (N, K)  float16
+
+At startup the files are memory-mapped, so serving ``/recommendations/similar``
+is an array lookup with no per-request similarity math. Running workers
+watch ids.i32 (replaced last by a build) and map a rebuilt index as soon as
+it appears, without a restart.
+"""
+
+import asyncio
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session, undefer
+
+from ..config import settings
+from ..database import SessionLocal
+from ..logging_config import get_logger
+from ..models import IslamicCharacter
+
+logger = get_logger(__name__)
+
+TOP_K = 50
+MAX_FEATURES = 4096
+RELOAD_INTERVAL = 60  # seconds between checks for a rebuilt index
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Loaded index; None until load() finds the files
+ROW_BY_ID: Dict[int, int] = {}
+NEIGHBORS: Optional[np.ndarray] = None
+SCORES: Optional[np.ndarray] = None
+# mtime (ns) of the ids file the loaded index came from
+_loaded_mtime: Optional[int] = None
+
+
+def _tokens(character: IslamicCharacter) -> List[str]:
+    """Bag of features describing a character for content similarity."""
+    features = [
+        f"category:{character.category}",
+        f"sub_category:{character.sub_category}",
+        f"era:{character.era}",
+    ]
+    for place in (character.birth_place, character.death_place, *(character.locations or [])):
+        if isinstance(place, str):
+            features.append(f"place:{place}")
+    text = " ".join(filter(None, (character.title, character.description)))
+    features.extend(word for word in _TOKEN.findall(text.lower()) if len(word) > 2)
+    return features
+
+
+def build(db: Session, out_dir: str = settings.SIMILARITY_INDEX_DIR, top_k: int = TOP_K) -> int:
+    """Compute the neighbour index for all characters; returns the row count."""
+    characters = db.query(IslamicCharacter).options(
+        undefer(IslamicCharacter.locations)
+    ).order_by(IslamicCharacter.id).all()
+    docs = [Counter(_tokens(character)) for character in characters]
+    n = len(docs)
+
+    document_frequency = Counter(term for doc in docs for term in doc)
+    vocabulary = {
+        term: col for col, (term, _) in enumerate(document_frequency.most_common(MAX_FEATURES))
+    }
+
+    vectors = np.zeros((n, len(vocabulary)), dtype=np.float32)
+    for row, doc in enumerate(docs):
+        for term, count in doc.items():
+            col = vocabulary.get(term)
+            if col is not None:
+                vectors[row, col] = count * (math.log((1 + n) / (1 + document_frequency[term])) + 1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms == 0, 1, norms)
+
+    similarity = vectors @ vectors.T
+    np.fill_diagonal(similarity, -np.inf)
+    k = max(0, min(top_k, n - 1))
+    order = np.argsort(-similarity, axis=1, kind="stable")[:, :k]
+
+    ids = np.array([character.id for character in characters], dtype=np.int32)
+    arrays = {
+        "neighbors.i32": ids[order].astype(np.int32),
+        "scores.f16": np.take_along_axis(similarity, order, axis=1).astype(np.float16),
+        # Last: running workers reload once this file changes
+        "ids.i32": ids,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    # Write then rename, so a running server never maps a half-written file
+    for name, array in arrays.items():
+        path = os.path.join(out_dir, name)
+        array.tofile(path + ".tmp")
+        os.replace(path + ".tmp", path)
+    return n
+
+
+def _index_mtime(index_dir: str) -> Optional[int]:
+    try:
+        return os.stat(os.path.join(index_dir, "ids.i32")).st_mtime_ns
+    except OSError:
+        return None
+
+
+def load(index_dir: str = settings.SIMILARITY_INDEX_DIR) -> bool:
+    """Memory-map a built index; returns False when none is available."""
+    global ROW_BY_ID, NEIGHBORS, SCORES, _loaded_mtime
+    mtime = _index_mtime(index_dir)
+    try:
+        ids = np.fromfile(os.path.join(index_dir, "ids.i32"), dtype=np.int32)
+        if not len(ids):
+            return False
+        neighbors = np.memmap(os.path.join(index_dir, "neighbors.i32"), dtype=np.int32, mode="r")
+        scores = np.memmap(os.path.join(index_dir, "scores.f16"), dtype=np.float16, mode="r")
+    except (OSError, ValueError):
+        return False
+    if len(neighbors) % len(ids) or len(scores) != len(neighbors):
+        logger.error(f"Similarity index in {index_dir} is inconsistent; keeping the loaded one")
+        return False
+
+    k = len(neighbors) // len(ids)
+    ROW_BY_ID = {int(character_id): row for row, character_id in enumerate(ids)}
+    NEIGHBORS = neighbors.reshape(len(ids), k)
+    SCORES = scores.reshape(len(ids), k)
+    _loaded_mtime = mtime
+    logger.info(f"Loaded similarity index for {len(ids)} characters (top {k})")
+    return True
+
+
+async def refresh_loop(interval: float = RELOAD_INTERVAL, index_dir: str = settings.SIMILARITY_INDEX_DIR) -> None:
+    """Load the index again whenever a build replaces it, until cancelled.
+
+    Loading runs on the event loop, like the lookups, so ``similar`` never
+    sees the arrays of two different builds.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        mtime = _index_mtime(index_dir)
+        if mtime is not None and mtime != _loaded_mtime:
+            load(index_dir)
+
+
+def similar(character_id: int, limit: int) -> Optional[List[Tuple[int, float]]]:
+    """Top neighbours of a character as (id, score) pairs, or None if not indexed."""
+    row = ROW_BY_ID.get(character_id)
+    if NEIGHBORS is None or row is None:
+        return None
+    ids = NEIGHBORS[row, :limit]
+    scores = SCORES[row, :limit].astype(np.float32)
+    return [(int(i), round(float(s), 4)) for i, s in zip(ids, scores)]
+
+
+if __name__ == "__main__":
+    db = SessionLocal()
+    try:
+        count = build(db)
+    finally:
+        db.close()
+    print(f"Built similarity index for {count} characters in {settings.SIMILARITY_INDEX_DIR}")
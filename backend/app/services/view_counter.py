@@ -0,0 +1,92 @@
+"""
+Batched character view counter.
+
+Reads only bump an in-memory counter; a background task periodically folds
+the pending deltas into islamic_characters.views_count with one executemany
+UPDATE, keeping writes (and cache invalidation) off the GET path. View
+counts are eventually consistent: a flush drops only the cached list items
+of the characters it touched, and detail bodies pick the new count up when
+they expire.
+"""
+
+import asyncio
+from collections import defaultdict
+from typing import Dict
+
+from sqlalchemy import bindparam, update
+
+from ..cache import CharacterCache, cache
+from ..database import SessionLocal
+from ..logging_config import get_logger
+from ..models import IslamicCharacter
+
+logger = get_logger(__name__)
+
+FLUSH_INTERVAL = 10  # seconds
+
+_pending: Dict[int, int] = defaultdict(int)
+_lock = asyncio.Lock()
+
+
+async def bump(character_id: int) -> None:
+    """Record one view of a character."""
+    async with _lock:
+        _pending[character_id] += 1
+
+
+def pending(character_id: int) -> int:
+    """Views recorded for a character that have not been flushed yet."""
+    return _pending.get(character_id, 0)
+
+
+def _write(snapshot: Dict[int, int]) -> None:
+    """Apply the snapshot of view deltas in a single UPDATE ... executemany."""
+    stmt = (
+        update(IslamicCharacter.__table__)
+        .where(IslamicCharacter.__table__.c.id == bindparam("cid"))
+        .values(views_count=IslamicCharacter.__table__.c.views_count + bindparam("delta"))
+    )
+    db = SessionLocal()
+    try:
+        db.execute(stmt, [{"cid": cid, "delta": delta} for cid, delta in snapshot.items()])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def flush() -> None:
+    """Write pending views to the database and drop the touched list items from the cache."""
+    async with _lock:
+        if not _pending:
+            return
+        snapshot = dict(_pending)
+        _pending.clear()
+    
+    try:
+        await asyncio.to_thread(_write, snapshot)
+    except Exception as e:
+        logger.error(f"View count flush failed: {e}")
+        # Put the deltas back so the next flush retries them
+        async with _lock:
+            for cid, delta in snapshot.items():
+                _pending[cid] += delta
+        return
+    
+    for cid in snapshot:
+        cache.delete(CharacterCache.get_character_item_key(cid))
+    logger.debug(f"Flushed views for {len(snapshot)} characters")
+
+
+async def flush_loop(interval: float = FLUSH_INTERVAL) -> None:
+    """Flush pending views every ``interval`` seconds until cancelled."""
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await flush()
+    except asyncio.CancelledError:
+        # Don't lose the views counted since the last tick on shutdown
+        await flush()
+        raise
@@ -4,8 +4,9 @@ Provides distributed caching, cache warming, and performance optimization.
 """
 
 import json
+import gzip
 import hashlib
-import pickle
+import sys
 import time
 from typing import Any, Optional, Dict, List, Union, Callable
 from datetime import datetime, timedelta
@@ -14,9 +15,16 @@ from dataclasses import dataclass
 from enum import Enum
 import asyncio
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
+# orjson options for cached payloads: dicts keyed by ints and numpy arrays are common
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+class _Payload(bytes):
+    """Encoded cache value: a one-byte tag (J = JSON, Z = gzipped JSON) plus the body."""
+
 class CacheLayer(Enum):
     """Cache layer types."""
     MEMORY = "memory"
@@ -105,7 +113,7 @@ class MemoryCache:
         """Set value in cache."""
         try:
             # Calculate size (rough estimation)
-            size_bytes = len(str(value)) if isinstance(value, str) else len(pickle.dumps(value))
+            size_bytes = len(value) if isinstance(value, (str, bytes)) else sys.getsizeof(value)
             
             entry = CacheEntry(
                 key=key,
@@ -188,7 +196,7 @@ class AdvancedCache:
                 # Promote to higher layers if needed
                 self._promote_if_needed(key, value, layer)
                 self.stats.hits += 1
-                return value
+                return self._deserialize(value)
         
         self.stats.misses += 1
         return None
@@ -197,14 +205,12 @@ class AdvancedCache:
         """Set value in cache (highest layer first)."""
         ttl = ttl or self.config.default_ttl
         
-        # Apply compression if enabled
+        # JSON-encode (optionally gzipped); values orjson can't encode are kept as-is
         processed_value = value
-        if self.config.enable_compression and self._should_compress(value):
-            processed_value = self._compress(value)
-        
-        # Apply serialization if enabled
         if self.config.enable_serialization:
-            processed_value = self._serialize(processed_value)
+            processed_value = self._serialize(
+                value, compress=self.config.enable_compression and self._should_compress(value)
+            )
         
         # Set in highest layer
         if self.layers:
@@ -261,22 +267,24 @@ class AdvancedCache:
             return len(str(value)) > 2048  # Compress complex objects > 2KB
         return False
     
-    def _compress(self, value: Any) -> Any:
-        """Compress value."""
+    def _serialize(self, value: Any, compress: bool = False) -> Any:
+        """Encode a value as a tagged orjson payload, gzipped when compress is set."""
         try:
-            import gzip
-            return gzip.compress(pickle.dumps(value))
-        except Exception as e:
-            logger.error(f"Failed to compress value: {e}")
+            body = orjson.dumps(value, option=_ORJSON_OPTIONS)
+        except TypeError:
             return value
+        if compress:
+            return _Payload(b"Z" + gzip.compress(body))
+        return _Payload(b"J" + body)
     
-    def _serialize(self, value: Any) -> Any:
-        """Serialize value for caching."""
-        try:
-            return pickle.dumps(value)
-        except Exception as e:
-            logger.error(f"Failed to serialize value: {e}")
+    def _deserialize(self, value: Any) -> Any:
+        """Decode a payload produced by _serialize; other values pass through."""
+        if not isinstance(value, _Payload):
             return value
+        body = value[1:]
+        if value[:1] == b"Z":
+            body = gzip.decompress(body)
+        return orjson.loads(body)
     
     def _promote_if_needed(self, key: str, value: Any, current_layer):
         """Promote value to higher cache layers if needed."""
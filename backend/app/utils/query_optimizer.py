@@ -3,16 +3,138 @@ Database query optimization utilities.
 Provides optimized query patterns and performance monitoring.
 """
 
-from sqlalchemy.orm import Session, joinedload, selectinload, subqueryload
-from sqlalchemy import text, func, and_, or_
+from sqlalchemy.orm import Session, joinedload, selectinload, subqueryload, load_only
+from sqlalchemy import text, func, and_, or_, tuple_, select
 from sqlalchemy.sql import Select
-from typing import List, Dict, Any, Optional, Type
+from typing import List, Dict, Any, Optional, Type, Tuple, Union
+from datetime import datetime
 from ..models import IslamicCharacter, UserProgress
 from ..logging_config import get_logger
+import base64
+import json
 import time
 
 logger = get_logger(__name__)
 
+# Sort field -> (sort key expression, descending). "updated" falls back to
+# created_at so never-updated rows still have a comparable key for seeking.
+CHARACTER_SORT_KEYS = {
+    "name": (IslamicCharacter.name, False),
+    "views": (IslamicCharacter.views_count, True),
+    "likes": (IslamicCharacter.likes_count, True),
+    "created": (IslamicCharacter.created_at, True),
+    "updated": (func.coalesce(IslamicCharacter.updated_at, IslamicCharacter.created_at), True),
+}
+
+_DATETIME_SORTS = frozenset({"created", "updated"})
+# Sorts whose cursor value is a number; "character" is the progress list's character_id
+_INT_SORTS = frozenset({"views", "likes", "character"})
+
+# Columns the list endpoint actually serializes (CharacterResponse) plus
+# updated_at for the cursor; full_story and the JSON blobs stay unread.
+CHARACTER_LIST_COLUMNS = (
+    IslamicCharacter.id,
+    IslamicCharacter.name,
+    IslamicCharacter.arabic_name,
+    IslamicCharacter.english_name,
+    IslamicCharacter.title,
+    IslamicCharacter.description,
+    IslamicCharacter.birth_year,
+    IslamicCharacter.death_year,
+    IslamicCharacter.era,
+    IslamicCharacter.category,
+    IslamicCharacter.sub_category,
+    IslamicCharacter.slug,
+    IslamicCharacter.profile_image,
+    IslamicCharacter.views_count,
+    IslamicCharacter.likes_count,
+    IslamicCharacter.shares_count,
+    IslamicCharacter.is_featured,
+    IslamicCharacter.is_verified,
+    IslamicCharacter.verification_source,
+    IslamicCharacter.verification_notes,
+    IslamicCharacter.created_at,
+    IslamicCharacter.updated_at,
+)
+
+def encode_cursor(sort_value: Any, last_id: int) -> str:
+    """Encode the (sort value, id) of the last row into an opaque cursor."""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, last_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Decode a cursor produced by encode_cursor.
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        sort_value, last_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not _is_int(last_id):
+        raise ValueError("Invalid cursor")
+    # The value is bound straight into the seek comparison, so it must have
+    # the sort column's type
+    if sort_value is None:
+        return sort_value, last_id
+    if sort in _DATETIME_SORTS:
+        try:
+            sort_value = datetime.fromisoformat(sort_value)
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid cursor") from e
+    elif sort in _INT_SORTS:
+        if not _is_int(sort_value):
+            raise ValueError("Invalid cursor")
+    elif not isinstance(sort_value, str):
+        raise ValueError("Invalid cursor")
+    return sort_value, last_id
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Below this many (estimated) rows an exact COUNT(*) is cheap enough to run
+APPROX_COUNT_THRESHOLD = 10_000
+
+def _driver_params(compiled) -> Union[Dict[str, Any], Tuple[Any, ...]]:
+    """Bound values of a compiled statement in the form its driver expects.
+    
+    Positional paramstyles (asyncpg's $1, $2) take a tuple in positiontup
+    order; a dict there would be unpacked into its key names.
+    """
+    if compiled.positiontup:
+        return tuple(compiled.params[name] for name in compiled.positiontup)
+    return compiled.params
+
+def approx_count(db: Session, query) -> Tuple[int, bool]:
+    """
+    Row count for a Query, estimated from planner statistics on PostgreSQL.
+    
+    Unfiltered queries read pg_class.reltuples; filtered ones take the
+    "Plan Rows" of an EXPLAIN. Small estimates, a never-analyzed table and
+    other backends fall back to an exact COUNT(*). Returns (count, is_approximate).
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        statement = query.statement
+        if statement.whereclause is None:
+            table = query.column_descriptions[0]["entity"].__tablename__
+            estimate = db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :t"),
+                {"t": table}
+            ).scalar()
+        else:
+            compiled = statement.compile(dialect=db.get_bind().dialect)
+            plan = db.connection().exec_driver_sql(
+                "EXPLAIN (FORMAT JSON) " + str(compiled), _driver_params(compiled)
+            ).scalar()
+            estimate = plan[0]["Plan"]["Plan Rows"]
+        # reltuples is -1 until the table has been analyzed
+        if estimate is not None and estimate >= APPROX_COUNT_THRESHOLD:
+            return int(estimate), True
+    return query.count(), False
+
 class QueryOptimizer:
     """Utility class for optimizing database queries."""
     
@@ -45,16 +167,9 @@ class QueryOptimizer:
             query = query.filter(IslamicCharacter.era == era)
         
         # Apply sorting
-        if sort == "name":
-            query = query.order_by(IslamicCharacter.name.asc())
-        elif sort == "views":
-            query = query.order_by(IslamicCharacter.views_count.desc())
-        elif sort == "likes":
-            query = query.order_by(IslamicCharacter.likes_count.desc())
-        elif sort == "created":
-            query = query.order_by(IslamicCharacter.created_at.desc())
-        elif sort == "updated":
-            query = query.order_by(IslamicCharacter.updated_at.desc())
+        if sort in CHARACTER_SORT_KEYS:
+            sort_key, descending = CHARACTER_SORT_KEYS[sort]
+            query = query.order_by(sort_key.desc() if descending else sort_key.asc())
         
         # Apply pagination
         offset = (page - 1) * limit
@@ -69,6 +184,69 @@ class QueryOptimizer:
         
         return characters
     
+    @staticmethod
+    def get_characters_keyset(
+        db: Session,
+        limit: int = 12,
+        category: Optional[str] = None,
+        era: Optional[str] = None,
+        sort: str = "name",
+        after: Optional[Tuple[Any, int]] = None,
+        page: int = 1
+    ) -> Tuple[List[IslamicCharacter], Optional[str]]:
+        """
+        Seek-paginated character list ordered by (sort key, id).
+        
+        When ``after`` is given the page starts right after that (sort value, id)
+        pair, so the cost no longer grows with page depth. Without it the
+        legacy ``page`` offset is used for the first request. Returns the rows
+        and the cursor for the next page (None on the last page).
+        """
+        start_time = time.time()
+        sort_key, descending = CHARACTER_SORT_KEYS.get(sort, CHARACTER_SORT_KEYS["name"])
+        
+        stmt = select(IslamicCharacter).options(load_only(*CHARACTER_LIST_COLUMNS))
+        
+        if category:
+            stmt = stmt.where(IslamicCharacter.category == category)
+        
+        if era:
+            stmt = stmt.where(IslamicCharacter.era == era)
+        
+        if descending:
+            stmt = stmt.order_by(sort_key.desc(), IslamicCharacter.id.desc())
+        else:
+            stmt = stmt.order_by(sort_key.asc(), IslamicCharacter.id.asc())
+        
+        if after is not None:
+            seek_col, seek_value = sort_key, after[0]
+            if sort in _DATETIME_SORTS and db.get_bind().dialect.name == "sqlite":
+                # SQLite keeps server-default timestamps as text without microseconds,
+                # so compare both sides as julian days rather than as strings
+                seek_col, seek_value = func.julianday(sort_key), func.julianday(seek_value)
+            seek_key = tuple_(seek_col, IslamicCharacter.id)
+            bound = tuple_(seek_value, after[1])
+            stmt = stmt.where(seek_key < bound if descending else seek_key > bound)
+        else:
+            stmt = stmt.offset((page - 1) * limit)
+        
+        # Fetch one extra row to learn whether another page exists
+        rows = db.execute(stmt.limit(limit + 1)).scalars().all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            if sort == "updated":
+                last_value = last.updated_at or last.created_at
+            else:
+                last_value = getattr(last, sort_key.key)
+            next_cursor = encode_cursor(last_value, last.id)
+        
+        duration = time.time() - start_time
+        logger.info(f"Keyset character query completed in {duration:.3f}s, returned {len(rows)} results")
+        
+        return rows, next_cursor
+    
     @staticmethod
     def get_character_by_id_optimized(
         db: Session,
@@ -0,0 +1,14 @@
+"""
+Print a binary request log (logs/requests.bin) as JSON lines
+"""
+
+import sys
+
+import orjson
+
+from app.logging_config import decode_request_log
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "logs/requests.bin"
+    for entry in decode_request_log(path):
+        sys.stdout.write(orjson.dumps(entry).decode("utf-8") + "\n")
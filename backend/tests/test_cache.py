@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.cache import CacheManager, _inflight, cache, cache_result
+from app.database import Base
+from app.models import IslamicCharacter, Level
+from app.services import row_cache
+
+
+class TestSingleFlight:
+    """Concurrent misses on a key share one computation."""
+
+    def test_waiters_recompute_when_leader_is_cancelled(self):
+        calls = []
+
+        @cache_result(expire=60, key_prefix="test-single-flight")
+        async def slow(value):
+            calls.append(value)
+            await asyncio.sleep(0.05)
+            return value * 2
+
+        async def main():
+            cache.clear_pattern("test-single-flight:*")
+            leader = asyncio.create_task(slow(1))
+            await asyncio.sleep(0.01)
+            waiters = [asyncio.create_task(slow(1)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            return await asyncio.gather(*waiters)
+
+        assert asyncio.run(main()) == [2, 2, 2]
+        assert len(calls) == 2
+        assert not _inflight
+
+
+class TestCacheManager:
+    """Per-item expiry set through CacheManager.set."""
+
+    def test_expire_outlives_default_ttl(self):
+        manager = CacheManager(maxsize=10, ttl=0.05)
+        manager.set("default", 1)
+        manager.set("long", 2, expire=60)
+        time.sleep(0.1)
+        assert manager.get("default") is None
+        assert manager.get("long") == 2
+
+    def test_expire_shorter_than_default_ttl(self):
+        manager = CacheManager(maxsize=10, ttl=60)
+        manager.set("short", 1, expire=0.05)
+        time.sleep(0.1)
+        assert manager.get("short") is None
+        assert not manager.exists("short")
+
+
+@pytest.fixture
+def sync_db():
+    """Sync session on a fresh in-memory database with one character and level."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(IslamicCharacter(id=1, name="Character 1", arabic_name="شخصية", slug="character-1"))
+    db.add(Level(id=1, name="Beginner", xp_required=0))
+    db.commit()
+    cache.clear_pattern("character:slug:*")
+    cache.clear_pattern("level:*")
+    yield db
+    db.close()
+    engine.dispose()
+
+
+class TestRowCache:
+    """Cached by-slug and level lookups are dropped when a flush writes the row."""
+
+    def test_character_by_slug_is_cached(self, sync_db):
+        assert row_cache.get_character_by_slug(sync_db, "character-1")["name"] == "Character 1"
+        sync_db.execute(update(IslamicCharacter).values(name="Bulk renamed"))
+        assert row_cache.get_character_by_slug(sync_db, "character-1")["name"] == "Character 1"
+
+    def test_slug_change_drops_old_and_new_slug(self, sync_db):
+        assert row_cache.get_character_by_slug(sync_db, "character-1") is not None
+        character = sync_db.get(IslamicCharacter, 1)
+        character.slug = "renamed"
+        sync_db.commit()
+        assert row_cache.get_character_by_slug(sync_db, "character-1") is None
+        assert row_cache.get_character_by_slug(sync_db, "renamed")["id"] == 1
+
+    def test_deleted_character_is_dropped(self, sync_db):
+        assert row_cache.get_character_by_slug(sync_db, "character-1") is not None
+        sync_db.delete(sync_db.get(IslamicCharacter, 1))
+        sync_db.commit()
+        assert row_cache.get_character_by_slug(sync_db, "character-1") is None
+
+    def test_level_edit_is_visible(self, sync_db):
+        assert row_cache.get_level(sync_db, 1)["name"] == "Beginner"
+        sync_db.get(Level, 1).name = "Novice"
+        sync_db.commit()
+        assert row_cache.get_level(sync_db, 1)["name"] == "Novice"
+        assert row_cache.get_level(sync_db, 2) is None
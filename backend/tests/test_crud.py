@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+from sqlalchemy import inspect, select
+from sqlalchemy.dialects.postgresql import asyncpg, psycopg
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app import crud, schemas
+from app.cache import cache
+from app.database import Base
+from app.models import IslamicCharacter, UserProgress
+from app.utils.query_optimizer import _driver_params, decode_cursor, encode_cursor
+
+
+async def _seed(db):
+    db.add_all([
+        IslamicCharacter(
+            id=i, name=f"Character {i}", arabic_name="شخصية", slug=f"character-{i}",
+            category="الصحابة", era="عصر النبوة", related_characters=[2, 3] if i == 1 else None
+        )
+        for i in range(1, 4)
+    ])
+    db.add_all([UserProgress(user_id=1, character_id=i, time_spent=60) for i in range(1, 4)])
+    await db.commit()
+
+
+@pytest.fixture
+def run_with_db():
+    """Run a coroutine against a fresh, seeded in-memory database."""
+    def run(check):
+        async def main():
+            engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                await _seed(db)
+                result = await check(db)
+            await engine.dispose()
+            return result
+        return asyncio.run(main())
+    return run
+
+
+class TestListQueriesLoadEagerly:
+    """List responses must serialize without any lazy load (raiseload("*"))."""
+
+    def test_character_lists_serialize(self, run_with_db):
+        async def check(db):
+            characters, _ = await crud.get_characters(db, limit=10)
+            found = await crud.search_characters(db, query="Character")
+            related = await crud.get_related_characters(db, character_id=1)
+            return [schemas.CharacterResponse.model_validate(c) for c in (*characters, *found, *related)]
+
+        assert len(run_with_db(check)) == 3 + 3 + 2
+
+    def test_progress_list_serializes(self, run_with_db):
+        async def check(db):
+            records, _ = await crud.get_user_progress_list(db, user_id=1)
+            return [schemas.ProgressResponse.model_validate(p) for p in records]
+
+        assert len(run_with_db(check)) == 3
+
+    def test_undeclared_relationship_raises(self, run_with_db):
+        async def check(db):
+            characters, _ = await crud.get_characters(db, limit=1)
+            with pytest.raises(InvalidRequestError, match="lazy='raise'"):
+                characters[0].progress_records
+
+        run_with_db(check)
+
+    def test_character_lists_skip_unserialized_columns(self, run_with_db):
+        async def check(db):
+            characters, _ = await crud.get_characters(db, limit=10)
+            found = await crud.search_characters(db, query="Character")
+            return [inspect(c).unloaded for c in (*characters, *found)]
+
+        for unloaded in run_with_db(check):
+            assert {"birth_place", "death_place", "full_story"} <= unloaded
+
+
+class TestProgressCursor:
+    """Progress pages seek past the (character_id, id) stored in the cursor."""
+
+    def test_next_page_continues_after_cursor(self, run_with_db):
+        async def check(db):
+            first, cursor = await crud.get_user_progress_list(db, user_id=1, limit=2)
+            rest, _ = await crud.get_user_progress_list(
+                db, user_id=1, limit=2, after=decode_cursor(cursor, "character")
+            )
+            return [p.character_id for p in (*first, *rest)]
+
+        assert run_with_db(check) == [1, 2, 3]
+
+    @pytest.mark.parametrize("sort_value", ["1", 1.5, True, [1]])
+    def test_mistyped_sort_value_is_rejected(self, sort_value):
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor(sort_value, 1), "character")
+
+
+class TestExplainParams:
+    """approx_count's EXPLAIN binds the filter values the way each driver expects."""
+
+    def test_asyncpg_gets_positional_values(self):
+        stmt = select(IslamicCharacter).where(
+            IslamicCharacter.category == "الصحابة", IslamicCharacter.era == "عصر النبوة"
+        )
+        compiled = stmt.compile(dialect=asyncpg.dialect())
+        assert "$1" in str(compiled)
+        assert _driver_params(compiled) == ("الصحابة", "عصر النبوة")
+
+    def test_psycopg_gets_named_values(self):
+        stmt = select(IslamicCharacter).where(IslamicCharacter.category == "الصحابة")
+        compiled = stmt.compile(dialect=psycopg.dialect())
+        assert _driver_params(compiled) == {"category_1": "الصحابة"}
+
+
+class TestProgressSummary:
+    """The summary is aggregated in SQL."""
+
+    def test_summary_totals(self, run_with_db):
+        async def check(db):
+            return await crud.get_user_progress_summary(db, user_id=1)
+
+        assert run_with_db(check) == {
+            "total_stories_started": 3,
+            "total_stories_completed": 0,
+            "total_time_spent_minutes": 3,
+            "total_bookmarks": 0,
+            "completion_rate": 0.0
+        }
+
+    def test_summary_without_progress(self, run_with_db):
+        async def check(db):
+            return await crud.get_user_progress_summary(db, user_id=99)
+
+        assert run_with_db(check)["completion_rate"] == 0
+
+
+class TestUpdateProgressDetails:
+    """Progress details are written with a single UPDATE ... RETURNING."""
+
+    def test_updates_and_returns_record(self, run_with_db):
+        async def check(db):
+            update = schemas.ProgressUpdate(bookmarked=True, current_chapter=3)
+            progress = await crud.update_progress_details(db, user_id=1, character_id=2, progress_update=update)
+            return schemas.ProgressResponse.model_validate(progress)
+
+        progress = run_with_db(check)
+        assert (progress.character_id, progress.bookmarked, progress.current_chapter) == (2, True, 3)
+
+    def test_missing_record(self, run_with_db):
+        async def check(db):
+            update = schemas.ProgressUpdate(bookmarked=True)
+            return await crud.update_progress_details(db, user_id=99, character_id=2, progress_update=update)
+
+        assert run_with_db(check) is None
+
+
+class TestApplicationStats:
+    """Application stats are served from the cache for a minute."""
+
+    def test_stats_are_cached(self, run_with_db):
+        async def check(db):
+            cache.clear_pattern("stats:*")
+            first = await crud.get_application_stats(db)
+            db.add(IslamicCharacter(id=4, name="Character 4", arabic_name="شخصية", slug="character-4"))
+            await db.commit()
+            return first, await crud.get_application_stats(db)
+
+        first, second = run_with_db(check)
+        assert first["total_characters"] == first["total_stories_started"] == 3
+        assert second == first
+
+
+class TestRelatedCharacters:
+    """Related characters come back in one statement, then from the cache."""
+
+    def test_related_in_list_order(self, run_with_db):
+        async def check(db):
+            cache.clear_pattern("character:*")
+            parent = await db.get(IslamicCharacter, 2)
+            parent.related_characters = [3, 99, 1]
+            await db.commit()
+            cold = await crud.get_related_characters(db, character_id=2)
+            warm = await crud.get_related_characters(db, character_id=2)
+            return cold, warm, await crud.get_related_characters(db, character_id=99)
+
+        cold, warm, missing = run_with_db(check)
+        assert [item["id"] for item in cold] == [3, 1]
+        assert warm == cold
+        assert missing is None
+
+    def test_non_array_related_is_empty(self, run_with_db):
+        async def check(db):
+            cache.clear_pattern("character:*")
+            scalar, null = await db.get(IslamicCharacter, 2), await db.get(IslamicCharacter, 3)
+            scalar.related_characters, null.related_characters = 1, None
+            await db.commit()
+            return [await crud.get_related_characters(db, character_id=i) for i in (2, 3)]
+
+        assert run_with_db(check) == [[], []]
@@ -0,0 +1,29 @@
+import importlib
+import pkgutil
+
+import pytest
+
+import app
+
+# Both router packages: the mounted app.api and the async routers in app.apı
+ROUTER_PACKAGES = sorted(
+    module.name for module in pkgutil.iter_modules(app.__path__, "app.")
+    if module.ispkg and module.name.startswith("app.ap")
+)
+
+
+def _router_modules():
+    for package_name in ROUTER_PACKAGES:
+        package = importlib.import_module(package_name)
+        for module in pkgutil.iter_modules(package.__path__, f"{package_name}."):
+            yield module.name
+
+
+def test_both_router_packages_found():
+    assert len(ROUTER_PACKAGES) == 2
+
+
+@pytest.mark.parametrize("module_name", list(_router_modules()))
+def test_router_module_imports(module_name):
+    """A missing name in a router should fail here, not on the first request."""
+    importlib.import_module(module_name)